@@ -3,14 +3,28 @@
 Servidor Flask para simulación N-body - CORREGIDO
 """
 
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, Response, render_template, jsonify, request, send_file
 from flask_socketio import SocketIO, emit
 from flask_cors import CORS
+import argparse
+import itertools
+import os
+import signal
+import sys
+import numpy as np
 import threading
 import time
 from physics.nbody import NBodySimulator
+from physics.events import EventDetector
 from physics.constants import SCALE_FACTORS
 from visualization.sphere_generator import ProceduralSphere
+from visualization.culling import Viewport
+from server.metrics import MetricsRegistry
+from server.scheduler import RealTimeScheduler
+from server.jobs import JobManager, JobQueueFull
+from server import spatial_queries
+from server.stream import FrameBroadcaster
+from server.shared_state import SharedSimulation
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'solar-system-secret-key-2025'
@@ -30,13 +44,47 @@ simulator = None
 simulation_thread = None
 simulation_running = False
 simulation_lock = threading.Lock()
+metrics = MetricsRegistry()
+scheduler = RealTimeScheduler(None)  # conserva la escala de tiempo entre reinicios
+connected_clients = set()
+client_viewports = {}  # sid -> Viewport para culling por cliente
+update_sequence = itertools.count(1)  # número global de simulation_update (detección de frames perdidos)
+state_stream = FrameBroadcaster()  # suscriptores de /api/stream (SSE)
+shared = None  # SharedSimulation con --shared/--attach: la física corre en otro proceso
+# Elementos osculadores en cada N-ésima actualización (4 -> ~1 vez por segundo) y centro de referencia
+elements_every = max(1, int(os.environ.get('ELEMENTS_EVERY', 4)))
+elements_center = os.environ.get('ELEMENTS_CENTER', 'sun')
+# Integraciones largas en procesos aparte: no tocan el simulador interactivo
+jobs = JobManager(
+    max_workers=int(os.environ.get('JOB_WORKERS', 2)),
+    output_dir=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'runs', 'jobs')
+)
+
+def resolve_elements_center(sim, center):
+    """Centro de los elementos osculadores válido para sim (baricentro si el cuerpo no existe)"""
+    if center == 'barycenter':
+        return center
+    try:
+        sim.find_body(center)
+    except KeyError:
+        print(f"⚠️ ELEMENTS_CENTER desconocido ({center}): se usa el baricentro")
+        return 'barycenter'
+    return center
 
 def initialize_simulation():
-    """Inicializa el simulador con el sistema solar"""
-    global simulator
+    """Inicializa el simulador con el sistema solar (o refleja el de memoria compartida)"""
+    global simulator, elements_center
     with simulation_lock:
-        simulator = NBodySimulator(time_step=3600, method='verlet')
-        simulator.initialize_solar_system()
+        if shared is not None:
+            simulator = shared.sync()
+        else:
+            simulator = NBodySimulator(time_step=3600, method='verlet')
+            simulator.initialize_solar_system()
+            simulator.event_detector = EventDetector()
+            scheduler.reset(simulator)
+        simulator.metrics = metrics
+        # Validado aquí y no en el loop: un centro inválido detendría la simulación
+        elements_center = resolve_elements_center(simulator, elements_center)
         print(f"✅ Simulación inicializada con {len(simulator.bodies)} cuerpos celestes")
     return simulator
 
@@ -48,38 +96,92 @@ def simulation_loop():
     
     frame_count = 0
     last_update_time = time.time()
+    last_sim_time = simulator.time if simulator is not None else 0.0
     
     while simulation_running:
         try:
+            frame_start = wait_start = time.perf_counter()
+            payload = None
             with simulation_lock:
+                metrics.observe('lock_wait', time.perf_counter() - wait_start)
                 if simulator is None:
                     break
                 
-                # Ejecutar paso de física
-                simulator.step()
-                frame_count += 1
+                # Ejecutar los subpasos de física que caben en el frame
+                # (en modo compartido, reflejar el último frame publicado si hay uno nuevo)
+                advanced = shared is None or shared.stale
+                if shared is None:
+                    scheduler.advance()
+                elif advanced:
+                    simulator = shared.sync()
+                    simulator.metrics = metrics
+                if advanced:
+                    frame_count += 1
+                
+                # Eventos detectados en el paso (encuentros cercanos, conjunciones)
+                if simulator.event_detector is not None:
+                    for event in simulator.event_detector.drain():
+                        print(f"✨ Evento: {event['type']} {event['phase']} {' - '.join(event['bodies'])}")
+                        socketio.emit('simulation_event', event, namespace='/')
                 
                 # Enviar actualización cada 5 frames
-                if frame_count % 5 == 0:
-                    state = simulator.get_state()
-                    energy = simulator.compute_energy()
+                if advanced and frame_count % 5 == 0:
+                    # La nube submuestreada por defecto solo hace falta para clientes sin viewport
+                    viewports = dict(client_viewports)
+                    needs_default = (not viewports or state_stream.subscribers
+                                     or any(sid not in viewports for sid in connected_clients))
+                    with metrics.timer('serialization'):
+                        state = simulator.get_state(include_particles=needs_default)
+                    with metrics.timer('energy'):
+                        energy = simulator.compute_energy()
                     
-                    # Calcular FPS
+                    # Calcular FPS y relación tiempo simulado / tiempo real
                     current_time = time.time()
                     elapsed = current_time - last_update_time
                     fps = 5 / elapsed if elapsed > 0 else 0
+                    if elapsed > 0:
+                        metrics.set_gauge('sim_wall_ratio', (simulator.time - last_sim_time) / elapsed,
+                                          'Segundos simulados por segundo real')
+                    metrics.set_gauge('fps', fps, 'Frames del loop por segundo')
+                    stats = scheduler.stats() if shared is None else shared.stats()
+                    metrics.set_gauge('achieved_time_scale', stats['achieved_scale'],
+                                      'Escala de tiempo alcanzada (1 = 1 h simulada cada 50 ms)')
+                    if shared is None:
+                        metrics.set_gauge('substeps_per_frame', scheduler.substeps,
+                                          'Subpasos de física en el último frame')
                     last_update_time = current_time
+                    last_sim_time = simulator.time
                     
-                    # CORRECCIÓN: Usar socketio.emit sin broadcast
-                    socketio.emit('simulation_update', {
+                    payload = {
                         'state': state,
                         'energy': energy,
-                        'fps': round(fps, 1)
-                    }, namespace='/')
+                        'fps': round(fps, 1),
+                        'scheduler': stats,
+                        'sequence': next(update_sequence),
+                        'timestamp': time.time()
+                    }
+                    if payload['sequence'] % elements_every == 0:
+                        payload['elements'] = simulator.get_elements(elements_center)
+                    # Con el lock solo se copia el snapshot; el KD-tree se construye al hacer culling
+                    index = simulator.spatial_index() if viewports else None
+            
+            # Envío y culling por cliente fuera del lock: no frenan la física ni los endpoints
+            if payload is not None:
+                # CORRECCIÓN: Usar socketio.emit sin broadcast
+                if not viewports:
+                    with metrics.timer('emit'):
+                        socketio.emit('simulation_update', payload, namespace='/')
+                else:
+                    emit_viewports(payload, viewports, index)
             
-            # Control de velocidad (~20 FPS)
-            time.sleep(0.05)
+            # Un solo JSON (y gzip) por frame para todos los suscriptores SSE, fuera del lock
+            if payload is not None and state_stream.subscribers:
+                with metrics.timer('stream_encode'):
+                    state_stream.publish(payload, payload['sequence'])
             
+            # Control de velocidad (~20 FPS): dormir solo lo que resta del frame
+            time.sleep(scheduler.sleep_time(frame_start))
+        
         except Exception as e:
             print(f"❌ Error en simulation_loop: {e}")
             import traceback
@@ -89,6 +191,28 @@ def simulation_loop():
     
     print("🛑 Loop de simulación detenido")
 
+def emit_viewports(payload, viewports, index):
+    """
+    Envía la actualización a cada cliente con su propia nube de partículas
+    index es el SpatialIndex del snapshot del payload; no requiere el lock
+    """
+    state = payload['state']
+    for sid in list(connected_clients):
+        viewport = viewports.get(sid)
+        if viewport is None:
+            data = payload
+        else:
+            try:
+                with metrics.timer('culling'):
+                    particles = viewport.cull(index)
+            except (KeyError, ValueError) as e:
+                print(f"⚠️ Viewport inválido para {sid}: {e}")
+                client_viewports.pop(sid, None)
+                continue
+            data = dict(payload, state=dict(state, particles=particles))
+        with metrics.timer('emit'):
+            socketio.emit('simulation_update', data, to=sid, namespace='/')
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -117,6 +241,68 @@ def api_state():
     
     return jsonify({'status': 'success', 'state': state, 'energy': energy})
 
+def spatial_query(query):
+    """Ejecuta una consulta de server.spatial_queries sobre el índice del snapshot actual"""
+    if simulator is None:
+        return jsonify({'status': 'error', 'message': 'Not initialized'}), 400
+    # Con el lock solo se copian las posiciones; el árbol se construye en la consulta, fuera
+    with simulation_lock:
+        index = simulator.spatial_index()
+    try:
+        with metrics.timer('spatial_query'):
+            result = query(index, request.args)
+    except KeyError as e:
+        return jsonify({'status': 'error', 'message': str(e.args[0])}), 404
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    return jsonify({'status': 'success', **result})
+
+@app.route('/api/elements', methods=['GET'])
+def api_elements():
+    """
+    Elementos osculadores actuales (a en m, e, i en grados, período en s)
+    ?center=sun|barycenter|<cuerpo>; ?all=1 añade arreglos para todos los cuerpos masivos
+    """
+    if simulator is None:
+        return jsonify({'status': 'error', 'message': 'Not initialized'}), 400
+    center = request.args.get('center', elements_center)
+    try:
+        with simulation_lock:
+            result = simulator.get_elements(center)
+            if request.args.get('all') == '1':
+                elements = simulator.osculating_elements(center)
+                # NaN no es JSON válido: se envía null
+                result['all'] = {
+                    key: np.where(np.isnan(elements[key]), None, elements[key]).tolist()
+                    for key in ('semi_major_axis', 'eccentricity', 'inclination', 'period')
+                }
+    except KeyError as e:
+        return jsonify({'status': 'error', 'message': str(e.args[0])}), 404
+    return jsonify({'status': 'success', 'elements': result})
+
+@app.route('/api/stream', methods=['GET'])
+def api_stream():
+    """
+    Estado en Server-Sent Events (evento 'simulation_update', mismo payload que Socket.IO)
+    Comprimido con gzip si el cliente lo acepta; ?compress=0 lo desactiva
+    """
+    compressed = ('gzip' in request.headers.get('Accept-Encoding', '')
+                  and request.args.get('compress', '1') != '0')
+    headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    if compressed:
+        headers['Content-Encoding'] = 'gzip'
+    return Response(state_stream.stream(compressed), mimetype='text/event-stream', headers=headers)
+
+@app.route('/api/nearest', methods=['GET'])
+def api_nearest():
+    """Vecinos más cercanos a un cuerpo o punto (ver server.spatial_queries)"""
+    return spatial_query(spatial_queries.nearest)
+
+@app.route('/api/region', methods=['GET'])
+def api_region():
+    """Cuerpos y partículas dentro de una esfera o caja (ver server.spatial_queries)"""
+    return spatial_query(spatial_queries.region)
+
 @app.route('/api/sphere_data', methods=['GET'])
 def api_sphere_data():
     try:
@@ -131,11 +317,93 @@ def api_sphere_data():
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 400
 
+# ==================== Trabajos en segundo plano ====================
+
+@app.route('/api/jobs', methods=['POST'])
+def api_submit_job():
+    """Encola una integración: scenario, method, span, dt, stride, belt, kuiper, seed, particles"""
+    try:
+        job = jobs.submit(request.get_json(silent=True) or {})
+    except (TypeError, ValueError) as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except JobQueueFull as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 429
+    return jsonify({'status': 'success', 'job': job.to_dict()}), 202
+
+@app.route('/api/jobs', methods=['GET'])
+def api_list_jobs():
+    return jsonify({'status': 'success', 'jobs': [job.to_dict() for job in jobs.list()]})
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def api_job_status(job_id):
+    try:
+        return jsonify({'status': 'success', 'job': jobs.get(job_id).to_dict()})
+    except KeyError:
+        return jsonify({'status': 'error', 'message': f"Trabajo no encontrado: {job_id}"}), 404
+
+@app.route('/api/jobs/<job_id>/cancel', methods=['POST'])
+def api_cancel_job(job_id):
+    try:
+        return jsonify({'status': 'success', 'job': jobs.cancel(job_id).to_dict()})
+    except KeyError:
+        return jsonify({'status': 'error', 'message': f"Trabajo no encontrado: {job_id}"}), 404
+
+@app.route('/api/jobs/<job_id>', methods=['DELETE'])
+def api_delete_job(job_id):
+    try:
+        jobs.delete(job_id)
+    except KeyError:
+        return jsonify({'status': 'error', 'message': f"Trabajo no encontrado: {job_id}"}), 404
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 409
+    return jsonify({'status': 'success'})
+
+@app.route('/api/jobs/<job_id>/result', methods=['GET'])
+def api_job_result(job_id):
+    """Trayectoria .npz (times, positions, velocities, masses, names[, particle_positions])"""
+    try:
+        job = jobs.get(job_id)
+    except KeyError:
+        return jsonify({'status': 'error', 'message': f"Trabajo no encontrado: {job_id}"}), 404
+    if not job.has_result:
+        return jsonify({'status': 'error', 'message': f"Sin resultado (estado: {job.status})"}), 409
+    return send_file(job.path, mimetype='application/octet-stream',
+                     as_attachment=True, download_name=f'trajectory_{job_id}.npz')
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Métricas de rendimiento en formato de texto de Prometheus"""
+    sim = simulator
+    metrics.set_gauge('bodies', sim.n_bodies if sim is not None else 0,
+                      'Cuerpos masivos en la simulación')
+    metrics.set_gauge('test_particles', sim.n_test_particles if sim is not None else 0,
+                      'Partículas de prueba sin masa en la simulación')
+    metrics.set_gauge('connected_clients', len(connected_clients),
+                      'Clientes Socket.IO conectados')
+    running = shared.reader.running if shared is not None else simulation_running
+    metrics.set_gauge('simulation_running', 1 if running else 0,
+                      'Loop de simulación activo')
+    metrics.set_gauge('stream_subscribers', state_stream.subscribers, 'Suscriptores de /api/stream')
+    metrics.set_gauge('stream_dropped_frames', state_stream.dropped,
+                      'Frames SSE descartados por colas llenas (suscriptores actuales)')
+    job_counts = jobs.counts()
+    metrics.set_gauge('jobs_running', job_counts['running'], 'Trabajos en segundo plano en curso')
+    metrics.set_gauge('jobs_queued', job_counts['queued'], 'Trabajos en segundo plano en espera')
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+@app.route('/api/shared/status', methods=['GET'])
+def api_shared_status():
+    """Bloque de memoria compartida que refleja este proceso (solo con --shared/--attach)"""
+    if shared is None:
+        return jsonify({'status': 'error', 'message': 'Memoria compartida no activa'}), 404
+    return jsonify({'status': 'success', **shared.status()})
+
 # ==================== WebSocket Events ====================
 
 @socketio.on('connect')
 def handle_connect():
     print(f"🔌 Cliente conectado: {request.sid}")
+    connected_clients.add(request.sid)
     emit('connection_response', {'status': 'connected'})
     
     if simulator is not None:
@@ -147,10 +415,19 @@ def handle_connect():
 @socketio.on('disconnect')
 def handle_disconnect():
     print(f"🔌 Cliente desconectado: {request.sid}")
+    connected_clients.discard(request.sid)
+    client_viewports.pop(request.sid, None)
+
+def start_loop():
+    """Lanza el hilo de simulation_loop"""
+    global simulation_running, simulation_thread
+    simulation_running = True
+    simulation_thread = threading.Thread(target=simulation_loop, daemon=True)
+    simulation_thread.start()
 
 @socketio.on('start_simulation')
 def handle_start_simulation(data=None):
-    global simulation_running, simulation_thread, simulator
+    global simulator
     
     print("▶️ Iniciando simulación")
     
@@ -158,11 +435,16 @@ def handle_start_simulation(data=None):
         if simulator is None:
             simulator = initialize_simulation()
         
-        if not simulation_running:
-            simulation_running = True
-            simulation_thread = threading.Thread(target=simulation_loop, daemon=True)
-            simulation_thread.start()
-            
+        # En modo compartido el loop solo reenvía frames: se reanuda la física del otro proceso
+        if shared is not None and not shared.reader.running:
+            shared.reader.set_running(True)
+            started = True
+        else:
+            started = shared is None and not simulation_running
+            if started:
+                start_loop()
+        
+        if started:
             # CORRECCIÓN: emit a todos los clientes conectados
             socketio.emit('simulation_status', {
                 'status': 'started',
@@ -183,7 +465,10 @@ def handle_stop_simulation():
     global simulation_running
     
     print("⏸️ Pausando simulación")
-    simulation_running = False
+    if shared is not None:
+        shared.reader.set_running(False)
+    else:
+        simulation_running = False
     
     socketio.emit('simulation_status', {
         'status': 'stopped'
@@ -195,6 +480,12 @@ def handle_reset_simulation():
     
     print("🔄 Reiniciando simulación")
     
+    if shared is not None:
+        # El proceso de simulación reconstruye el escenario; el loop adopta los nuevos cuerpos
+        shared.reader.request_reset()
+        socketio.emit('simulation_status', {'status': 'reset'}, namespace='/')
+        return
+    
     was_running = simulation_running
     simulation_running = False
     time.sleep(0.1)
@@ -208,6 +499,21 @@ def handle_reset_simulation():
     if was_running:
         handle_start_simulation()
 
+@socketio.on('set_viewport')
+def handle_set_viewport(data=None):
+    """Vista del cliente (frustum o cuerpo enfocado); sin datos se desactiva el culling"""
+    if not data:
+        client_viewports.pop(request.sid, None)
+        return
+    
+    try:
+        viewport = Viewport.from_dict(data)
+        if viewport.focus is not None and simulator is not None:
+            simulator.find_body(viewport.focus)
+        client_viewports[request.sid] = viewport
+    except (AttributeError, KeyError, TypeError, ValueError) as e:
+        emit('error', {'message': f'Viewport inválido: {e}'})
+
 @socketio.on('set_time_scale')
 def handle_time_scale(data):
     global simulator
@@ -219,12 +525,15 @@ def handle_time_scale(data):
     try:
         scale = float(data.get('scale', 1.0))
         
+        # El paso físico queda acotado; la velocidad se logra con subpasos
         with simulation_lock:
-            simulator.time_step = 3600 * scale
+            scheduler.set_time_scale(scale)
+        if shared is not None:
+            shared.reader.set_time_scale(scale)
         
         socketio.emit('time_scale_updated', {
             'scale': scale,
-            'time_step': simulator.time_step
+            'time_step': scheduler.max_dt
         }, namespace='/')
         
         print(f"⏱️ Escala: {scale}x")
@@ -233,19 +542,53 @@ def handle_time_scale(data):
         emit('error', {'message': str(e)})
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Servidor del sistema solar N-body')
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--shared', action='store_true',
+                      help="Correr la física en un proceso dedicado y leerla de memoria compartida")
+    mode.add_argument('--attach', metavar='NOMBRE',
+                      help="Servir el bloque de memoria compartida de otra instancia con --shared")
+    parser.add_argument('--scenario', default='solar', help="Escenario (con --shared)")
+    parser.add_argument('--belt', type=int, default=0, help="Cuerpos del cinturón de asteroides (con --shared)")
+    parser.add_argument('--kuiper', type=int, default=0, help="Cuerpos del cinturón de Kuiper (con --shared)")
+    parser.add_argument('--dev', action='store_true',
+                        help="Servidor de desarrollo de Werkzeug sin terminal (pruebas de carga, CI)")
+    args = parser.parse_args()
+    
     print("=" * 60)
     print("🌌 SISTEMA SOLAR N-BODY")
     print("=" * 60)
-    print("📡 http://localhost:5000")
+    port = int(os.environ.get('PORT', 5000))
+    print(f"📡 http://localhost:{port}")
+    
+    if args.shared or args.attach:
+        # SIGTERM pasa por el finally: se detiene el proceso de simulación y se libera el bloque
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+        options = {'scenario': args.scenario, 'belt': args.belt, 'kuiper': args.kuiper}
+        shared = SharedSimulation(args.attach, options if args.shared else None)
+        print(f"🧠 Memoria compartida: {shared.name}")
+        if args.shared:
+            print(f"   Más procesos web: PORT=<puerto> python app.py --attach {shared.name}")
     print("=" * 60)
     
     initialize_simulation()
+    if shared is not None:
+        # El loop solo reenvía los frames publicados; la pausa la controla el proceso de simulación
+        start_loop()
     
-    # CORRECCIÓN: Sin allow_unsafe_werkzeug
-    socketio.run(
-        app,
-        debug=True,
-        host='0.0.0.0',
-        port=5000,
-        use_reloader=False
-    )
\ No newline at end of file
+    try:
+        # CORRECCIÓN: allow_unsafe_werkzeug solo con --dev explícito
+        socketio.run(
+            app,
+            debug=True,
+            host='0.0.0.0',
+            port=port,
+            use_reloader=False,
+            allow_unsafe_werkzeug=args.dev
+        )
+    finally:
+        if shared is not None:
+            # El loop lee el bloque: se detiene antes de liberarlo
+            simulation_running = False
+            simulation_thread.join(timeout=1.0)
+            shared.close()
\ No newline at end of file
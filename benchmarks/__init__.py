@@ -0,0 +1,4 @@
+# benchmarks/__init__.py
+"""
+Benchmarks de rendimiento para las rutas críticas del simulador
+"""
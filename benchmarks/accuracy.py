@@ -0,0 +1,227 @@
+# benchmarks/accuracy.py
+"""
+Precisión frente a coste de los integradores
+
+Barre método × time_step × N sobre un mismo intervalo simulado y, para
+cada combinación, mide tiempo de pared, evaluaciones de fuerza, deriva
+relativa de energía (compute_energy) y error de posición respecto a una
+referencia de alta precisión (DOP853 con tolerancias estrictas, evaluada
+con salida densa en el instante final de cada ejecución).
+
+El resultado es una tabla de Pareto error/coste por N: las filas
+marcadas con ★ no son superadas a la vez en coste y en error por
+ninguna otra, y con --target se indica la configuración más barata
+que cumple un error dado.
+
+Uso:
+    python -m benchmarks.accuracy                                   # barrido por defecto
+    python -m benchmarks.accuracy --methods verlet,rk4 --dts 1h,6h,1d --sizes 9,50 --span 2y
+    python -m benchmarks.accuracy --target 1000                     # error máximo en km
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from physics.batch import METHODS, parse_duration
+from benchmarks.run_benchmarks import make_simulator, warmup
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_PATH = os.path.join(BENCH_DIR, 'results', 'accuracy_latest.json')
+
+# Muestras de energía por ejecución para la deriva máxima (fuera del tiempo medido)
+ENERGY_SAMPLES = 20
+
+
+# ==================== Referencia ====================
+
+def reference_solution(simulator, span, rtol=1e-12):
+    """
+    Solución de referencia con DOP853 (orden 8, paso adaptativo)
+    
+    Returns:
+        callable t -> (posiciones, velocidades) en cualquier t de [t0, t0 + span]
+    """
+    from scipy.integrate import solve_ivp
+    
+    n = simulator.n_bodies
+    
+    def derivatives(t, state):
+        positions = state[:3 * n].reshape(n, 3)
+        accelerations = simulator.compute_accelerations(positions)
+        return np.concatenate([state[3 * n:], accelerations.ravel()])
+    
+    state = np.concatenate([simulator.positions.ravel(), simulator.velocities.ravel()])
+    # 1 m en posición y 1e-7 m/s en velocidad: muy por debajo de cualquier error medido
+    atol = np.concatenate([np.full(3 * n, 1.0), np.full(3 * n, 1e-7)])
+    t0 = simulator.time
+    solution = solve_ivp(derivatives, (t0, t0 + span), state, method='DOP853',
+                         rtol=rtol, atol=atol, dense_output=True)
+    if not solution.success:
+        raise RuntimeError(f"La referencia no convergió: {solution.message}")
+    
+    def at(t):
+        y = solution.sol(t)
+        return y[:3 * n].reshape(n, 3), y[3 * n:].reshape(n, 3)
+    
+    at.evaluations = solution.nfev
+    return at
+
+
+# ==================== Ejecuciones ====================
+
+def run_case(n, method, dt, span, reference, seed=0):
+    """Integra una combinación y la compara con la referencia"""
+    simulator = make_simulator(n, method=method, seed=seed)
+    simulator.time_step = dt
+    steps = max(1, int(round(span / dt)))
+    sample_every = max(1, steps // ENERGY_SAMPLES)
+    
+    energy_start = simulator.compute_energy()['total']
+    max_drift = 0.0
+    wall = 0.0
+    done = 0
+    with contextlib.redirect_stdout(io.StringIO()):
+        while done < steps:
+            chunk = min(sample_every, steps - done)
+            start = time.perf_counter()
+            for _ in range(chunk):
+                simulator.step()
+            wall += time.perf_counter() - start
+            done += chunk
+            drift = (simulator.compute_energy()['total'] - energy_start) / abs(energy_start)
+            max_drift = max(max_drift, abs(drift))
+    
+    positions, _ = reference(simulator.time)
+    error = np.linalg.norm(simulator.positions - positions, axis=1)
+    return {
+        'n': n,
+        'method': method,
+        'dt': dt,
+        'steps': steps,
+        'wall_time': wall,
+        'step_time': wall / steps,
+        'force_evaluations': simulator.force_evaluations,
+        'energy_drift': drift,
+        'max_energy_drift': max_drift,
+        'position_error_km': float(error.max()) / 1e3,
+        'position_rms_km': float(np.sqrt(np.mean(error ** 2))) / 1e3
+    }
+
+
+def pareto(rows):
+    """Marca las filas no dominadas en (wall_time, position_error_km)"""
+    best = np.inf
+    for row in sorted(rows, key=lambda r: (r['wall_time'], r['position_error_km'])):
+        row['pareto'] = row['position_error_km'] < best
+        best = min(best, row['position_error_km'])
+    return rows
+
+
+def cheapest(rows, target_km):
+    """Configuración más barata cuyo error de posición no supera target_km"""
+    valid = [row for row in rows if row['position_error_km'] <= target_km]
+    return min(valid, key=lambda r: r['wall_time']) if valid else None
+
+
+# ==================== Informe ====================
+
+def label_dt(seconds):
+    for unit, size in (('d', 86400), ('h', 3600), ('m', 60)):
+        if seconds >= size and seconds % size == 0:
+            return f"{seconds / size:g}{unit}"
+    return f"{seconds:g}s"
+
+
+def print_report(results, target_km=None):
+    for n, rows in results.items():
+        print(f"\n🪐 N = {n}")
+        print(f"{'':2}{'método':<17} {'dt':>5} {'pasos':>7} {'pared s':>9} {'fuerzas':>8} "
+              f"{'|ΔE/E| máx':>11} {'error km':>11} {'rms km':>11}")
+        print('-' * 88)
+        for row in sorted(rows, key=lambda r: r['wall_time']):
+            mark = '★ ' if row['pareto'] else '  '
+            print(f"{mark}{row['method']:<17} {label_dt(row['dt']):>5} {row['steps']:>7} "
+                  f"{row['wall_time']:>9.3f} {row['force_evaluations']:>8} "
+                  f"{row['max_energy_drift']:>11.2e} {row['position_error_km']:>11.3e} "
+                  f"{row['position_rms_km']:>11.3e}")
+        if target_km is not None:
+            choice = cheapest(rows, target_km)
+            if choice is None:
+                print(f"❌ Ninguna configuración alcanza {target_km:g} km")
+            else:
+                print(f"✅ Más barata con error <= {target_km:g} km: {choice['method']} "
+                      f"dt={label_dt(choice['dt'])} ({choice['wall_time']:.3f} s)")
+    print("\n★ = frontera de Pareto (ninguna otra es más barata y más precisa a la vez)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Precisión frente a coste de los integradores')
+    parser.add_argument('--methods', default=','.join(METHODS),
+                        help="Métodos separados por comas (por defecto todos)")
+    parser.add_argument('--dts', default='6h,1d,4d', help="Pasos de tiempo separados por comas")
+    parser.add_argument('--sizes', default='9,50', help="Números de cuerpos masivos separados por comas")
+    parser.add_argument('--span', default='1y', help="Intervalo simulado de cada ejecución")
+    parser.add_argument('--target', type=float, default=None,
+                        help="Error de posición máximo (km) para recomendar configuración")
+    parser.add_argument('--seed', type=int, default=0, help="Semilla de los cuerpos sintéticos")
+    parser.add_argument('--output', default=RESULTS_PATH, help="Archivo JSON de resultados")
+    args = parser.parse_args(argv)
+    
+    methods = [m.strip() for m in args.methods.split(',') if m.strip()]
+    unknown = [m for m in methods if m not in METHODS]
+    if unknown:
+        parser.error(f"Métodos desconocidos: {', '.join(unknown)} (disponibles: {', '.join(METHODS)})")
+    dts = [parse_duration(dt) for dt in args.dts.split(',')]
+    sizes = [int(n) for n in args.sizes.split(',')]
+    span = parse_duration(args.span)
+    
+    warmup()
+    results = {}
+    references = {}
+    for n in sizes:
+        with contextlib.redirect_stdout(io.StringIO()):
+            base = make_simulator(n, seed=args.seed)
+        start = time.perf_counter()
+        # Cubre el instante final de todas las ejecuciones (redondeo de span / dt)
+        reference = reference_solution(base, max(dt * max(1, round(span / dt)) for dt in dts))
+        references[n] = {'evaluations': reference.evaluations,
+                         'seconds': round(time.perf_counter() - start, 3)}
+        print(f"📐 Referencia N={n}: {reference.evaluations} evaluaciones, "
+              f"{references[n]['seconds']} s", file=sys.stderr)
+        
+        rows = []
+        for method in methods:
+            for dt in dts:
+                row = run_case(n, method, dt, span, reference, seed=args.seed)
+                print(f"⏱️  N={n} {method} dt={label_dt(dt)}: {row['wall_time']:.3f} s, "
+                      f"error {row['position_error_km']:.3e} km", file=sys.stderr)
+                rows.append(row)
+        results[n] = pareto(rows)
+    
+    print_report(results, args.target)
+    
+    report = {
+        'config': {'methods': methods, 'dts': dts, 'sizes': sizes, 'span': span, 'seed': args.seed},
+        'references': references,
+        'results': {str(n): rows for n, rows in results.items()}
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"💾 Resultados: {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,422 @@
+# benchmarks/loadtest.py
+"""
+Prueba de carga local del servidor Socket.IO
+
+Lanza N clientes python-socketio contra el servidor (app.py, también
+con --shared). Uno de ellos hace de controlador: inicia la simulación,
+rota la escala de tiempo y la reinicia a mitad de la prueba. Todos
+consultan además /api/state y /api/sphere_data.
+
+Se mide:
+- latencia de cada simulation_update (hora de recepción - 'timestamp' del payload)
+- frames perdidos (huecos en 'sequence')
+- latencia y errores HTTP por endpoint
+- CPU y memoria residente del proceso servidor (/proc, o psutil si está)
+
+El informe se guarda en benchmarks/results/loadtest_latest.json para
+planificar capacidad y comparar ejecuciones.
+
+Requiere el cliente de Socket.IO: pip install "python-socketio[client]"
+
+Uso:
+    python -m benchmarks.loadtest --spawn --clients 20 --duration 30
+    python -m benchmarks.loadtest --url http://localhost:5000 --server-pid 1234
+    python -m benchmarks.loadtest --spawn --max-p95-ms 250 --max-missed 0.05  # exit 1 si se superan
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_PATH = os.path.join(BENCH_DIR, 'results', 'loadtest_latest.json')
+
+# Escalas que recorre el cliente controlador
+TIME_SCALES = [1.0, 10.0, 100.0]
+ENDPOINTS = {
+    'state': '/api/state',
+    'sphere_data': '/api/sphere_data?radius=1&segments=32&rings=16',
+}
+
+
+# ==================== Utilidades ====================
+
+def summarize(values):
+    """Percentiles en milisegundos de una lista de segundos"""
+    if not values:
+        return {'count': 0, 'p50_ms': None, 'p95_ms': None, 'p99_ms': None, 'max_ms': None}
+    data = np.asarray(values) * 1000.0
+    p50, p95, p99 = np.percentile(data, [50, 95, 99])
+    return {
+        'count': len(values),
+        'p50_ms': round(float(p50), 2),
+        'p95_ms': round(float(p95), 2),
+        'p99_ms': round(float(p99), 2),
+        'max_ms': round(float(data.max()), 2)
+    }
+
+
+def wait_for_server(url, timeout=60.0):
+    """Espera a que el servidor responda en /api/state"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(url + ENDPOINTS['state'], timeout=2) as response:
+                if response.status == 200:
+                    return True
+        except (urllib.error.URLError, OSError):
+            pass
+        time.sleep(0.5)
+    return False
+
+
+# ==================== Monitor del servidor ====================
+
+class ServerMonitor:
+    """Muestrea CPU (%) y memoria residente (MB) de un proceso"""
+    
+    def __init__(self, pid, interval=0.5):
+        self.pid = pid
+        self.interval = interval
+        self.cpu = []
+        self.rss = []
+        self._stop = threading.Event()
+        self._thread = None
+        try:
+            import psutil
+            self._process = psutil.Process(pid)
+        except ImportError:
+            self._process = None
+    
+    def _cpu_seconds(self):
+        if self._process is not None:
+            times = self._process.cpu_times()
+            return times.user + times.system
+        with open(f'/proc/{self.pid}/stat') as f:
+            # El nombre del proceso puede contener espacios: campos tras ')'
+            fields = f.read().rsplit(')', 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+    
+    def _rss_mb(self):
+        if self._process is not None:
+            return self._process.memory_info().rss / 2**20
+        with open(f'/proc/{self.pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+        return 0.0
+    
+    def _run(self):
+        last_cpu, last_wall = self._cpu_seconds(), time.perf_counter()
+        self.rss.append(self._rss_mb())
+        while not self._stop.wait(self.interval):
+            try:
+                cpu, wall = self._cpu_seconds(), time.perf_counter()
+                self.cpu.append(100.0 * (cpu - last_cpu) / (wall - last_wall))
+                self.rss.append(self._rss_mb())
+                last_cpu, last_wall = cpu, wall
+            except (OSError, ValueError):
+                # El proceso terminó durante la prueba
+                break
+    
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return {
+            'pid': self.pid,
+            'cpu_avg_percent': round(float(np.mean(self.cpu)), 1) if self.cpu else None,
+            'cpu_max_percent': round(float(np.max(self.cpu)), 1) if self.cpu else None,
+            'rss_start_mb': round(self.rss[0], 1) if self.rss else None,
+            'rss_max_mb': round(max(self.rss), 1) if self.rss else None,
+        }
+
+
+# ==================== Clientes ====================
+
+class LoadClient:
+    """
+    Cliente Socket.IO que registra latencia y huecos de las actualizaciones
+    y consulta periódicamente los endpoints REST
+    """
+    
+    def __init__(self, index, url, controller=False, poll_interval=1.0):
+        import socketio
+        
+        self.index = index
+        self.url = url
+        self.controller = controller
+        self.poll_interval = poll_interval
+        self.latencies = []
+        self.updates = 0
+        self.missed = 0
+        self.last_sequence = None
+        self.http = {name: [] for name in ENDPOINTS}
+        self.http_errors = {name: 0 for name in ENDPOINTS}
+        self.errors = []
+        self.connected_at = None
+        
+        self.sio = socketio.Client(reconnection=False)
+        self.sio.on('simulation_update', self._on_update)
+        self.sio.on('error', lambda data: self.errors.append(str(data)))
+    
+    def _on_update(self, data):
+        received = time.time()
+        sequence = data.get('sequence')
+        timestamp = data.get('timestamp')
+        # La actualización inicial de 'connect' no lleva número de secuencia
+        if sequence is None or timestamp is None:
+            return
+        self.updates += 1
+        self.latencies.append(max(0.0, received - timestamp))
+        if self.last_sequence is not None and sequence > self.last_sequence + 1:
+            self.missed += sequence - self.last_sequence - 1
+        self.last_sequence = sequence
+    
+    def _poll(self, name):
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(self.url + ENDPOINTS[name], timeout=10) as response:
+                response.read()
+            self.http[name].append(time.perf_counter() - start)
+        except (urllib.error.URLError, OSError):
+            self.http_errors[name] += 1
+    
+    def run(self, stop_event, duration):
+        try:
+            self.sio.connect(self.url, transports=['websocket'], wait_timeout=10)
+        except Exception as e:
+            self.errors.append(f"connect: {e}")
+            return
+        self.connected_at = time.perf_counter()
+        
+        if self.controller:
+            self.sio.emit('start_simulation', {})
+        
+        start = time.perf_counter()
+        next_scale = 0
+        reset_done = False
+        names = list(ENDPOINTS)
+        polls = 0
+        while not stop_event.wait(self.poll_interval):
+            self._poll(names[polls % len(names)])
+            polls += 1
+            if not self.controller:
+                continue
+            elapsed = time.perf_counter() - start
+            # Rotar la escala cada ~1/4 de la prueba y reiniciar una vez a la mitad
+            if elapsed >= next_scale * duration / 4:
+                self.sio.emit('set_time_scale', {'scale': TIME_SCALES[next_scale % len(TIME_SCALES)]})
+                next_scale += 1
+            if not reset_done and elapsed >= duration / 2:
+                self.sio.emit('reset_simulation')
+                self.sio.emit('start_simulation', {})
+                reset_done = True
+        
+        self.sio.disconnect()
+    
+    def report(self, duration):
+        expected = self.updates + self.missed
+        return {
+            'client': self.index,
+            'controller': self.controller,
+            'updates': self.updates,
+            'updates_per_second': round(self.updates / duration, 2) if duration > 0 else 0,
+            'missed': self.missed,
+            'missed_fraction': round(self.missed / expected, 4) if expected else 0.0,
+            'latency': summarize(self.latencies),
+            'http': {name: summarize(values) for name, values in self.http.items()},
+            'http_errors': dict(self.http_errors),
+            'errors': self.errors[:10]
+        }
+
+
+# ==================== Ejecución ====================
+
+def spawn_server(port, script):
+    """Lanza el servidor en un subproceso con PORT=port (app.py --dev: sin terminal)"""
+    env = dict(os.environ, PORT=str(port), PYTHONUNBUFFERED='1')
+    log = open(os.path.join(BENCH_DIR, 'results', 'loadtest_server.log'), 'w')
+    process = subprocess.Popen([sys.executable] + script.split() + ['--dev'], cwd=ROOT, env=env,
+                               stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT)
+    return process, log
+
+
+def run_loadtest(args):
+    clients = [LoadClient(i, args.url, controller=(i == 0), poll_interval=args.poll_interval)
+               for i in range(args.clients)]
+    stop_event = threading.Event()
+    threads = []
+    
+    monitor = ServerMonitor(args.server_pid) if args.server_pid else None
+    if monitor is not None:
+        monitor.start()
+    
+    # Conexión escalonada durante la rampa
+    delay = args.ramp / max(1, args.clients)
+    start = time.perf_counter()
+    for client in clients:
+        thread = threading.Thread(target=client.run, args=(stop_event, args.duration), daemon=True)
+        thread.start()
+        threads.append(thread)
+        time.sleep(delay)
+    
+    time.sleep(max(0.0, args.duration - (time.perf_counter() - start)))
+    stop_event.set()
+    for thread in threads:
+        thread.join(timeout=15)
+    end = time.perf_counter()
+    elapsed = end - start
+    
+    per_client = [client.report(end - (client.connected_at or start)) for client in clients]
+    latencies = [value for client in clients for value in client.latencies]
+    updates = sum(client.updates for client in clients)
+    missed = sum(client.missed for client in clients)
+    
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'platform': {'python': platform.python_version(), 'machine': platform.machine(),
+                     'cpus': os.cpu_count()},
+        'config': {'url': args.url, 'clients': args.clients, 'duration': args.duration,
+                   'ramp': args.ramp, 'poll_interval': args.poll_interval},
+        'aggregate': {
+            'connected': sum(1 for client in clients if client.connected_at is not None),
+            'updates': updates,
+            'updates_per_second_per_client': round(updates / elapsed / max(1, args.clients), 2),
+            'missed': missed,
+            'missed_fraction': round(missed / (updates + missed), 4) if updates + missed else 0.0,
+            'latency': summarize(latencies),
+            'http': {name: summarize([v for client in clients for v in client.http[name]])
+                     for name in ENDPOINTS},
+            'http_errors': {name: sum(client.http_errors[name] for client in clients)
+                            for name in ENDPOINTS},
+        },
+        'server': monitor.stop() if monitor is not None else None,
+        'clients': per_client
+    }
+
+
+def print_report(report):
+    aggregate = report['aggregate']
+    print("\n" + "=" * 78)
+    print(f"{'cliente':>8} {'upd/s':>7} {'perdidos':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    print("-" * 78)
+    
+    def fmt(value):
+        return f"{value:8.1f}" if value is not None else f"{'-':>8}"
+    
+    for client in report['clients']:
+        latency = client['latency']
+        name = f"{client['client']}{'*' if client['controller'] else ''}"
+        print(f"{name:>8} {client['updates_per_second']:7.2f} {client['missed_fraction']:8.1%} "
+              f"{fmt(latency['p50_ms'])} {fmt(latency['p95_ms'])} {fmt(latency['p99_ms'])} {fmt(latency['max_ms'])}")
+    print("-" * 78)
+    latency = aggregate['latency']
+    print(f"{'total':>8} {aggregate['updates_per_second_per_client']:7.2f} {aggregate['missed_fraction']:8.1%} "
+          f"{fmt(latency['p50_ms'])} {fmt(latency['p95_ms'])} {fmt(latency['p99_ms'])} {fmt(latency['max_ms'])}")
+    print(f"\n🔌 Conectados: {aggregate['connected']}/{report['config']['clients']}   (* = controlador)")
+    for name, stats in aggregate['http'].items():
+        print(f"🌐 {ENDPOINTS[name].split('?')[0]:<18} n={stats['count']:<5} "
+              f"p50={fmt(stats['p50_ms']).strip()} ms  p95={fmt(stats['p95_ms']).strip()} ms  "
+              f"errores={aggregate['http_errors'][name]}")
+    server = report['server']
+    if server:
+        print(f"🖥️ Servidor {server['pid']}: CPU media {server['cpu_avg_percent']}% "
+              f"(máx {server['cpu_max_percent']}%), RSS {server['rss_start_mb']} → {server['rss_max_mb']} MB")
+    print("=" * 78)
+
+
+def check_thresholds(report, max_p95_ms, max_missed):
+    """Lista de umbrales superados (vacía si la ejecución es aceptable)"""
+    failures = []
+    aggregate = report['aggregate']
+    p95 = aggregate['latency']['p95_ms']
+    if aggregate['connected'] < report['config']['clients']:
+        failures.append(f"solo conectaron {aggregate['connected']}/{report['config']['clients']} clientes")
+    if max_p95_ms is not None and (p95 is None or p95 > max_p95_ms):
+        failures.append(f"latencia p95 {p95} ms > {max_p95_ms} ms")
+    if max_missed is not None and aggregate['missed_fraction'] > max_missed:
+        failures.append(f"frames perdidos {aggregate['missed_fraction']:.1%} > {max_missed:.1%}")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Prueba de carga Socket.IO del servidor de simulación')
+    parser.add_argument('--clients', type=int, default=10, help="Clientes simultáneos")
+    parser.add_argument('--duration', type=float, default=30.0, help="Duración en segundos")
+    parser.add_argument('--ramp', type=float, default=2.0, help="Segundos para conectar todos los clientes")
+    parser.add_argument('--poll-interval', type=float, default=1.0,
+                        help="Segundos entre consultas REST de cada cliente")
+    parser.add_argument('--url', default=None, help="Servidor existente (por defecto http://localhost:<port>)")
+    parser.add_argument('--port', type=int, default=5050, help="Puerto del servidor lanzado con --spawn")
+    parser.add_argument('--spawn', action='store_true', help="Lanzar el servidor en un subproceso")
+    parser.add_argument('--server', default='app.py',
+                        help="Script del servidor con --spawn; se le añade --dev (p. ej. 'app.py --shared --belt 100000')")
+    parser.add_argument('--server-pid', type=int, default=None, help="PID del servidor a monitorizar")
+    parser.add_argument('--output', default=RESULTS_PATH, help="Ruta del informe JSON")
+    parser.add_argument('--max-p95-ms', type=float, default=None, help="Umbral de latencia p95 (exit 1)")
+    parser.add_argument('--max-missed', type=float, default=None, help="Fracción máxima de frames perdidos (exit 1)")
+    args = parser.parse_args(argv)
+    
+    try:
+        import socketio  # noqa: F401
+    except ImportError:
+        print('❌ Falta el cliente de Socket.IO: pip install "python-socketio[client]"')
+        return 2
+    
+    os.makedirs(os.path.dirname(RESULTS_PATH), exist_ok=True)
+    process = log = None
+    if args.url is None:
+        args.url = f"http://localhost:{args.port}"
+    
+    if args.spawn:
+        process, log = spawn_server(args.port, args.server)
+        args.server_pid = process.pid
+        print(f"🚀 Servidor lanzado (pid {process.pid}) en {args.url}")
+    
+    try:
+        if not wait_for_server(args.url):
+            print(f"❌ El servidor no responde en {args.url}")
+            return 2
+        print(f"⏱️ {args.clients} clientes durante {args.duration:.0f}s...")
+        report = run_loadtest(args)
+    finally:
+        if process is not None:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+            log.close()
+    
+    print_report(report)
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"💾 Resultados: {args.output}")
+    
+    failures = check_thresholds(report, args.max_p95_ms, args.max_missed)
+    for failure in failures:
+        print(f"❌ {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,366 @@
+# benchmarks/run_benchmarks.py
+"""
+Suite de benchmarks para física, serialización y geometría
+
+Mide las rutas críticas del simulador y compara contra un baseline
+almacenado para detectar regresiones de rendimiento.
+
+Uso:
+    python -m benchmarks.run_benchmarks                  # ejecutar y comparar
+    python -m benchmarks.run_benchmarks --check          # exit 1 si hay regresión
+    python -m benchmarks.run_benchmarks --save-baseline  # actualizar baseline
+    python -m benchmarks.run_benchmarks --filter step    # solo casos que coincidan
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from physics.constants import AU, SUN_MASS
+from physics.events import EventDetector
+from physics.nbody import NBodySimulator, CelestialBody
+from physics.scenarios import add_asteroid_belt
+from physics.kernels import AutoKernel, available_backends, check_backend, get_backend
+from visualization.sphere_generator import ProceduralSphere
+from visualization.shader_math import ShaderMath
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(BENCH_DIR, 'baselines.json')
+RESULTS_PATH = os.path.join(BENCH_DIR, 'results', 'latest.json')
+
+# Factor máximo tolerado (actual / baseline) antes de marcar regresión
+DEFAULT_THRESHOLD = 1.30
+
+# Tamaños de los barridos
+STEP_SIZES = {'verlet': [10, 50, 100], 'rk4': [10, 25, 50]}
+STATE_SIZES = [10, 100, 1000]
+ENERGY_SIZES = [10, 100, 1000]
+SPHERE_RESOLUTIONS = [(16, 8), (64, 32), (256, 128)]
+KERNEL_SIZES = [500, 2000]
+EVENT_PARTICLES = [0, 20000]
+NOISE_SAMPLES = 1_000_000
+
+
+# ==================== Utilidades ====================
+
+def make_simulator(n_bodies, method='verlet', seed=0):
+    """
+    Crea un simulador con el sistema solar más cuerpos sintéticos
+    en órbitas circulares hasta completar n_bodies
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        sim = NBodySimulator(time_step=3600, method=method)
+        sim.initialize_solar_system()
+    
+    # 'auto' compila numba en segundo plano: se mide el régimen estable
+    if isinstance(sim.kernel, AutoKernel):
+        sim.kernel.warm_up(wait=True)
+    
+    rng = np.random.default_rng(seed)
+    for k in range(max(0, n_bodies - len(sim.bodies))):
+        r = rng.uniform(2.1, 3.3) * AU
+        phi = rng.uniform(0, 2 * np.pi)
+        v = np.sqrt(6.67430e-11 * SUN_MASS / r)
+        sim.add_body(CelestialBody(
+            name=f'Sintético {k}',
+            mass=rng.uniform(1e15, 1e20),
+            radius=rng.uniform(1e3, 5e5),
+            position=[r * np.cos(phi), 0.0, r * np.sin(phi)],
+            velocity=[-v * np.sin(phi), 0.0, v * np.cos(phi)],
+            color=[0.6, 0.6, 0.6]
+        ))
+    return sim
+
+
+def measure(func, repeat=5, number=1, setup=None):
+    """
+    Ejecuta func `number` veces por repetición y devuelve estadísticas
+    en segundos por operación
+    """
+    samples = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            for _ in range(number):
+                func()
+            elapsed = time.perf_counter() - start
+        samples.append(elapsed / number)
+    
+    samples.sort()
+    return {
+        'seconds': samples[len(samples) // 2],
+        'min': samples[0],
+        'max': samples[-1],
+        'repeat': repeat,
+        'number': number
+    }
+
+
+# ==================== Casos ====================
+
+def bench_step():
+    """Throughput de NBodySimulator.step vs N para cada método"""
+    for method, sizes in STEP_SIZES.items():
+        for n in sizes:
+            sim = make_simulator(n, method=method)
+            sim.step()  # calentamiento
+            number = 3 if method == 'verlet' else 1
+            stats = measure(sim.step, repeat=5, number=number)
+            stats['unit'] = 's/step'
+            stats['steps_per_second'] = 1.0 / stats['seconds']
+            yield f'step_{method}_n{n}', stats
+
+
+def bench_state():
+    """Coste de get_state más codificación JSON"""
+    for n in STATE_SIZES:
+        sim = make_simulator(n)
+        for _ in range(20):
+            for body in sim.bodies:
+                body.add_to_trail()
+        
+        stats = measure(lambda: json.dumps(sim.get_state()), repeat=5, number=5)
+        stats['unit'] = 's/call'
+        with contextlib.redirect_stdout(io.StringIO()):
+            stats['bytes'] = len(json.dumps(sim.get_state()))
+        yield f'get_state_json_n{n}', stats
+
+
+def bench_energy():
+    """Coste de compute_energy vs N"""
+    for n in ENERGY_SIZES:
+        sim = make_simulator(n)
+        stats = measure(sim.compute_energy, repeat=5, number=3)
+        stats['unit'] = 's/call'
+        yield f'compute_energy_n{n}', stats
+
+
+def bench_sphere():
+    """ProceduralSphere.generate_sphere_vertices a distintas resoluciones"""
+    for segments, rings in SPHERE_RESOLUTIONS:
+        stats = measure(
+            lambda: ProceduralSphere.generate_sphere_vertices(
+                radius=1.0, segments=segments, rings=rings
+            ),
+            repeat=5, number=3
+        )
+        stats['unit'] = 's/call'
+        stats['vertices'] = (segments + 1) * (rings + 1)
+        yield f'sphere_vertices_{segments}x{rings}', stats
+
+
+def bench_noise():
+    """Ruido de ShaderMath normalizado a segundos por millón de muestras"""
+    rng = np.random.default_rng(0)
+    x, y, z = rng.uniform(-10, 10, size=(3, NOISE_SAMPLES))
+    scale = 1_000_000 / NOISE_SAMPLES
+    
+    cases = {
+        'noise3d': lambda: ShaderMath._noise3d(x, y, z),
+        'perlin_noise_3d': lambda: ShaderMath.perlin_noise_3d(x, y, z),
+        'turbulence': lambda: ShaderMath.turbulence(x, y, z, size=16),
+    }
+    for name, func in cases.items():
+        stats = measure(func, repeat=5, number=1)
+        for key in ('seconds', 'min', 'max'):
+            stats[key] *= scale
+        stats['unit'] = 's/Msample'
+        yield f'{name}_per_million', stats
+
+
+def bench_events():
+    """Coste por paso con EventDetector y sobrecoste relativo frente al paso sin él"""
+    for particles in EVENT_PARTICLES:
+        sim = make_simulator(10)
+        if particles:
+            with contextlib.redirect_stdout(io.StringIO()):
+                add_asteroid_belt(sim, particles, seed=0)
+        sim.step()
+        plain = measure(sim.step, repeat=5, number=3)
+        
+        sim.event_detector = EventDetector()
+        sim.step()  # primera construcción de las listas de candidatos
+        stats = measure(sim.step, repeat=5, number=3)
+        stats['unit'] = 's/step'
+        stats['overhead'] = stats['seconds'] / plain['seconds'] - 1.0
+        stats['rebuilds'] = sim.event_detector.rebuilds
+        yield f'step_events_p{particles}', stats
+
+
+def bench_kernels():
+    """Verificación y coste de cada backend de fuerzas disponible"""
+    rng = np.random.default_rng(0)
+    for backend in available_backends():
+        kernel = get_backend(backend)
+        error = check_backend(kernel)
+        for n in KERNEL_SIZES:
+            positions = rng.normal(scale=AU, size=(n, 3))
+            masses = 10.0 ** rng.uniform(15, 25, n)
+            radii = np.zeros(n)
+            kernel.accelerations(positions, masses, radii)  # calentamiento / compilación
+            stats = measure(lambda: kernel.accelerations(positions, masses, radii), repeat=5)
+            stats['unit'] = 's/call'
+            stats['max_rel_error'] = error
+            yield f'kernel_{backend}_n{n}', stats
+
+
+def bench_startup():
+    """Arranque en frío de la CLI headless (proceso nuevo, paso mínimo)"""
+    command = [sys.executable, os.path.join(ROOT, 'cli.py'), '--span', '1h', '--quiet']
+    cases = {
+        'cold_start_cli': command,
+        'cold_start_import_physics': [sys.executable, '-c', 'import physics'],
+    }
+    for name, cmd in cases.items():
+        stats = measure(
+            lambda: subprocess.run(cmd, cwd=ROOT, check=True, stdout=subprocess.DEVNULL),
+            repeat=5
+        )
+        stats['unit'] = 's/process'
+        yield name, stats
+
+
+BENCHMARKS = {
+    'step': bench_step,
+    'events': bench_events,
+    'kernels': bench_kernels,
+    'state': bench_state,
+    'energy': bench_energy,
+    'sphere': bench_sphere,
+    'noise': bench_noise,
+    'startup': bench_startup,
+}
+
+
+# ==================== Baseline y reporte ====================
+
+def environment_info():
+    """Información del entorno para contextualizar los resultados"""
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count()
+    }
+
+
+def load_baseline(path=BASELINE_PATH):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(results, baseline):
+    """
+    Compara resultados con el baseline
+    
+    Returns:
+        lista de (caso, actual, baseline, ratio, umbral, regresión)
+    """
+    rows = []
+    if baseline is None:
+        return rows
+    
+    thresholds = baseline.get('thresholds', {})
+    default = thresholds.get('default', DEFAULT_THRESHOLD)
+    for case, stats in results.items():
+        base = baseline.get('results', {}).get(case)
+        if base is None:
+            continue
+        # Se compara el mínimo: es el estimador menos sensible al ruido del sistema
+        ratio = stats['min'] / base['min'] if base['min'] > 0 else float('inf')
+        threshold = thresholds.get(case, default)
+        rows.append((case, stats['min'], base['min'], ratio, threshold, ratio > threshold))
+    return rows
+
+
+def print_report(results, rows):
+    by_case = {row[0]: row for row in rows}
+    print(f"{'caso':<36} {'actual':>12} {'baseline':>12} {'ratio':>7}")
+    print('-' * 70)
+    for case, stats in results.items():
+        row = by_case.get(case)
+        current = f"{stats['min']:.3e}"
+        if row is None:
+            print(f"{case:<36} {current:>12} {'—':>12} {'—':>7}")
+            continue
+        mark = '  ❌' if row[5] else ''
+        print(f"{case:<36} {current:>12} {row[2]:>12.3e} {row[3]:>7.2f}{mark}")
+
+
+def warmup(seconds=2.0):
+    """Carga la CPU antes de medir para estabilizar frecuencia y cachés"""
+    a = np.random.default_rng(0).random((256, 256))
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        a = np.sin(a) @ a.T
+        a /= np.abs(a).max()
+
+
+def run(selected=None):
+    warmup()
+    results = {}
+    for group, bench in BENCHMARKS.items():
+        if selected and not any(s in group for s in selected):
+            continue
+        for case, stats in bench():
+            print(f"⏱️  {case}: {stats['min']:.3e} {stats['unit']}", file=sys.stderr)
+            results[case] = stats
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmarks del simulador N-body')
+    parser.add_argument('--filter', nargs='*', help='Grupos a ejecutar (' + ', '.join(BENCHMARKS) + ')')
+    parser.add_argument('--output', default=RESULTS_PATH, help='Archivo JSON de resultados')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='Archivo JSON de baseline')
+    parser.add_argument('--save-baseline', action='store_true', help='Guardar resultados como baseline')
+    parser.add_argument('--check', action='store_true', help='Salir con código 1 si hay regresiones')
+    args = parser.parse_args(argv)
+    
+    results = run(args.filter)
+    report = {'meta': environment_info(), 'results': results}
+    
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    
+    baseline = load_baseline(args.baseline)
+    rows = compare(results, baseline)
+    print_report(results, rows)
+    
+    if args.save_baseline:
+        merged = baseline or {'thresholds': {'default': DEFAULT_THRESHOLD}, 'results': {}}
+        merged['meta'] = report['meta']
+        merged['results'].update(results)
+        with open(args.baseline, 'w') as f:
+            json.dump(merged, f, indent=2, sort_keys=True)
+        print(f"💾 Baseline guardado en {args.baseline}")
+    
+    regressions = [row for row in rows if row[5]]
+    if regressions:
+        print(f"⚠️  {len(regressions)} regresiones sobre el umbral")
+        if args.check:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
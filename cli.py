@@ -0,0 +1,130 @@
+# cli.py
+"""
+Punto de entrada por línea de comandos para simulaciones sin servidor web
+
+No importa Flask/Socket.IO; scipy solo se carga si se usa rk4.
+El resumen final incluye el tiempo de arranque del proceso.
+
+Ejemplos:
+    python cli.py --span 10y --out runs/demo
+    python cli.py --span 100y --dt 1d --method rk4 --stride 30 --out runs/rk4
+    python cli.py --span 1y --belt 100000 --checkpoint-every 90d --out runs/belt
+    python cli.py --span 1y --resume runs/belt/checkpoint_000002160.npz --out runs/belt2
+"""
+
+import time
+
+_PROCESS_START = time.perf_counter()
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+
+from physics.batch import METHODS, build_simulator, check_duration, parse_duration, run_batch, save_trajectory
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Simulación N-body por lotes (headless)')
+    parser.add_argument('--scenario', default='solar',
+                        help="Escenario base: solar, solar-elements o empty")
+    parser.add_argument('--span', default='1y', help="Tiempo simulado total (ej. 10y, 36h, 3600)")
+    parser.add_argument('--dt', default='3600', help="Paso de tiempo (ej. 1h, 3600)")
+    parser.add_argument('--method', default='verlet', choices=METHODS, help="Integrador")
+    parser.add_argument('--backend', default='auto', help="Backend de fuerzas (ver physics.kernels)")
+    parser.add_argument('--belt', type=int, default=0, help="Cuerpos del cinturón de asteroides")
+    parser.add_argument('--kuiper', type=int, default=0, help="Cuerpos del cinturón de Kuiper")
+    parser.add_argument('--catalog', help="Catálogo CSV/NPZ a cargar")
+    parser.add_argument('--massive', action='store_true',
+                        help="Cargar cinturones/catálogo como cuerpos masivos en lugar de partículas de prueba")
+    parser.add_argument('--seed', type=int, default=None, help="Semilla de generación")
+    parser.add_argument('--resume', help="Checkpoint .npz desde el que continuar")
+    parser.add_argument('--stride', type=int, default=1, help="Guardar un frame cada N pasos")
+    parser.add_argument('--particles', action='store_true', help="Incluir partículas en la trayectoria")
+    parser.add_argument('--checkpoint-every', default=None,
+                        help="Intervalo simulado entre checkpoints (ej. 30d)")
+    parser.add_argument('--out', default=None, help="Directorio de salida (trayectoria y checkpoints)")
+    parser.add_argument('--quiet', action='store_true', help="Solo imprimir el resumen JSON")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    
+    try:
+        span = check_duration(parse_duration(args.span), 'span')
+        time_step = check_duration(parse_duration(args.dt), 'dt')
+        every = None
+        if args.checkpoint_every:
+            every = check_duration(parse_duration(args.checkpoint_every), 'checkpoint-every')
+    except ValueError as e:
+        parser.error(str(e))
+    
+    log = io.StringIO() if args.quiet else sys.stderr
+    with contextlib.redirect_stdout(log):
+        simulator = build_simulator(
+            scenario=args.scenario,
+            method=args.method,
+            time_step=time_step,
+            backend=args.backend,
+            belt=args.belt,
+            kuiper=args.kuiper,
+            catalog=args.catalog,
+            massless=not args.massive,
+            seed=args.seed,
+            checkpoint=args.resume
+        )
+    startup = time.perf_counter() - _PROCESS_START
+    
+    checkpoint_every = 0
+    if args.out:
+        os.makedirs(args.out, exist_ok=True)
+        if every:
+            checkpoint_every = max(1, int(round(every / time_step)))
+    
+    def progress(fraction):
+        if not args.quiet:
+            print(f"\r⏳ {fraction * 100:5.1f}%", end='', file=sys.stderr, flush=True)
+    
+    with contextlib.redirect_stdout(log):
+        result = run_batch(
+            simulator, span,
+            stride=args.stride,
+            include_particles=args.particles,
+            checkpoint_every=checkpoint_every,
+            checkpoint_dir=args.out,
+            progress=progress
+        )
+    if not args.quiet:
+        print(file=sys.stderr)
+    
+    trajectory = None
+    if args.out:
+        trajectory = os.path.join(args.out, 'trajectory.npz')
+        save_trajectory(trajectory, simulator, result)
+        simulator.save_checkpoint(os.path.join(args.out, 'final.npz'))
+    
+    summary = {
+        'scenario': args.scenario,
+        'method': simulator.method,
+        'bodies': simulator.n_bodies,
+        'test_particles': simulator.n_test_particles,
+        'time_step': simulator.time_step,
+        'steps': result['steps'],
+        'sim_time': simulator.time,
+        'wall_time': round(result['wall_time'], 6),
+        'steps_per_second': round(result['steps_per_second'], 3),
+        'energy_drift': result['energy_drift'],
+        'startup_seconds': round(startup, 6),
+        'trajectory': trajectory,
+        'checkpoints': len(result['checkpoints'])
+    }
+    print(json.dumps(summary, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -6,8 +6,12 @@ Módulo de física para simulación N-body
 from .constants import G, AU, DAY, SOLAR_SYSTEM_DATA, SCALE_FACTORS
 from .nbody import NBodySimulator, CelestialBody
 from .integrator import Integrator
+from .orbital_elements import solve_kepler, elements_to_state_vectors
+from .kernels import available_backends, get_backend, register_backend
 
 __all__ = [
     'G', 'AU', 'DAY', 'SOLAR_SYSTEM_DATA', 'SCALE_FACTORS',
-    'NBodySimulator', 'CelestialBody', 'Integrator'
+    'NBodySimulator', 'CelestialBody', 'Integrator',
+    'solve_kepler', 'elements_to_state_vectors',
+    'available_backends', 'get_backend', 'register_backend'
 ]
@@ -0,0 +1,179 @@
+# physics/batch.py
+"""
+Ejecución por lotes de escenarios, sin servidor web
+Compartido por la CLI (cli.py) y por procesos de trabajo en segundo plano
+"""
+
+import math
+import os
+import time
+
+import numpy as np
+
+from .constants import DAY
+from .integrator import Integrator
+from .nbody import NBodySimulator
+from . import scenarios
+
+# Sufijos aceptados para duraciones ('10y', '36h', '3600')
+TIME_UNITS = {
+    's': 1.0,
+    'm': 60.0,
+    'h': 3600.0,
+    'd': float(DAY),
+    'y': 365.25 * DAY
+}
+
+SCENARIOS = ('solar', 'solar-elements', 'empty')
+METHODS = Integrator.METHODS + ('rk4',)
+
+
+def parse_duration(text):
+    """Convierte '10y', '36h', '2.5d' o '3600' a segundos"""
+    text = str(text).strip()
+    unit = text[-1:].lower()
+    if unit in TIME_UNITS:
+        return float(text[:-1]) * TIME_UNITS[unit]
+    return float(text)
+
+
+def check_duration(value, name):
+    """Devuelve value si es una duración positiva y finita (ValueError si no)"""
+    if not (math.isfinite(value) and value > 0):
+        raise ValueError(f"'{name}' debe ser positivo y finito")
+    return value
+
+
+def build_simulator(scenario='solar', method='verlet', time_step=3600, backend='auto',
+                    belt=0, kuiper=0, catalog=None, massless=True, seed=None, checkpoint=None):
+    """
+    Construye un simulador a partir de una descripción de escenario
+    
+    Args:
+        scenario: 'solar', 'solar-elements' (planetas desde elementos orbitales) o 'empty'
+        belt, kuiper: número de cuerpos del cinturón de asteroides / de Kuiper
+        catalog: ruta a un catálogo CSV/NPZ
+        massless: cargar cinturones y catálogo como partículas de prueba
+        checkpoint: archivo .npz desde el que continuar
+    """
+    if scenario not in SCENARIOS:
+        raise ValueError(f"Escenario desconocido: {scenario}")
+    if method not in METHODS:
+        raise ValueError(f"Método desconocido: {method}")
+    check_duration(time_step, 'dt')
+    
+    sim = NBodySimulator(time_step=time_step, method=method, backend=backend)
+    if scenario != 'empty':
+        sim.initialize_solar_system(use_orbital_elements=(scenario == 'solar-elements'))
+    
+    if belt:
+        scenarios.add_asteroid_belt(sim, belt, seed=seed, massless=massless)
+    if kuiper:
+        scenarios.add_kuiper_belt(sim, kuiper, seed=None if seed is None else seed + 1, massless=massless)
+    if catalog:
+        scenarios.load_catalog(sim, catalog, massless=massless)
+    if checkpoint:
+        sim.load_checkpoint(checkpoint)
+    return sim
+
+
+def run_batch(simulator, span, stride=1, include_particles=False,
+              checkpoint_every=0, checkpoint_dir=None, progress=None, should_stop=None,
+              progress_reports=100):
+    """
+    Integra el simulador durante `span` segundos guardando la trayectoria
+    
+    Args:
+        span: tiempo simulado total (s)
+        stride: guardar un frame cada `stride` pasos
+        include_particles: guardar también las posiciones de las partículas de prueba (float32)
+        checkpoint_every: pasos entre checkpoints (0 = ninguno)
+        checkpoint_dir: directorio de los checkpoints
+        progress: callback(fracción completada) llamado ~progress_reports veces
+        should_stop: callable que devuelve True para cancelar
+    
+    Returns:
+        dict con times, positions, velocities (y particle_positions) más estadísticas
+    """
+    check_duration(span, 'span')
+    check_duration(simulator.time_step, 'dt')
+    steps = max(0, int(round(span / simulator.time_step)))
+    stride = max(1, int(stride))
+    frames = steps // stride + 1
+    
+    times = np.empty(frames)
+    positions = np.empty((frames, simulator.n_bodies, 3))
+    velocities = np.empty((frames, simulator.n_bodies, 3))
+    particles = None
+    if include_particles and simulator.n_test_particles:
+        particles = np.empty((frames, simulator.n_test_particles, 3), dtype=np.float32)
+    
+    def record(frame):
+        times[frame] = simulator.time
+        positions[frame] = simulator.positions
+        velocities[frame] = simulator.velocities
+        if particles is not None:
+            particles[frame] = simulator.test_positions
+    
+    checkpoints = []
+    report_every = max(1, steps // max(1, int(progress_reports)))
+    energy_start = simulator.compute_energy()
+    start = time.perf_counter()
+    
+    record(0)
+    frame = 0
+    done = 0
+    cancelled = False
+    for done in range(1, steps + 1):
+        if should_stop is not None and should_stop():
+            cancelled = True
+            done -= 1
+            break
+        
+        simulator.step()
+        
+        if done % stride == 0:
+            frame += 1
+            record(frame)
+        if checkpoint_every and checkpoint_dir and done % checkpoint_every == 0:
+            path = os.path.join(checkpoint_dir, f'checkpoint_{done:09d}.npz')
+            simulator.save_checkpoint(path)
+            checkpoints.append(path)
+        if progress is not None and done % report_every == 0:
+            progress(done / steps)
+    
+    wall_time = time.perf_counter() - start
+    energy_end = simulator.compute_energy()
+    drift = (energy_end['total'] - energy_start['total']) / abs(energy_start['total']) \
+        if energy_start['total'] else 0.0
+    
+    result = {
+        'times': times[:frame + 1],
+        'positions': positions[:frame + 1],
+        'velocities': velocities[:frame + 1],
+        'steps': done,
+        'cancelled': cancelled,
+        'wall_time': wall_time,
+        'steps_per_second': done / wall_time if wall_time > 0 else 0.0,
+        'energy_start': energy_start,
+        'energy_end': energy_end,
+        'energy_drift': drift,
+        'checkpoints': checkpoints
+    }
+    if particles is not None:
+        result['particle_positions'] = particles[:frame + 1]
+    return result
+
+
+def save_trajectory(path, simulator, result, compressed=False):
+    """Guarda la trayectoria de run_batch en un archivo .npz (comprimido si compressed)"""
+    arrays = {
+        'times': result['times'],
+        'positions': result['positions'],
+        'velocities': result['velocities'],
+        'masses': simulator.masses,
+        'names': np.array([body.name for body in simulator.bodies])
+    }
+    if 'particle_positions' in result:
+        arrays['particle_positions'] = result['particle_positions']
+    (np.savez_compressed if compressed else np.savez)(path, **arrays)
@@ -25,6 +25,7 @@ SCALE_FACTORS = {
 SUN_MASS = 1.989e30
 
 # Datos reales con ÓRBITAS EN EL PLANO XZ
+# Ángulos de orbital_elements en grados; nodo, perihelio y longitud media de J2000
 SOLAR_SYSTEM_DATA = {
     'sun': {
         'name': 'Sol',
@@ -49,6 +50,9 @@ SOLAR_SYSTEM_DATA = {
             'semi_major_axis': 0.387 * AU,
             'eccentricity': 0.206,
             'inclination': 7.0,
+            'longitude_of_node': 48.33,
+            'longitude_of_perihelion': 77.46,
+            'mean_longitude': 252.25,
             'period': 87.97 * DAY
         }
     },
@@ -64,6 +68,9 @@ SOLAR_SYSTEM_DATA = {
             'semi_major_axis': 0.723 * AU,
             'eccentricity': 0.007,
             'inclination': 3.4,
+            'longitude_of_node': 76.68,
+            'longitude_of_perihelion': 131.6,
+            'mean_longitude': 181.98,
             'period': 224.7 * DAY
         }
     },
@@ -79,6 +86,9 @@ SOLAR_SYSTEM_DATA = {
             'semi_major_axis': 1.0 * AU,
             'eccentricity': 0.017,
             'inclination': 0.0,
+            'longitude_of_node': 0.0,
+            'longitude_of_perihelion': 102.94,
+            'mean_longitude': 100.46,
             'period': 365.25 * DAY
         }
     },
@@ -94,6 +104,9 @@ SOLAR_SYSTEM_DATA = {
             'semi_major_axis': 1.524 * AU,
             'eccentricity': 0.093,
             'inclination': 1.85,
+            'longitude_of_node': 49.56,
+            'longitude_of_perihelion': 336.06,
+            'mean_longitude': 355.45,
             'period': 686.98 * DAY
         }
     },
@@ -109,6 +122,9 @@ SOLAR_SYSTEM_DATA = {
             'semi_major_axis': 5.203 * AU,
             'eccentricity': 0.048,
             'inclination': 1.3,
+            'longitude_of_node': 100.47,
+            'longitude_of_perihelion': 14.73,
+            'mean_longitude': 34.4,
             'period': 4332.59 * DAY
         }
     },
@@ -131,6 +147,9 @@ SOLAR_SYSTEM_DATA = {
             'semi_major_axis': 9.537 * AU,
             'eccentricity': 0.056,
             'inclination': 2.5,
+            'longitude_of_node': 113.66,
+            'longitude_of_perihelion': 92.6,
+            'mean_longitude': 49.95,
             'period': 10759.22 * DAY
         }
     },
@@ -146,6 +165,9 @@ SOLAR_SYSTEM_DATA = {
             'semi_major_axis': 19.191 * AU,
             'eccentricity': 0.047,
             'inclination': 0.8,
+            'longitude_of_node': 74.02,
+            'longitude_of_perihelion': 170.95,
+            'mean_longitude': 313.24,
             'period': 30688.5 * DAY
         }
     },
@@ -161,6 +183,9 @@ SOLAR_SYSTEM_DATA = {
             'semi_major_axis': 30.069 * AU,
             'eccentricity': 0.009,
             'inclination': 1.8,
+            'longitude_of_node': 131.78,
+            'longitude_of_perihelion': 44.96,
+            'mean_longitude': 304.88,
             'period': 60182 * DAY
         }
     }
@@ -0,0 +1,376 @@
+# physics/events.py
+"""
+Detección vectorizada de encuentros cercanos y conjunciones
+Se evalúa tras cada paso sobre la trayectoria interpolada entre el
+estado anterior y el actual
+"""
+
+from collections import deque
+
+import numpy as np
+
+from .constants import AU
+
+DEFAULT_ENCOUNTER_DISTANCE = 0.05 * AU
+DEFAULT_CONJUNCTION_ANGLE = 2.0  # grados
+
+
+def hermite(p0, p1, v0, v1, dt, s):
+    """
+    Interpolación cúbica de Hermite entre dos estados (posición y velocidad)
+    s ∈ [0, 1] es la fracción del paso; s tiene forma (K,) y p/v (K, 3)
+    """
+    s = s[:, np.newaxis]
+    s2 = s * s
+    s3 = s2 * s
+    return ((2 * s3 - 3 * s2 + 1) * p0 + (s3 - 2 * s2 + s) * dt * v0 +
+            (-2 * s3 + 3 * s2) * p1 + (s3 - s2) * dt * v1)
+
+
+def first_crossing(func, count, samples=8, iterations=40, chunk=8192):
+    """
+    Primer s ∈ [0, 1] donde func(s) <= 0, vectorizado sobre `count` curvas
+    
+    func(s, rows) recibe s de forma (len(rows),) y los índices (pueden
+    repetirse) de las curvas a evaluar, o None para todas. Las muestras de
+    `samples` intervalos se evalúan en una sola llamada por bloque de
+    `chunk` curvas y solo las curvas que cruzan se refinan por bisección.
+    Devuelve (found, s_root, values) con values las muestras de forma
+    (count, samples + 1), reutilizables por refine_minimum.
+    """
+    points = samples + 1
+    grid = np.linspace(0.0, 1.0, points)
+    values = np.empty((count, points))
+    for start in range(0, count, chunk):
+        idx = np.arange(start, min(count, start + chunk))
+        values[idx] = func(np.tile(grid, len(idx)), np.repeat(idx, points)).reshape(len(idx), points)
+    
+    inside = values <= 0
+    found = inside.any(axis=1)
+    k = np.argmax(inside, axis=1)
+    
+    root = np.zeros(count)
+    rows = np.flatnonzero(found & (k > 0))
+    if len(rows):
+        lo = grid[k[rows] - 1]
+        hi = grid[k[rows]]
+        for _ in range(iterations):
+            mid = 0.5 * (lo + hi)
+            below = func(mid, rows) <= 0
+            hi = np.where(below, mid, hi)
+            lo = np.where(below, lo, mid)
+        root[rows] = hi
+    return found, root, values
+
+
+def refine_minimum(func, values, rows, iterations=40):
+    """
+    Mínimo de func en [0, 1] a partir de las muestras de first_crossing
+    Solo las curvas en `rows` se refinan por sección dorada alrededor de
+    la mejor muestra; el resto conserva el mínimo muestreado.
+    Devuelve (f_min, s_min).
+    """
+    count, points = values.shape
+    grid = np.linspace(0.0, 1.0, points)
+    k_min = np.argmin(values, axis=1)
+    f_min = values[np.arange(count), k_min]
+    s_min = grid[k_min]
+    
+    if len(rows):
+        a = grid[np.maximum(k_min[rows] - 1, 0)]
+        b = grid[np.minimum(k_min[rows] + 1, points - 1)]
+        ratio = (np.sqrt(5.0) - 1.0) / 2.0
+        for _ in range(iterations):
+            c = b - ratio * (b - a)
+            d = a + ratio * (b - a)
+            left = func(c, rows) < func(d, rows)
+            b = np.where(left, d, b)
+            a = np.where(left, a, c)
+        s_min[rows] = 0.5 * (a + b)
+        f_min[rows] = np.minimum(func(s_min[rows], rows), f_min[rows])
+    return f_min, s_min
+
+
+class EventDetector:
+    """
+    Detector de eventos entre pasos
+    
+    - Encuentro cercano: dos cuerpos (masivo-masivo o masivo-partícula de
+      prueba) a menos de encounter_distance. Emite 'start' con el instante
+      de cruce y 'end' con la distancia mínima alcanzada.
+    - Conjunción: dos cuerpos con nombre alineados vistos desde el cuerpo
+      central, con separación angular menor que conjunction_angle.
+    
+    Fase amplia: listas de candidatos (Verlet lists) construidas con un
+    KD-tree para el radio umbral + skin, que se reconstruyen solo cuando
+    el desplazamiento acumulado puede invalidarlas. Ese desplazamiento se
+    acota sumando max|v|·dt de cada paso, sin recorrer las posiciones.
+    Fase estrecha: raíces sobre la interpolación de Hermite de cada par
+    candidato.
+    """
+    
+    def __init__(self, encounter_distance=DEFAULT_ENCOUNTER_DISTANCE,
+                 conjunction_angle=DEFAULT_CONJUNCTION_ANGLE,
+                 include_particles=True, skin=None, max_events=1000):
+        self.encounter_distance = encounter_distance
+        self.conjunction_angle = conjunction_angle
+        self.include_particles = include_particles
+        self.skin = encounter_distance if skin is None else skin
+        
+        self.pending = deque(maxlen=max_events)
+        self.rebuilds = 0
+        
+        self._built = None  # (arreglos, tiempo) con los que se construyeron las listas
+        self._mm_pairs = np.zeros((0, 2), dtype=np.intp)
+        self._mt_pairs = np.zeros((0, 2), dtype=np.intp)
+        self._drift = 0.0  # cota del desplazamiento acumulado desde la reconstrucción
+        self._last_speed = 0.0
+        self._last_step_disp = 0.0
+        self._time = None  # instante tras el último paso observado
+        self._active = {}  # par -> distancia mínima durante el encuentro
+        self._conjunctions = set()
+        self._prev = None
+    
+    # ==================== Fase amplia ====================
+    
+    @staticmethod
+    def _max_norm(vectors):
+        if len(vectors) == 0:
+            return 0.0
+        return float(np.sqrt(np.max(np.einsum('ij,ij->i', vectors, vectors))))
+    
+    def invalidate(self):
+        """Fuerza la reconstrucción de las listas antes del próximo paso"""
+        self._built = None
+    
+    def _rebuild(self, sim):
+        """Reconstruye las listas de pares candidatos"""
+        from scipy.spatial import cKDTree
+        
+        radius = self.encounter_distance + self.skin
+        tree = cKDTree(sim.positions)
+        self._mm_pairs = tree.query_pairs(radius, output_type='ndarray')
+        
+        self._mt_pairs = np.zeros((0, 2), dtype=np.intp)
+        if self.include_particles and sim.n_test_particles:
+            test_tree = cKDTree(sim.test_positions)
+            sparse = tree.sparse_distance_matrix(test_tree, radius, output_type='ndarray')
+            self._mt_pairs = np.column_stack([sparse['i'], sparse['j']]).astype(np.intp)
+        
+        self._built = (sim.positions, sim.test_positions)
+        self._time = sim.time
+        self._drift = 0.0
+        self.rebuilds += 1
+    
+    def begin(self, sim):
+        """Se llama antes de cada paso: valida la lista y guarda el estado previo"""
+        # Arreglos realocados (cuerpos añadidos, checkpoint) o pasos sin observar
+        built = self._built
+        stale = (built is None or built[0] is not sim.positions
+                 or built[1] is not sim.test_positions or self._time != sim.time)
+        if not stale:
+            # Separación de un par: cambia como mucho 2 × desplazamiento máximo
+            expected = self._drift + 1.5 * self._last_step_disp
+            stale = 2 * expected > self.skin
+        if stale:
+            self._rebuild(sim)
+        
+        test_idx = np.unique(self._mt_pairs[:, 1])
+        
+        self._prev = {
+            'time': sim.time,
+            'positions': sim.positions.copy(),
+            'velocities': sim.velocities.copy(),
+            'test_index': test_idx,
+            'test_positions': sim.test_positions[test_idx].copy(),
+            'test_velocities': sim.test_velocities[test_idx].copy()
+        }
+    
+    # ==================== Fase estrecha ====================
+    
+    def _body_name(self, sim, index, test=False):
+        if test:
+            return f'partícula #{index}'
+        if index < len(sim.bodies):
+            return sim.bodies[index].name
+        return f'cuerpo #{index}'
+    
+    def _encounters(self, sim, dt):
+        prev = self._prev
+        d2 = self.encounter_distance ** 2
+        
+        # Estados inicial y final de los dos extremos de cada par candidato
+        mm = self._mm_pairs
+        mt = self._mt_pairs
+        local = np.searchsorted(prev['test_index'], mt[:, 1])
+        
+        a_p0 = np.concatenate([prev['positions'][mm[:, 0]], prev['positions'][mt[:, 0]]])
+        a_v0 = np.concatenate([prev['velocities'][mm[:, 0]], prev['velocities'][mt[:, 0]]])
+        a_p1 = np.concatenate([sim.positions[mm[:, 0]], sim.positions[mt[:, 0]]])
+        a_v1 = np.concatenate([sim.velocities[mm[:, 0]], sim.velocities[mt[:, 0]]])
+        b_p0 = np.concatenate([prev['positions'][mm[:, 1]], prev['test_positions'][local]])
+        b_v0 = np.concatenate([prev['velocities'][mm[:, 1]], prev['test_velocities'][local]])
+        b_p1 = np.concatenate([sim.positions[mm[:, 1]], sim.test_positions[mt[:, 1]]])
+        b_v1 = np.concatenate([sim.velocities[mm[:, 1]], sim.test_velocities[mt[:, 1]]])
+        
+        count = len(a_p0)
+        if count == 0:
+            return [self._encounter_event(sim, key, 'end', sim.time, self._active.pop(key))
+                    for key in list(self._active)]
+        
+        dp0, dp1 = b_p0 - a_p0, b_p1 - a_p1
+        dv0, dv1 = b_v0 - a_v0, b_v1 - a_v1
+        
+        def f(s, rows):
+            if rows is None:
+                r = hermite(dp0, dp1, dv0, dv1, dt, s)
+            else:
+                r = hermite(dp0[rows], dp1[rows], dv0[rows], dv1[rows], dt, s)
+            return np.einsum('ij,ij->i', r, r) - d2
+        
+        is_test = np.arange(count) >= len(mm)
+        pairs = np.concatenate([mm, mt])
+        found, root, values = first_crossing(f, count)
+        # La distancia mínima solo hace falta en encuentros nuevos o en curso
+        refine = found.copy()
+        if self._active:
+            refine |= np.array([(int(i), int(j), bool(t)) in self._active
+                                for (i, j), t in zip(pairs, is_test)], dtype=bool)
+        f_min, _ = refine_minimum(f, values, np.flatnonzero(refine))
+        end_inside = f(np.ones(count), None) <= 0
+        min_dist = np.sqrt(np.maximum(f_min + d2, 0.0))
+        
+        events = []
+        for k in np.flatnonzero(found | end_inside):
+            key = (int(pairs[k, 0]), int(pairs[k, 1]), bool(is_test[k]))
+            if key not in self._active:
+                self._active[key] = float(min_dist[k])
+                events.append(self._encounter_event(sim, key, 'start',
+                                                    prev['time'] + root[k] * dt, min_dist[k]))
+            else:
+                self._active[key] = min(self._active[key], float(min_dist[k]))
+        
+        # Encuentros activos que terminan en este paso (o cuyo par dejó de ser candidato)
+        for k in np.flatnonzero(~end_inside):
+            key = (int(pairs[k, 0]), int(pairs[k, 1]), bool(is_test[k]))
+            if key in self._active:
+                closest = min(self._active.pop(key), float(min_dist[k]))
+                events.append(self._encounter_event(sim, key, 'end', sim.time, closest))
+        candidates = {(int(a), int(b), False) for a, b in mm} | {(int(a), int(b), True) for a, b in mt}
+        for key in [key for key in self._active if key not in candidates]:
+            events.append(self._encounter_event(sim, key, 'end', sim.time, self._active.pop(key)))
+        
+        return events
+    
+    def _encounter_event(self, sim, key, phase, when, distance):
+        a, b, test = key
+        return {
+            'type': 'close_encounter',
+            'phase': phase,
+            'bodies': [self._body_name(sim, a), self._body_name(sim, b, test)],
+            'time': float(when),
+            'distance': float(distance),
+            'distance_au': float(distance / AU),
+        }
+    
+    def _conjunction_events(self, sim, dt):
+        """Conjunciones entre cuerpos con nombre vistas desde el cuerpo más masivo"""
+        n = len(sim.bodies)
+        if n < 3:
+            return []
+        prev = self._prev
+        center = int(np.argmax(sim.masses[:n]))
+        others = np.array([i for i in range(n) if i != center])
+        ii, jj = np.triu_indices(len(others), k=1)
+        a, b = others[ii], others[jj]
+        cos_thr = np.cos(np.radians(self.conjunction_angle))
+        
+        # Estados relativos al centro (Hermite es lineal en los estados)
+        rel_p0 = prev['positions'][:n] - prev['positions'][center]
+        rel_p1 = sim.positions[:n] - sim.positions[center]
+        rel_v0 = prev['velocities'][:n] - prev['velocities'][center]
+        rel_v1 = sim.velocities[:n] - sim.velocities[center]
+        
+        # Filtro por extremos: el ángulo varía poco en un paso, así que solo
+        # los pares cercanos al umbral en t0 o t1 pasan a la fase estrecha
+        u0 = rel_p0 / np.maximum(np.linalg.norm(rel_p0, axis=1), 1e-300)[:, np.newaxis]
+        u1 = rel_p1 / np.maximum(np.linalg.norm(rel_p1, axis=1), 1e-300)[:, np.newaxis]
+        angle0 = np.arccos(np.clip(np.einsum('ij,ij->i', u0[a], u0[b]), -1.0, 1.0))
+        angle1 = np.arccos(np.clip(np.einsum('ij,ij->i', u1[a], u1[b]), -1.0, 1.0))
+        margin = np.abs(angle1 - angle0) + 2 * np.radians(self.conjunction_angle)
+        near = np.minimum(angle0, angle1) - margin < 0
+        a, b = a[near], b[near]
+        
+        def heliocentric(idx, s):
+            r = hermite(rel_p0[idx], rel_p1[idx], rel_v0[idx], rel_v1[idx], dt, s)
+            return r / np.linalg.norm(r, axis=1)[:, np.newaxis]
+        
+        def f(s, rows):
+            # cos θ decrece con el ángulo: f <= 0 dentro de la conjunción
+            ia, ib = (a, b) if rows is None else (a[rows], b[rows])
+            return cos_thr - np.einsum('ij,ij->i', heliocentric(ia, s), heliocentric(ib, s))
+        
+        # Conjunciones en curso cuyo par salió del filtro terminan aquí
+        self._conjunctions &= {(int(i), int(j)) for i, j in zip(a, b)}
+        if not len(a):
+            return []
+        
+        # Las conjunciones en curso solo necesitan saber si siguen al final
+        end_inside = f(np.ones(len(a)), None) <= 0
+        ongoing = np.array([(int(i), int(j)) in self._conjunctions for i, j in zip(a, b)], dtype=bool)
+        for k in np.flatnonzero(ongoing & ~end_inside):
+            self._conjunctions.discard((int(a[k]), int(b[k])))
+        
+        fresh = np.flatnonzero(~ongoing)
+        if not len(fresh):
+            return []
+        a, b, end_inside = a[fresh], b[fresh], end_inside[fresh]
+        found, root, values = first_crossing(f, len(a))
+        # El ángulo mínimo solo se informa al comenzar una conjunción
+        f_min, _ = refine_minimum(f, values, np.flatnonzero(found))
+        min_angle = np.degrees(np.arccos(np.clip(cos_thr - f_min, -1.0, 1.0)))
+        
+        events = []
+        for k in range(len(a)):
+            key = (int(a[k]), int(b[k]))
+            if found[k] or end_inside[k]:
+                self._conjunctions.add(key)
+                events.append({
+                    'type': 'conjunction',
+                    'phase': 'start',
+                    'bodies': [sim.bodies[a[k]].name, sim.bodies[b[k]].name],
+                    'center': sim.bodies[center].name,
+                    'time': float(prev['time'] + root[k] * dt),
+                    'angle_deg': float(min_angle[k]),
+                })
+        return events
+    
+    def detect(self, sim):
+        """Se llama después de cada paso: detecta eventos y los deja en pending"""
+        if self._prev is None:
+            return []
+        dt = sim.time - self._prev['time']
+        if dt <= 0:
+            return []
+        
+        # Cota del desplazamiento del paso con la rapidez máxima al inicio o al final
+        speed = self._max_norm(sim.velocities)
+        if self.include_particles:
+            speed = max(speed, self._max_norm(sim.test_velocities))
+        self._last_step_disp = max(speed, self._last_speed) * dt
+        self._last_speed = speed
+        self._drift += self._last_step_disp
+        self._time = sim.time
+        
+        events = self._encounters(sim, dt)
+        events.extend(self._conjunction_events(sim, dt))
+        events.sort(key=lambda event: event['time'])
+        self.pending.extend(events)
+        self._prev = None
+        return events
+    
+    def drain(self):
+        """Devuelve y vacía los eventos pendientes"""
+        events = list(self.pending)
+        self.pending.clear()
+        return events
@@ -2,15 +2,48 @@
 """
 Integradores numéricos para ecuaciones diferenciales
 Implementa diferentes métodos de integración
+
+Los métodos de paso fijo trabajan in situ sobre los arreglos completos
+de estado y usan buffers `out=` preasignados, de modo que un paso no
+asigna memoria (las evaluaciones de fuerza corren a cargo del backend).
 """
 
 import numpy as np
 
 class Integrator:
-    """Métodos de integración numérica para sistemas dinámicos"""
+    """
+    Métodos de integración numérica para sistemas dinámicos
+    
+    Los métodos in situ reciben:
+        groups: secuencia de (position, velocity, acceleration, scratch), arreglos
+                (N, 3) que se actualizan en el sitio; scratch es un buffer de trabajo
+        dt: paso de tiempo
+        accelerate: callable sin argumentos que rellena las aceleraciones de todos
+                    los grupos a partir de las posiciones actuales
+        fresh: los buffers de aceleración ya contienen a(t) (se omite la primera evaluación)
+    """
+    
+    # Métodos de paso fijo disponibles por nombre (ver NBodySimulator.step)
+    METHODS = ('verlet', 'leapfrog', 'symplectic_euler', 'euler')
+    
+    # Métodos que terminan evaluando a(t+dt) en las posiciones finales (first same as last):
+    # esa aceleración es la a(t) del paso siguiente y puede reutilizarse con fresh=True
+    FSAL = ('verlet', 'leapfrog')
+    
+    @staticmethod
+    def kick(velocity, acceleration, dt, scratch):
+        """v += a * dt"""
+        np.multiply(acceleration, dt, out=scratch)
+        velocity += scratch
     
     @staticmethod
-    def euler(position, velocity, acceleration, dt):
+    def drift(position, velocity, dt, scratch):
+        """r += v * dt"""
+        np.multiply(velocity, dt, out=scratch)
+        position += scratch
+    
+    @staticmethod
+    def euler(groups, dt, accelerate, fresh=False):
         """
         Método de Euler (Forward Euler)
         Menos preciso pero rápido
@@ -18,12 +51,14 @@ class Integrator:
         r(t+dt) = r(t) + v(t) * dt
         v(t+dt) = v(t) + a(t) * dt
         """
-        new_position = position + velocity * dt
-        new_velocity = velocity + acceleration * dt
-        return new_position, new_velocity
+        if not fresh:
+            accelerate()
+        for position, velocity, acceleration, scratch in groups:
+            Integrator.drift(position, velocity, dt, scratch)
+            Integrator.kick(velocity, acceleration, dt, scratch)
     
     @staticmethod
-    def leapfrog(position, velocity, acceleration, dt):
+    def leapfrog(groups, dt, accelerate, fresh=False):
         """
         Método Leapfrog (Kick-Drift-Kick)
         Excelente conservación de energía
@@ -32,25 +67,39 @@ class Integrator:
         r(t+dt) = r(t) + v(t+dt/2) * dt       (Drift)
         v(t+dt) = v(t+dt/2) + a(t+dt) * dt/2  (Kick)
         """
-        # Half kick
-        v_half = velocity + 0.5 * acceleration * dt
-        
-        # Full drift
-        new_position = position + v_half * dt
-        
-        # Necesitamos calcular nueva aceleración aquí
-        # (esto se hace fuera en el simulador)
-        return new_position, v_half
+        half = 0.5 * dt
+        if not fresh:
+            accelerate()
+        for position, velocity, acceleration, scratch in groups:
+            Integrator.kick(velocity, acceleration, half, scratch)
+            Integrator.drift(position, velocity, dt, scratch)
+        accelerate()
+        for position, velocity, acceleration, scratch in groups:
+            Integrator.kick(velocity, acceleration, half, scratch)
     
     @staticmethod
-    def verlet(position, velocity, acceleration, new_acceleration, dt):
+    def verlet(groups, dt, accelerate, fresh=False):
         """
         Velocity Verlet
         Muy preciso para sistemas conservativos
+        
+        r(t+dt) = r(t) + v(t)*dt + 0.5*a(t)*dt²
+        v(t+dt) = v(t) + 0.5*(a(t) + a(t+dt))*dt
+        
+        La media de aceleraciones se aplica como dos medias patadas,
+        así basta un único buffer de aceleración por grupo
         """
-        new_position = position + velocity * dt + 0.5 * acceleration * dt**2
-        new_velocity = velocity + 0.5 * (acceleration + new_acceleration) * dt
-        return new_position, new_velocity
+        half = 0.5 * dt
+        if not fresh:
+            accelerate()
+        for position, velocity, acceleration, scratch in groups:
+            np.multiply(acceleration, half * dt, out=scratch)
+            position += scratch
+            Integrator.drift(position, velocity, dt, scratch)
+            Integrator.kick(velocity, acceleration, half, scratch)
+        accelerate()
+        for position, velocity, acceleration, scratch in groups:
+            Integrator.kick(velocity, acceleration, half, scratch)
     
     @staticmethod
     def rk4_step(y, t, dt, derivatives_func):
@@ -70,7 +119,7 @@ class Integrator:
         return y + (dt/6) * (k1 + 2*k2 + 2*k3 + k4)
     
     @staticmethod
-    def symplectic_euler(position, velocity, acceleration, dt):
+    def symplectic_euler(groups, dt, accelerate, fresh=False):
         """
         Euler Simpéctico
         Conserva mejor la energía que Euler estándar
@@ -78,6 +127,8 @@ class Integrator:
         v(t+dt) = v(t) + a(t) * dt
         r(t+dt) = r(t) + v(t+dt) * dt  <- usa velocidad actualizada
         """
-        new_velocity = velocity + acceleration * dt
-        new_position = position + new_velocity * dt
-        return new_position, new_velocity
+        if not fresh:
+            accelerate()
+        for position, velocity, acceleration, scratch in groups:
+            Integrator.kick(velocity, acceleration, dt, scratch)
+            Integrator.drift(position, velocity, dt, scratch)
@@ -0,0 +1,498 @@
+# physics/kernels.py
+"""
+Backends intercambiables para la evaluación de fuerzas gravitacionales
+NBodySimulator selecciona el kernel por nombre; Numba es opcional y se
+usa automáticamente si está instalado
+"""
+
+import importlib.util
+import inspect
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .constants import G
+
+# Registro nombre -> clase de backend
+KERNEL_BACKENDS = {}
+
+
+def register_backend(cls):
+    """Decorador que registra una clase de backend bajo cls.name"""
+    KERNEL_BACKENDS[cls.name] = cls
+    return cls
+
+
+class ForceKernel:
+    """
+    Interfaz de un backend de fuerzas
+    
+    accelerations: aceleración mutua entre N cuerpos masivos
+    field: aceleración sobre M partículas de prueba debida a N fuentes
+    
+    En ambos casos la distancia se limita inferiormente (suma de radios
+    entre masivos, radio de la fuente para partículas de prueba)
+    """
+    
+    name = None
+    
+    @classmethod
+    def is_available(cls):
+        return True
+    
+    def accelerations(self, positions, masses, radii):
+        raise NotImplementedError
+    
+    def field(self, targets, sources, masses, radii):
+        raise NotImplementedError
+
+
+def _field_by_source(targets, sources, masses, radii, out=None):
+    """
+    Recorre las fuentes vectorizando sobre las partículas (memoria O(M))
+    Eficiente cuando hay pocas fuentes masivas; con `out` (inicializado a
+    cero) se acumula ahí en lugar de en un arreglo nuevo
+    """
+    acceleration = np.zeros_like(targets) if out is None else out
+    for j in range(len(sources)):
+        r_vec = sources[j] - targets
+        r_magnitude = np.sqrt(np.einsum('ij,ij->i', r_vec, r_vec))
+        np.maximum(r_magnitude, radii[j], out=r_magnitude)
+        r_vec *= (G * masses[j] / r_magnitude**3)[:, np.newaxis]
+        acceleration += r_vec
+    return acceleration
+
+
+@register_backend
+class NumpyKernel(ForceKernel):
+    """Suma directa con broadcasting de NumPy (kernel de referencia)"""
+    
+    name = 'numpy'
+    
+    def accelerations(self, positions, masses, radii):
+        """
+        a_i = Σ_j G * m_j * (r_j - r_i) / |r_j - r_i|³
+        """
+        diff = positions[np.newaxis, :, :] - positions[:, np.newaxis, :]
+        dist = np.sqrt(np.einsum('ijk,ijk->ij', diff, diff))
+        np.maximum(dist, radii[:, np.newaxis] + radii[np.newaxis, :], out=dist)
+        np.fill_diagonal(dist, np.inf)
+        
+        weights = G * masses[np.newaxis, :] / dist**3
+        return np.einsum('ij,ijk->ik', weights, diff)
+    
+    def field(self, targets, sources, masses, radii):
+        return _field_by_source(targets, sources, masses, radii)
+
+
+@register_backend
+class ThreadedKernel(NumpyKernel):
+    """
+    Suma directa por bloques de filas repartidos en un pool de hilos
+    NumPy libera el GIL en las operaciones sobre arreglos
+    """
+    
+    name = 'threaded'
+    
+    def __init__(self, workers=None, chunk_size=256):
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self._pool = ThreadPoolExecutor(max_workers=self.workers)
+    
+    def _rows(self, start, stop, positions, masses, radii, out):
+        diff = positions[np.newaxis, :, :] - positions[start:stop, np.newaxis, :]
+        dist = np.sqrt(np.einsum('ijk,ijk->ij', diff, diff))
+        np.maximum(dist, radii[start:stop, np.newaxis] + radii[np.newaxis, :], out=dist)
+        rows = np.arange(stop - start)
+        dist[rows, rows + start] = np.inf
+        
+        weights = G * masses[np.newaxis, :] / dist**3
+        out[start:stop] = np.einsum('ij,ijk->ik', weights, diff)
+    
+    def accelerations(self, positions, masses, radii):
+        n = len(positions)
+        out = np.empty_like(positions)
+        futures = [
+            self._pool.submit(self._rows, start, min(start + self.chunk_size, n),
+                              positions, masses, radii, out)
+            for start in range(0, n, self.chunk_size)
+        ]
+        for future in futures:
+            future.result()
+        return out
+    
+    def field(self, targets, sources, masses, radii):
+        out = np.empty_like(targets)
+        chunk = max(self.chunk_size, -(-len(targets) // self.workers))
+        
+        def run(start):
+            out[start:start + chunk] = _field_by_source(
+                targets[start:start + chunk], sources, masses, radii
+            )
+        
+        for future in [self._pool.submit(run, s) for s in range(0, len(targets), chunk)]:
+            future.result()
+        return out
+
+
+@register_backend
+class TiledKernel(ForceKernel):
+    """
+    Suma directa por bloques (tiles) con memoria acotada y multihilo
+    
+    Cada par de bloques (I, J) con I < J se evalúa una sola vez y se
+    aplica a ambos lados (tercera ley de Newton). Los pares se reparten
+    entre hilos, cada uno con su propio acumulador (N, 3), y el tamaño
+    del bloque se limita para que los temporales de todos los hilos
+    quepan en max_memory bytes.
+    
+    En field() cada hilo recibe filas de partículas disjuntas y escribe
+    directamente en su tramo de un único arreglo de salida: no hay
+    acumuladores por hilo y la memoria extra es solo la de los bloques.
+    """
+    
+    name = 'tiled'
+    
+    # Temporales por par de cuerpos en un bloque: dx, dy, dz, dist, pesos y productos
+    BYTES_PER_PAIR = 8 * 8
+    
+    # Con pocas fuentes conviene recorrerlas una a una sobre bloques de partículas
+    FEW_SOURCES = 64
+    
+    # Temporales por partícula al recorrer fuentes una a una: r_vec, |r|, |r|³ y pesos
+    BYTES_PER_TARGET = 6 * 8
+    
+    def __init__(self, workers=None, tile_size=128, max_memory=64 * 2**20):
+        self.workers = workers or os.cpu_count() or 1
+        self.tile_size = tile_size
+        self.max_memory = max_memory
+        self._pool = ThreadPoolExecutor(max_workers=self.workers) if self.workers > 1 else None
+    
+    def _tile(self, n):
+        """Tamaño de bloque que respeta el techo de memoria"""
+        per_worker = self.max_memory / self.workers - 3 * 8 * n
+        limit = int(np.sqrt(max(per_worker, 0) / self.BYTES_PER_PAIR))
+        return max(1, min(self.tile_size, limit, n))
+    
+    def _run(self, tasks, func, n):
+        """Ejecuta grupos de tareas en el pool y suma los acumuladores"""
+        groups = [tasks[k::self.workers] for k in range(self.workers)]
+        groups = [group for group in groups if group]
+        if self._pool is None or len(groups) == 1:
+            return func(tasks)
+        
+        total = np.zeros((n, 3))
+        for partial in self._pool.map(func, groups):
+            total += partial
+        return total
+    
+    def accelerations(self, positions, masses, radii):
+        n = len(positions)
+        tile = self._tile(n)
+        bounds = [(start, min(start + tile, n)) for start in range(0, n, tile)]
+        tasks = [(I, J) for a, I in enumerate(bounds) for J in bounds[a:]]
+        
+        x = np.ascontiguousarray(positions.T)  # (3, N) para cortes contiguos por eje
+        gm = G * masses
+        
+        def work(pairs):
+            acc = np.zeros((3, n))
+            for (i0, i1), (j0, j1) in pairs:
+                dx = x[0, np.newaxis, j0:j1] - x[0, i0:i1, np.newaxis]
+                dy = x[1, np.newaxis, j0:j1] - x[1, i0:i1, np.newaxis]
+                dz = x[2, np.newaxis, j0:j1] - x[2, i0:i1, np.newaxis]
+                
+                inv3 = dx * dx
+                inv3 += dy * dy
+                inv3 += dz * dz
+                np.sqrt(inv3, out=inv3)
+                np.maximum(inv3, radii[i0:i1, np.newaxis] + radii[np.newaxis, j0:j1], out=inv3)
+                
+                diagonal = i0 == j0
+                if diagonal:
+                    np.fill_diagonal(inv3, np.inf)
+                inv3 **= -3
+                
+                for axis, d in enumerate((dx, dy, dz)):
+                    d *= inv3
+                    acc[axis, i0:i1] += d @ gm[j0:j1]
+                    if not diagonal:
+                        acc[axis, j0:j1] -= gm[i0:i1] @ d
+            return acc.T
+        
+        return np.ascontiguousarray(self._run(tasks, work, n))
+    
+    def field(self, targets, sources, masses, radii):
+        m = len(targets)
+        s = len(sources)
+        out = np.zeros((m, 3))
+        if m == 0 or s == 0:
+            return out
+        
+        few = s <= self.FEW_SOURCES
+        tile = max(1, min(self.tile_size, s))
+        # Filas por bloque: reparto entre hilos, acotado por el techo de memoria de cada uno
+        per_row = self.BYTES_PER_TARGET if few else self.BYTES_PER_PAIR * tile
+        chunk = -(-m // self.workers)
+        chunk = max(1, min(chunk, int(self.max_memory / self.workers / per_row)))
+        gm = G * masses
+        
+        def work(t0):
+            t1 = min(t0 + chunk, m)
+            block = targets[t0:t1]
+            if few:
+                _field_by_source(block, sources, masses, radii, out=out[t0:t1])
+                return
+            for j0 in range(0, s, tile):
+                j1 = min(j0 + tile, s)
+                diff = sources[np.newaxis, j0:j1, :] - block[:, np.newaxis, :]
+                dist = np.sqrt(np.einsum('ijk,ijk->ij', diff, diff))
+                np.maximum(dist, radii[np.newaxis, j0:j1], out=dist)
+                weights = gm[np.newaxis, j0:j1] / dist**3
+                out[t0:t1] += np.einsum('ij,ijk->ik', weights, diff)
+        
+        starts = range(0, m, chunk)
+        if self._pool is None or len(starts) == 1:
+            for t0 in starts:
+                work(t0)
+        else:
+            # Los tramos son disjuntos: cada hilo escribe en el suyo sin sincronización
+            for _ in self._pool.map(work, starts):
+                pass
+        return out
+
+
+def _build_numba_kernels():
+    """Compila los kernels de Numba (importación diferida: numba es opcional)"""
+    import numba
+    
+    # AutoKernel compila en un hilo de fondo y TBB iniciado fuera del hilo
+    # principal bloquea la salida del intérprete: se prefiere OpenMP
+    if not any(key.startswith('NUMBA_THREADING_LAYER') for key in os.environ):
+        numba.config.THREADING_LAYER_PRIORITY = ['omp', 'workqueue', 'tbb']
+    
+    @numba.njit(parallel=True, cache=True)
+    def accelerations(positions, masses, radii, g):
+        n = positions.shape[0]
+        out = np.empty((n, 3))
+        for i in numba.prange(n):
+            ax = 0.0
+            ay = 0.0
+            az = 0.0
+            for j in range(n):
+                if i == j:
+                    continue
+                dx = positions[j, 0] - positions[i, 0]
+                dy = positions[j, 1] - positions[i, 1]
+                dz = positions[j, 2] - positions[i, 2]
+                r = np.sqrt(dx * dx + dy * dy + dz * dz)
+                r_min = radii[i] + radii[j]
+                if r < r_min:
+                    r = r_min
+                w = g * masses[j] / (r * r * r)
+                ax += w * dx
+                ay += w * dy
+                az += w * dz
+            out[i, 0] = ax
+            out[i, 1] = ay
+            out[i, 2] = az
+        return out
+    
+    @numba.njit(parallel=True, cache=True)
+    def field(targets, sources, masses, radii, g):
+        m = targets.shape[0]
+        out = np.empty((m, 3))
+        for i in numba.prange(m):
+            ax = 0.0
+            ay = 0.0
+            az = 0.0
+            for j in range(sources.shape[0]):
+                dx = sources[j, 0] - targets[i, 0]
+                dy = sources[j, 1] - targets[i, 1]
+                dz = sources[j, 2] - targets[i, 2]
+                r = np.sqrt(dx * dx + dy * dy + dz * dz)
+                if r < radii[j]:
+                    r = radii[j]
+                w = g * masses[j] / (r * r * r)
+                ax += w * dx
+                ay += w * dy
+                az += w * dz
+            out[i, 0] = ax
+            out[i, 1] = ay
+            out[i, 2] = az
+        return out
+    
+    return accelerations, field
+
+
+@register_backend
+class NumbaKernel(ForceKernel):
+    """Suma directa compilada con Numba y paralelizada con prange"""
+    
+    name = 'numba'
+    _compiled = None
+    
+    @classmethod
+    def is_available(cls):
+        return importlib.util.find_spec('numba') is not None
+    
+    def __init__(self):
+        if NumbaKernel._compiled is None:
+            NumbaKernel._compiled = _build_numba_kernels()
+        self._accelerations, self._field = NumbaKernel._compiled
+    
+    def accelerations(self, positions, masses, radii):
+        return self._accelerations(
+            np.ascontiguousarray(positions), masses, radii, G
+        )
+    
+    def field(self, targets, sources, masses, radii):
+        return self._field(
+            np.ascontiguousarray(targets), np.ascontiguousarray(sources), masses, radii, G
+        )
+
+
+@register_backend
+class AutoKernel(ForceKernel):
+    """
+    Elige el kernel según el tamaño del problema
+    
+    NumPy para sistemas pequeños y el kernel por bloques a partir de
+    `threshold` cuerpos; numba se compila en un hilo de fondo y, cuando
+    está listo, se usa a cualquier tamaño.
+    """
+    
+    name = 'auto'
+    
+    # Carga de numba compartida por todas las instancias
+    _warmup = None
+    _warmup_lock = threading.Lock()
+    _fast = None
+    
+    def __init__(self, threshold=64, field_threshold=4096, warmup=True, **options):
+        self.threshold = threshold
+        self.field_threshold = field_threshold
+        self.options = options
+        self._small = NumpyKernel()
+        self._tiled = None
+        if warmup:
+            self.warm_up()
+    
+    @property
+    def ready(self):
+        """True si el backend compilado ya está en uso"""
+        return AutoKernel._fast is not None
+    
+    def warm_up(self, wait=False):
+        """Lanza (una sola vez) la compilación de numba en segundo plano"""
+        if not NumbaKernel.is_available():
+            return
+        with AutoKernel._warmup_lock:
+            if AutoKernel._warmup is None:
+                AutoKernel._warmup = threading.Thread(
+                    target=AutoKernel._load_numba, name='numba-warmup', daemon=True
+                )
+                AutoKernel._warmup.start()
+        if wait:
+            AutoKernel._warmup.join()
+    
+    @staticmethod
+    def _load_numba():
+        try:
+            kernel = NumbaKernel()
+            # Una llamada de cada tipo fuerza la compilación (o la carga de la caché)
+            positions = np.eye(2, 3)
+            ones = np.ones(2)
+            kernel.accelerations(positions, ones, ones)
+            kernel.field(positions, positions, ones, ones)
+        except Exception as e:
+            print(f"⚠️ No se pudo cargar numba, se sigue con NumPy: {e}")
+            return
+        AutoKernel._fast = kernel
+    
+    def _make(self, name):
+        """Instancia un backend con las opciones que acepta su constructor"""
+        cls = KERNEL_BACKENDS[name]
+        accepted = inspect.signature(cls.__init__).parameters
+        return cls(**{k: v for k, v in self.options.items() if k in accepted})
+    
+    def _pick(self, n, threshold):
+        if AutoKernel._fast is not None:
+            return AutoKernel._fast
+        if n < threshold:
+            return self._small
+        if self._tiled is None:
+            self._tiled = self._make('tiled')
+        return self._tiled
+    
+    def accelerations(self, positions, masses, radii):
+        kernel = self._pick(len(positions), self.threshold)
+        return kernel.accelerations(positions, masses, radii)
+    
+    def field(self, targets, sources, masses, radii):
+        kernel = self._pick(len(targets), self.field_threshold)
+        return kernel.field(targets, sources, masses, radii)
+
+
+def available_backends():
+    """Nombres de los backends utilizables en este entorno"""
+    return [name for name, cls in KERNEL_BACKENDS.items() if cls.is_available()]
+
+
+def get_backend(name='auto', **options):
+    """
+    Instancia un backend por nombre
+    
+    'auto' usa la referencia de NumPy para sistemas pequeños y el kernel
+    por bloques para los grandes hasta que numba (si está instalado)
+    termina de compilarse en segundo plano
+    """
+    
+    cls = KERNEL_BACKENDS.get(name)
+    if cls is None:
+        raise ValueError(f"Backend de fuerzas desconocido: {name}")
+    if not cls.is_available():
+        raise ValueError(f"Backend de fuerzas no disponible: {name}")
+    return cls(**options)
+
+
+def check_backend(kernel, n=300, m=512, seed=0, rtol=1e-9):
+    """
+    Verifica un backend contra el kernel de referencia en un sistema aleatorio
+    
+    Args:
+        kernel: nombre o instancia del backend
+        n: cuerpos masivos
+        m: partículas de prueba
+    
+    Returns:
+        error relativo máximo (lanza ValueError si supera rtol)
+    """
+    if isinstance(kernel, str):
+        kernel = get_backend(kernel)
+    reference = NumpyKernel()
+    
+    rng = np.random.default_rng(seed)
+    positions = rng.normal(scale=1e11, size=(n, 3))
+    masses = 10.0 ** rng.uniform(20, 30, n)
+    radii = rng.uniform(1e6, 1e9, n)
+    targets = rng.normal(scale=1e11, size=(m, 3))
+    # Un par muy cercano para ejercitar el límite por radios
+    positions[1] = positions[0] + 1e5
+    
+    errors = []
+    for expected, result in (
+        (reference.accelerations(positions, masses, radii),
+         kernel.accelerations(positions, masses, radii)),
+        (reference.field(targets, positions, masses, radii),
+         kernel.field(targets, positions, masses, radii)),
+    ):
+        scale = np.linalg.norm(expected, axis=1)
+        errors.append(np.max(np.linalg.norm(result - expected, axis=1) / scale))
+    
+    error = float(max(errors))
+    if not error <= rtol:
+        raise ValueError(f"Backend {kernel.name}: error relativo {error:.3e} > {rtol:.1e}")
+    return error
@@ -1,12 +1,17 @@
 # physics/nbody.py
 """
 Simulador N-body con interacciones gravitacionales newtonianas
-Implementa el algoritmo de Verlet para estabilidad numérica
+Integra con los métodos in situ de physics.integrator (Verlet por defecto) o RK4
 """
 
+import time
+from contextlib import nullcontext
 import numpy as np
-from scipy.integrate import solve_ivp
-from .constants import G, SOLAR_SYSTEM_DATA, SCALE_FACTORS
+from .constants import G, SUN_MASS, SOLAR_SYSTEM_DATA, SCALE_FACTORS
+from .orbital_elements import DEG, elements_to_state_vectors, state_vectors_to_elements
+from .kernels import get_backend
+from .integrator import Integrator
+from .spatial import SpatialIndex
 
 class CelestialBody:
     """Representa un cuerpo celeste con propiedades físicas"""
@@ -74,27 +79,160 @@ class CelestialBody:
 
 
 class NBodySimulator:
-    """Simulador de sistema N-body con gravedad newtoniana"""
+    """
+    Simulador de sistema N-body con gravedad newtoniana
     
-    def __init__(self, time_step=3600, method='verlet'):
+    El estado vive en arreglos (N, 3) / (N,). Los cuerpos con metadatos
+    (CelestialBody) ocupan las primeras len(self.bodies) filas y sus
+    atributos position/velocity son vistas sobre esas filas; el resto son
+    cuerpos cargados en bloque con add_bodies, sin objeto asociado.
+    
+    Las partículas de prueba (sin masa) se guardan en arreglos aparte:
+    sienten la gravedad de los cuerpos masivos pero no la ejercen, así
+    que su coste es O(N_masivos × N_prueba) en lugar de O(N²).
+    """
+    
+    def __init__(self, time_step=3600, method='verlet', backend='auto'):
         self.bodies = []
         self.time = 0.0
         self.time_step = time_step  # segundos
-        self.method = method  # 'verlet', 'rk4', 'euler'
+        self.method = method  # 'rk4' o un método in situ de Integrator.METHODS
+        self.metrics = None  # MetricsRegistry opcional para timings por fase
+        self.kernel = get_backend(backend)  # backend de fuerzas (ver physics.kernels)
+        self.event_detector = None  # EventDetector opcional evaluado tras cada paso
+        self._spatial = None  # (clave del snapshot, SpatialIndex) construido bajo demanda
+        self._elements = None  # (clave del snapshot, elementos osculadores) calculados bajo demanda
+        self.force_evaluations = 0  # evaluaciones de fuerza acumuladas (coste de los integradores)
+        self._work = None  # buffers de integración in situ, ligados a los arreglos de estado
+        self._fresh_time = None  # instante cuyas aceleraciones ya están en los buffers (FSAL)
+        self._force_time = 0.0
+        self._trail_steps = 0  # pasos desde el último punto de trayectoria
         
+        # Estado vectorizado de todos los cuerpos masivos
+        self.positions = np.zeros((0, 3), dtype=np.float64)
+        self.velocities = np.zeros((0, 3), dtype=np.float64)
+        self.accelerations = np.zeros((0, 3), dtype=np.float64)
+        self.masses = np.zeros(0, dtype=np.float64)
+        self.radii = np.zeros(0, dtype=np.float64)
+        
+        # Partículas de prueba (asteroides, escombros de anillos)
+        self.test_positions = np.zeros((0, 3), dtype=np.float64)
+        self.test_velocities = np.zeros((0, 3), dtype=np.float64)
+    
+    def _timed(self, phase):
+        """Timer de la fase si hay métricas configuradas, no-op si no"""
+        if self.metrics is None:
+            return nullcontext()
+        return self.metrics.timer(phase)
+    
+    @property
+    def n_bodies(self):
+        """Número total de cuerpos masivos (con y sin metadatos)"""
+        return len(self.masses)
+    
+    @property
+    def n_test_particles(self):
+        """Número de partículas de prueba sin masa"""
+        return len(self.test_positions)
+    
     def add_body(self, body):
         """Agrega un cuerpo al sistema"""
+        index = len(self.bodies)
+        self.positions = np.insert(self.positions, index, body.position, axis=0)
+        self.velocities = np.insert(self.velocities, index, body.velocity, axis=0)
+        self.accelerations = np.insert(self.accelerations, index, body.acceleration, axis=0)
+        self.masses = np.insert(self.masses, index, body.mass)
+        self.radii = np.insert(self.radii, index, body.radius)
         self.bodies.append(body)
+        self._bind_bodies()
     
-    def initialize_solar_system(self):
-        """Inicializa el sistema solar con datos reales"""
+    def add_bodies(self, positions, velocities, masses, radii=None):
+        """
+        Agrega cuerpos en bloque directamente a los arreglos de estado
+        Evita crear un CelestialBody por cuerpo en escenas grandes
+        
+        Args:
+            positions, velocities: arreglos (M, 3) en m y m/s
+            masses: arreglo (M,) o escalar en kg
+            radii: arreglo (M,) o escalar en m (0 por defecto)
+        """
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+        count = len(positions)
+        velocities = np.asarray(velocities, dtype=np.float64).reshape(count, 3)
+        masses = np.broadcast_to(np.asarray(masses, dtype=np.float64), (count,))
+        radii = np.broadcast_to(np.asarray(0.0 if radii is None else radii, dtype=np.float64), (count,))
+        
+        self.positions = np.concatenate([self.positions, positions])
+        self.velocities = np.concatenate([self.velocities, velocities])
+        self.accelerations = np.concatenate([self.accelerations, np.zeros((count, 3))])
+        self.masses = np.concatenate([self.masses, masses])
+        self.radii = np.concatenate([self.radii, radii])
+        self._bind_bodies()
+        return count
+    
+    def add_test_particles(self, positions, velocities):
+        """
+        Agrega partículas de prueba sin masa
+        
+        Args:
+            positions, velocities: arreglos (M, 3) en m y m/s
+        """
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+        velocities = np.asarray(velocities, dtype=np.float64).reshape(len(positions), 3)
+        
+        self.test_positions = np.concatenate([self.test_positions, positions])
+        self.test_velocities = np.concatenate([self.test_velocities, velocities])
+        return len(positions)
+    
+    def _bind_bodies(self):
+        """Reasocia los CelestialBody a sus filas tras realocar los arreglos"""
+        for i, body in enumerate(self.bodies):
+            body.position = self.positions[i]
+            body.velocity = self.velocities[i]
+            body.acceleration = self.accelerations[i]
+    
+    def find_body(self, name):
+        """Índice de un cuerpo con metadatos por nombre (clave o nombre visible)"""
+        for i, body in enumerate(self.bodies):
+            if body.name == name:
+                return i
+        data = SOLAR_SYSTEM_DATA.get(name)
+        if data is not None:
+            return self.find_body(data['name'])
+        raise KeyError(f"Cuerpo desconocido: {name}")
+    
+    def initialize_solar_system(self, use_orbital_elements=False):
+        """
+        Inicializa el sistema solar con datos reales
+        
+        Con use_orbital_elements=True los planetas se colocan en su posición
+        de J2000 a partir de sus elementos orbitales tabulados (excentricidad,
+        inclinación, nodo, longitud del perihelio y longitud media) en lugar
+        de los vectores cartesianos fijos
+        """
         for key, data in SOLAR_SYSTEM_DATA.items():
+            position = data['position'].copy()
+            velocity = data['velocity'].copy()
+            elements = data.get('orbital_elements')
+            if use_orbital_elements and elements:
+                node = elements['longitude_of_node']
+                perihelion = elements['longitude_of_perihelion']
+                position, velocity = elements_to_state_vectors(
+                    elements['semi_major_axis'],
+                    elements['eccentricity'],
+                    elements['inclination'] * DEG,
+                    node * DEG,
+                    (perihelion - node) * DEG,
+                    (elements['mean_longitude'] - perihelion) * DEG,
+                    G * SUN_MASS
+                )
+            
             body = CelestialBody(
                 name=data['name'],
                 mass=data['mass'],
                 radius=data['radius'],
-                position=data['position'].copy(),
-                velocity=data['velocity'].copy(),
+                position=position,
+                velocity=velocity,
                 color=data['color'],
                 emissive=data.get('emissive', False),
                 has_rings=data.get('has_rings', False),
@@ -107,6 +245,33 @@ class NBodySimulator:
             if body.has_rings:
                 print(f"💍 {body.name} tiene anillos configurados: {body.rings}")
     
+    def set_backend(self, backend, **options):
+        """Cambia el backend de evaluación de fuerzas por nombre"""
+        self.kernel = get_backend(backend, **options)
+    
+    def compute_accelerations(self, positions=None):
+        """
+        Aceleración gravitacional sobre todos los cuerpos masivos
+        
+        a_i = Σ_j G * m_j * (r_j - r_i) / |r_j - r_i|³
+        
+        La distancia se limita inferiormente a la suma de radios
+        para evitar singularidades en colisiones
+        """
+        if positions is None:
+            positions = self.positions
+        return self.kernel.accelerations(positions, self.masses, self.radii)
+    
+    def compute_test_accelerations(self, test_positions=None, positions=None):
+        """
+        Aceleración sobre las partículas de prueba debida solo a los cuerpos masivos
+        """
+        if test_positions is None:
+            test_positions = self.test_positions
+        if positions is None:
+            positions = self.positions
+        return self.kernel.field(test_positions, positions, self.masses, self.radii)
+    
     def compute_gravitational_acceleration(self, body_index):
         """
         Calcula la aceleración gravitacional sobre un cuerpo
@@ -115,99 +280,130 @@ class NBodySimulator:
         F = G * m1 * m2 / r²
         a = F / m = G * m2 / r²
         """
-        body = self.bodies[body_index]
-        acceleration = np.zeros(3, dtype=np.float64)
+        r_vec = self.positions - self.positions[body_index]
+        r_magnitude = np.linalg.norm(r_vec, axis=1)
         
-        for i, other_body in enumerate(self.bodies):
-            if i == body_index:
-                continue
-            
-            # Vector de posición relativa
-            r_vec = other_body.position - body.position
-            r_magnitude = np.linalg.norm(r_vec)
-            
-            # Evitar división por cero (colisiones)
-            if r_magnitude < (body.radius + other_body.radius):
-                r_magnitude = body.radius + other_body.radius
-            
-            # Aceleración gravitacional: a = G * M / r² * r_hat
-            r_hat = r_vec / r_magnitude
-            a_magnitude = G * other_body.mass / (r_magnitude ** 2)
-            acceleration += a_magnitude * r_hat
+        # Evitar división por cero (colisiones)
+        np.maximum(r_magnitude, self.radii + self.radii[body_index], out=r_magnitude)
+        r_magnitude[body_index] = np.inf
+        
+        # Aceleración gravitacional: a = G * M / r² * r_hat
+        return (G * self.masses / r_magnitude**3) @ r_vec
+    
+    def _integration_groups(self):
+        """
+        Grupos (posición, velocidad, aceleración, buffer) para Integrator
+        Los buffers se asignan una vez y solo se rehacen si los arreglos
+        de estado se realocan (add_bodies, add_test_particles, load_checkpoint)
+        """
+        arrays = (self.positions, self.velocities, self.accelerations,
+                  self.test_positions, self.test_velocities)
+        work = self._work
+        if work is None or any(a is not b for a, b in zip(work[0], arrays)):
+            groups = [(self.positions, self.velocities, self.accelerations,
+                       np.empty_like(self.positions))]
+            test_accelerations = np.zeros_like(self.test_positions)
+            if self.n_test_particles:
+                groups.append((self.test_positions, self.test_velocities, test_accelerations,
+                               np.empty_like(self.test_positions)))
+            work = self._work = (arrays, groups, test_accelerations)
+            self._fresh_time = None
+        return work[1]
+    
+    def invalidate_accelerations(self):
+        """
+        Descarta las aceleraciones guardadas del final del paso anterior
+        Necesario solo si se modifican posiciones, masas o radios en el sitio
+        sin avanzar el tiempo (las realocaciones se detectan solas); invalida
+        también las listas de candidatos del detector de eventos
+        """
+        self._fresh_time = None
+        if self.event_detector is not None:
+            self.event_detector.invalidate()
+    
+    def _update_accelerations(self):
+        """Rellena los buffers de aceleración con las posiciones actuales"""
+        start = time.perf_counter()
+        self.accelerations[...] = self.compute_accelerations()
+        if self.n_test_particles:
+            self._work[2][...] = self.compute_test_accelerations()
+        self.force_evaluations += 1
+        self._force_time += time.perf_counter() - start
+    
+    def _record_trail(self):
+        """Agrega a la trayectoria cada 10 pasos (contados, aunque cambie time_step)"""
+        if self._trail_steps % 10 == 0:
+            with self._timed('trail'):
+                for body in self.bodies:
+                    body.add_to_trail()
+        self._trail_steps += 1
+    
+    def step_fixed(self, method=None):
+        """
+        Paso con un integrador in situ de Integrator (verlet, leapfrog,
+        symplectic_euler, euler); no asigna arreglos fuera del backend de fuerzas
+        """
+        method = method or self.method
+        integrate = getattr(Integrator, method)
+        groups = self._integration_groups()
+        # a(t) calculada al final del paso anterior (verlet/leapfrog): se ahorra una evaluación
+        fresh = self._fresh_time == self.time
         
-        return acceleration
+        self._force_time = 0.0
+        start = time.perf_counter()
+        integrate(groups, self.time_step, self._update_accelerations, fresh=fresh)
+        if self.metrics is not None:
+            # Las evaluaciones de fuerza se registran aparte de la integración
+            self.metrics.observe('forces', self._force_time)
+            self.metrics.observe('integration', time.perf_counter() - start - self._force_time)
+        
+        self._record_trail()
+        self.time += self.time_step
+        self._fresh_time = self.time if method in Integrator.FSAL else None
     
     def step_verlet(self):
         """
         Integrador de Verlet (Velocity Verlet)
         Más estable y preciso que Euler para sistemas conservativos
-        
-        r(t+dt) = r(t) + v(t)*dt + 0.5*a(t)*dt²
-        v(t+dt) = v(t) + 0.5*(a(t) + a(t+dt))*dt
         """
-        dt = self.time_step
-        
-        # Calcular aceleraciones actuales
-        accelerations = []
-        for i in range(len(self.bodies)):
-            acc = self.compute_gravitational_acceleration(i)
-            accelerations.append(acc)
-            self.bodies[i].acceleration = acc
-        
-        # Actualizar posiciones
-        for i, body in enumerate(self.bodies):
-            body.position += body.velocity * dt + 0.5 * accelerations[i] * dt**2
-        
-        # Calcular nuevas aceleraciones
-        new_accelerations = []
-        for i in range(len(self.bodies)):
-            acc = self.compute_gravitational_acceleration(i)
-            new_accelerations.append(acc)
-        
-        # Actualizar velocidades
-        for i, body in enumerate(self.bodies):
-            body.velocity += 0.5 * (accelerations[i] + new_accelerations[i]) * dt
-            body.acceleration = new_accelerations[i]
-            
-            # Agregar a trayectoria cada 10 pasos
-            if int(self.time / dt) % 10 == 0:
-                body.add_to_trail()
-        
-        self.time += dt
+        self.step_fixed('verlet')
     
     def step_rk4(self):
         """
         Integrador Runge-Kutta de 4to orden
         Muy preciso pero más costoso computacionalmente
         """
+        # Importación diferida: scipy solo se carga si se usa rk4
+        from scipy.integrate import solve_ivp
+        
+        n = self.n_bodies
+        m = self.n_test_particles
+        total = n + m
+        force_time = 0.0
+        
         def derivatives(t, state):
             """Calcula derivadas para RK4"""
-            n = len(self.bodies)
+            nonlocal force_time
+            start = time.perf_counter()
             positions = state[:3*n].reshape(n, 3)
-            velocities = state[3*n:].reshape(n, 3)
-            
-            # Calcular aceleraciones
-            accelerations = np.zeros((n, 3))
-            for i in range(n):
-                for j in range(n):
-                    if i == j:
-                        continue
-                    r_vec = positions[j] - positions[i]
-                    r_mag = np.linalg.norm(r_vec)
-                    if r_mag < 1e6:  # Evitar singularidades
-                        r_mag = 1e6
-                    r_hat = r_vec / r_mag
-                    accelerations[i] += G * self.bodies[j].mass * r_hat / r_mag**2
-            
-            return np.concatenate([velocities.flatten(), accelerations.flatten()])
+            velocities = state[3*total:]
+            accelerations = self.compute_accelerations(positions)
+            if m:
+                test_positions = state[3*n:3*total].reshape(m, 3)
+                test_accelerations = self.compute_test_accelerations(test_positions, positions)
+                accelerations = np.concatenate([accelerations, test_accelerations])
+            force_time += time.perf_counter() - start
+            self.force_evaluations += 1
+            return np.concatenate([velocities, accelerations.ravel()])
         
-        # Estado actual
+        # Estado actual: [posiciones masivas, posiciones de prueba, velocidades idem]
         state = np.concatenate([
-            np.array([b.position for b in self.bodies]).flatten(),
-            np.array([b.velocity for b in self.bodies]).flatten()
+            self.positions.ravel(), self.test_positions.ravel(),
+            self.velocities.ravel(), self.test_velocities.ravel()
         ])
         
         # Integrar
+        start = time.perf_counter()
         sol = solve_ivp(
             derivatives,
             (self.time, self.time + self.time_step),
@@ -215,51 +411,200 @@ class NBodySimulator:
             method='RK45',
             max_step=self.time_step
         )
+        if self.metrics is not None:
+            # Las evaluaciones de fuerza se registran aparte del resto del solver
+            self.metrics.observe('forces', force_time)
+            self.metrics.observe('integration', time.perf_counter() - start - force_time)
         
         # Actualizar estados
         final_state = sol.y[:, -1]
-        n = len(self.bodies)
-        positions = final_state[:3*n].reshape(n, 3)
-        velocities = final_state[3*n:].reshape(n, 3)
-        
-        for i, body in enumerate(self.bodies):
-            body.position = positions[i]
-            body.velocity = velocities[i]
-            if int(self.time / self.time_step) % 10 == 0:
-                body.add_to_trail()
+        self.positions[:] = final_state[:3*n].reshape(n, 3)
+        self.test_positions[:] = final_state[3*n:3*total].reshape(m, 3)
+        self.velocities[:] = final_state[3*total:3*(total+n)].reshape(n, 3)
+        self.test_velocities[:] = final_state[3*(total+n):].reshape(m, 3)
+        self._fresh_time = None
         
+        self._record_trail()
         self.time += self.time_step
     
     def step(self):
         """Ejecuta un paso de simulación"""
-        if self.method == 'verlet':
-            self.step_verlet()
-        elif self.method == 'rk4':
+        detector = self.event_detector
+        if detector is not None:
+            with self._timed('events'):
+                detector.begin(self)
+        
+        if self.method == 'rk4':
             self.step_rk4()
+        elif self.method in Integrator.METHODS:
+            self.step_fixed()
         else:
             raise ValueError(f"Método desconocido: {self.method}")
+        
+        if detector is not None:
+            with self._timed('events'):
+                detector.detect(self)
     
-    def get_state(self):
-        """Retorna el estado actual del sistema"""
-        return {
+    def save_checkpoint(self, path):
+        """
+        Guarda el estado completo en un archivo .npz comprimido
+        Incluye arreglos de cuerpos masivos y partículas de prueba
+        """
+        np.savez_compressed(
+            path,
+            time=self.time,
+            time_step=self.time_step,
+            method=self.method,
+            names=np.array([body.name for body in self.bodies]),
+            positions=self.positions,
+            velocities=self.velocities,
+            masses=self.masses,
+            radii=self.radii,
+            test_positions=self.test_positions,
+            test_velocities=self.test_velocities
+        )
+    
+    def load_checkpoint(self, path):
+        """
+        Restaura un estado guardado con save_checkpoint
+        
+        Los cuerpos con metadatos del simulador actual deben coincidir con
+        los del checkpoint (por ejemplo, tras initialize_solar_system); si el
+        simulador está vacío, todas las filas se cargan como cuerpos en bloque
+        """
+        with np.load(path) as data:
+            names = [str(name) for name in data['names']]
+            current = [body.name for body in self.bodies]
+            if current and current != names:
+                raise ValueError(f"El checkpoint no coincide con los cuerpos actuales: {names}")
+            
+            # time_step y method se guardan como referencia; se conserva la configuración actual
+            self.time = float(data['time'])
+            self._spatial = None
+            self._elements = None
+            self.positions = data['positions'].copy()
+            self.velocities = data['velocities'].copy()
+            self.masses = data['masses'].copy()
+            self.radii = data['radii'].copy()
+            self.accelerations = np.zeros_like(self.positions)
+            self.test_positions = data['test_positions'].copy()
+            self.test_velocities = data['test_velocities'].copy()
+        
+        self._bind_bodies()
+    
+    def spatial_index(self):
+        """
+        Índice espacial (KD-tree) del snapshot actual
+        Se crea al primer uso y se reutiliza hasta el siguiente paso; aquí
+        solo se copian las posiciones (el árbol se construye en la primera
+        consulta, que puede hacerse sin el lock de la simulación)
+        """
+        key = (self.time, self.n_bodies, self.n_test_particles)
+        if self._spatial is None or self._spatial[0] != key:
+            with self._timed('spatial_index'):
+                self._spatial = (key, SpatialIndex.from_simulator(self))
+        return self._spatial[1]
+    
+    def osculating_elements(self, center='sun'):
+        """
+        Elementos osculadores (a, e, i, período) de todos los cuerpos masivos
+        
+        Args:
+            center: 'barycenter' (baricentro, mu = G * masa total) o el nombre de un
+                    cuerpo (por defecto el Sol, mu = G * (M_centro + m)); el propio
+                    cuerpo central queda con NaN
+        
+        Se calculan vectorizados al primer uso y se reutilizan hasta el siguiente paso
+        
+        Returns:
+            dict con center, time y arreglos (n_bodies,) semi_major_axis (m),
+            eccentricity, inclination (grados) y period (s)
+        """
+        key = (self.time, self.n_bodies, center)
+        if self._elements is None or self._elements[0] != key:
+            with self._timed('elements'):
+                if center == 'barycenter':
+                    total = float(np.sum(self.masses))
+                    origin = self.masses @ self.positions / total
+                    origin_velocity = self.masses @ self.velocities / total
+                    mu = G * total
+                    index = None
+                else:
+                    index = self.find_body(center)
+                    origin = self.positions[index]
+                    origin_velocity = self.velocities[index]
+                    mu = G * (self.masses[index] + self.masses)
+                
+                elements = state_vectors_to_elements(self.positions - origin,
+                                                     self.velocities - origin_velocity, mu)
+                elements['inclination'] = np.degrees(elements['inclination'])
+                if index is not None:
+                    for values in elements.values():
+                        values[index] = np.nan
+                elements.update(center=center, time=self.time)
+                self._elements = (key, elements)
+        return self._elements[1]
+    
+    def get_elements(self, center='sun'):
+        """
+        Elementos osculadores de los cuerpos con nombre, serializables a JSON
+        
+        Returns:
+            dict con center, time y bodies: {nombre: {semi_major_axis, eccentricity,
+            inclination, period}} (None donde no aplica: cuerpo central u órbita abierta)
+        """
+        elements = self.osculating_elements(center)
+        keys = ('semi_major_axis', 'eccentricity', 'inclination', 'period')
+        columns = {key: elements[key][:len(self.bodies)].tolist() for key in keys}
+        bodies = {}
+        for i, body in enumerate(self.bodies):
+            values = {key: columns[key][i] for key in keys}
+            if np.isnan(values['eccentricity']):
+                continue
+            bodies[body.name] = {key: None if np.isnan(value) else value for key, value in values.items()}
+        return {'center': center, 'time': elements['time'], 'bodies': bodies}
+    
+    def get_state(self, max_particles=5000, include_particles=True):
+        """
+        Retorna el estado actual del sistema
+        
+        Los cuerpos sin metadatos y las partículas de prueba se envían como
+        nube de puntos escalada, submuestreada a lo sumo a max_particles posiciones.
+        Con include_particles=False se omite la nube (p.ej. para culling por cliente)
+        """
+        state = {
             'time': self.time,
             'bodies': [body.to_dict() for body in self.bodies]
         }
+        
+        bulk = self.positions[len(self.bodies):]
+        count = len(bulk) + self.n_test_particles
+        if count and include_particles:
+            stride = max(1, -(-count // max_particles))
+            sample = np.concatenate([bulk[::stride], self.test_positions[::stride]])
+            sample *= SCALE_FACTORS['distance']
+            state['particles'] = {
+                'count': count,
+                'stride': stride,
+                'positions': sample.astype(np.float32).tolist()
+            }
+        
+        return state
     
     def compute_energy(self):
-        """Calcula la energía total del sistema (conservada en sistemas ideales)"""
-        kinetic = 0.0
-        potential = 0.0
-        
+        """
+        Calcula la energía total del sistema (conservada en sistemas ideales)
+        Las partículas de prueba no tienen masa y no contribuyen
+        """
         # Energía cinética
-        for body in self.bodies:
-            kinetic += 0.5 * body.mass * np.dot(body.velocity, body.velocity)
-        
-        # Energía potencial gravitacional
-        for i, body1 in enumerate(self.bodies):
-            for j, body2 in enumerate(self.bodies[i+1:], start=i+1):
-                r = np.linalg.norm(body2.position - body1.position)
-                potential -= G * body1.mass * body2.mass / r
+        speeds_sq = np.einsum('ij,ij->i', self.velocities, self.velocities)
+        kinetic = 0.5 * float(np.dot(self.masses, speeds_sq))
+        
+        # Energía potencial gravitacional (fila a fila: memoria O(N))
+        potential = 0.0
+        for i in range(self.n_bodies - 1):
+            r = np.linalg.norm(self.positions[i+1:] - self.positions[i], axis=1)
+            potential -= G * self.masses[i] * float(np.sum(self.masses[i+1:] / r))
         
         return {
             'kinetic': kinetic,
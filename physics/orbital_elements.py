@@ -0,0 +1,141 @@
+# physics/orbital_elements.py
+"""
+Conversión vectorizada entre elementos orbitales y vectores de estado
+Las órbitas de referencia están en el plano XZ (Y = altura), igual que
+en SOLAR_SYSTEM_DATA
+"""
+
+import numpy as np
+
+DEG = np.pi / 180.0
+
+
+def solve_kepler(mean_anomaly, eccentricity, tol=1e-12, max_iter=50):
+    """
+    Resuelve la ecuación de Kepler M = E - e*sin(E) para arreglos completos
+    mediante Newton-Raphson vectorizado
+    
+    Args:
+        mean_anomaly: anomalía media M (rad), escalar o arreglo
+        eccentricity: excentricidad e (0 <= e < 1), escalar o arreglo
+    
+    Returns:
+        anomalía excéntrica E (rad) con la forma de la entrada
+    """
+    M = np.remainder(np.asarray(mean_anomaly, dtype=np.float64), 2 * np.pi)
+    e = np.asarray(eccentricity, dtype=np.float64)
+    M, e = np.broadcast_arrays(M, e)
+    
+    # Semilla robusta: M para órbitas poco excéntricas, π para muy excéntricas
+    E = np.where(e < 0.8, M, np.pi)
+    for _ in range(max_iter):
+        f = E - e * np.sin(E) - M
+        delta = f / (1.0 - e * np.cos(E))
+        E = E - delta
+        if np.max(np.abs(delta), initial=0.0) < tol:
+            break
+    return E
+
+
+def elements_to_state_vectors(a, e, inclination, raan, arg_periapsis, mean_anomaly, mu):
+    """
+    Convierte elementos keplerianos a posición y velocidad cartesianas
+    
+    Args:
+        a: semieje mayor (m)
+        e: excentricidad
+        inclination: inclinación respecto al plano XZ (rad)
+        raan: longitud del nodo ascendente (rad)
+        arg_periapsis: argumento del periapsis (rad)
+        mean_anomaly: anomalía media (rad)
+        mu: parámetro gravitacional G*M del cuerpo central (m³/s²)
+    
+    Returns:
+        (positions, velocities) arreglos (N, 3) relativos al cuerpo central
+    """
+    a, e, inc, raan, argp, M = np.broadcast_arrays(
+        *(np.asarray(x, dtype=np.float64) for x in
+          (a, e, inclination, raan, arg_periapsis, mean_anomaly))
+    )
+    
+    E = solve_kepler(M, e)
+    cos_E = np.cos(E)
+    sin_E = np.sin(E)
+    sqrt_1me2 = np.sqrt(1.0 - e * e)
+    
+    # Coordenadas en el plano perifocal
+    r = a * (1.0 - e * cos_E)
+    x_p = a * (cos_E - e)
+    y_p = a * sqrt_1me2 * sin_E
+    factor = np.sqrt(mu * a) / r
+    vx_p = -factor * sin_E
+    vy_p = factor * sqrt_1me2 * cos_E
+    
+    # Rotación perifocal -> inercial (R_z(Ω) · R_x(i) · R_z(ω))
+    cos_O, sin_O = np.cos(raan), np.sin(raan)
+    cos_w, sin_w = np.cos(argp), np.sin(argp)
+    cos_i, sin_i = np.cos(inc), np.sin(inc)
+    
+    r11 = cos_O * cos_w - sin_O * sin_w * cos_i
+    r12 = -cos_O * sin_w - sin_O * cos_w * cos_i
+    r21 = sin_O * cos_w + cos_O * sin_w * cos_i
+    r22 = -sin_O * sin_w + cos_O * cos_w * cos_i
+    r31 = sin_w * sin_i
+    r32 = cos_w * sin_i
+    
+    # El plano de referencia (x, y) se mapea al plano XZ; la normal a Y
+    positions = np.empty(a.shape + (3,))
+    positions[..., 0] = r11 * x_p + r12 * y_p
+    positions[..., 2] = r21 * x_p + r22 * y_p
+    positions[..., 1] = r31 * x_p + r32 * y_p
+    
+    velocities = np.empty(a.shape + (3,))
+    velocities[..., 0] = r11 * vx_p + r12 * vy_p
+    velocities[..., 2] = r21 * vx_p + r22 * vy_p
+    velocities[..., 1] = r31 * vx_p + r32 * vy_p
+    
+    return positions, velocities
+
+
+def state_vectors_to_elements(positions, velocities, mu):
+    """
+    Elementos osculadores a partir de vectores de estado relativos al cuerpo central
+    
+    Inversa (parcial) de elements_to_state_vectors, vectorizada para N cuerpos.
+    La normal del plano de referencia es -Y: una órbita directa en el plano XZ
+    (como las de SOLAR_SYSTEM_DATA) tiene inclinación 0.
+    
+    Args:
+        positions, velocities: arreglos (N, 3) relativos al cuerpo central (m, m/s)
+        mu: G*(M_central + m) por cuerpo, escalar o arreglo (N,) (m³/s²)
+    
+    Returns:
+        dict con arreglos (N,): semi_major_axis (m, negativo si la órbita no está
+        ligada), eccentricity, inclination (rad) y period (s, NaN si no está ligada)
+    """
+    r_vec = np.asarray(positions, dtype=np.float64)
+    v_vec = np.asarray(velocities, dtype=np.float64)
+    mu = np.broadcast_to(np.asarray(mu, dtype=np.float64), (len(r_vec),))
+    
+    r = np.sqrt(np.einsum('ij,ij->i', r_vec, r_vec))
+    v2 = np.einsum('ij,ij->i', v_vec, v_vec)
+    rv = np.einsum('ij,ij->i', r_vec, v_vec)
+    h = np.cross(r_vec, v_vec)
+    h_norm = np.sqrt(np.einsum('ij,ij->i', h, h))
+    
+    # r = 0 (el propio cuerpo central) produce NaN sin avisos
+    with np.errstate(divide='ignore', invalid='ignore'):
+        energy = 0.5 * v2 - mu / r
+        a = -mu / (2.0 * energy)
+        e_vec = ((v2 - mu / r)[:, np.newaxis] * r_vec - rv[:, np.newaxis] * v_vec) / mu[:, np.newaxis]
+        e = np.sqrt(np.einsum('ij,ij->i', e_vec, e_vec))
+        inclination = np.arccos(np.clip(-h[:, 1] / h_norm, -1.0, 1.0))
+        bound = (a > 0) & (e < 1)
+        period = np.where(bound, 2 * np.pi * np.sqrt(np.where(bound, a, 0.0) ** 3 / mu), np.nan)
+    
+    return {
+        'semi_major_axis': a,
+        'eccentricity': e,
+        'inclination': inclination,
+        'period': period
+    }
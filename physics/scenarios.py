@@ -0,0 +1,279 @@
+# physics/scenarios.py
+"""
+Generación vectorizada de escenarios a partir de elementos orbitales
+Cinturones de asteroides, cinturón de Kuiper, sistemas de lunas y
+catálogos externos (CSV/NPZ) cargados directamente en los arreglos
+del simulador, sin crear un CelestialBody por cuerpo
+"""
+
+import itertools
+import os
+import zipfile
+
+import numpy as np
+
+from .constants import G, AU, SUN_MASS
+from .orbital_elements import DEG, elements_to_state_vectors
+
+# Densidad típica de cuerpos menores rocosos/helados (kg/m³)
+ASTEROID_DENSITY = 2000.0
+ICY_DENSITY = 1000.0
+
+# Columnas reconocidas en catálogos
+CARTESIAN_COLUMNS = ('x', 'y', 'z', 'vx', 'vy', 'vz')
+ELEMENT_COLUMNS = ('a', 'e', 'i', 'raan', 'argp', 'M')
+
+
+def _radii_from_masses(masses, density):
+    """Radio de una esfera homogénea de la masa y densidad dadas"""
+    return np.cbrt(3.0 * masses / (4.0 * np.pi * density))
+
+
+def generate_belt(n, a_range, e_max, i_max, mass_range=(1e12, 1e18),
+                  density=ASTEROID_DENSITY, central_mass=SUN_MASS, seed=None):
+    """
+    Genera un cinturón de n cuerpos con elementos orbitales aleatorios
+    
+    Args:
+        n: número de cuerpos
+        a_range: (a_min, a_max) del semieje mayor en metros
+        e_max: excentricidad máxima (distribución uniforme en [0, e_max])
+        i_max: inclinación máxima en grados
+        mass_range: (m_min, m_max) en kg, distribución log-uniforme
+        central_mass: masa del cuerpo central (kg)
+        seed: semilla para reproducibilidad
+    
+    Returns:
+        dict con positions, velocities, masses y radii listos para add_bodies
+    """
+    rng = np.random.default_rng(seed)
+    
+    a = rng.uniform(a_range[0], a_range[1], n)
+    e = rng.uniform(0.0, e_max, n)
+    inc = rng.uniform(0.0, i_max, n) * DEG
+    raan, argp, M = rng.uniform(0.0, 2 * np.pi, (3, n))
+    
+    positions, velocities = elements_to_state_vectors(a, e, inc, raan, argp, M, G * central_mass)
+    
+    log_m = rng.uniform(np.log10(mass_range[0]), np.log10(mass_range[1]), n)
+    masses = 10.0 ** log_m
+    
+    return {
+        'positions': positions,
+        'velocities': velocities,
+        'masses': masses,
+        'radii': _radii_from_masses(masses, density)
+    }
+
+
+def asteroid_belt(n, seed=None):
+    """Cinturón principal de asteroides (2.1–3.3 AU)"""
+    return generate_belt(n, (2.1 * AU, 3.3 * AU), e_max=0.25, i_max=20.0, seed=seed)
+
+
+def kuiper_belt(n, seed=None):
+    """Cinturón de Kuiper (30–50 AU), objetos helados"""
+    return generate_belt(n, (30.0 * AU, 50.0 * AU), e_max=0.2, i_max=30.0,
+                         mass_range=(1e14, 1e20), density=ICY_DENSITY, seed=seed)
+
+
+def moon_system(simulator, parent, n, r_range=(1.5, 30.0), e_max=0.05, i_max=5.0, seed=None):
+    """
+    Sistema de satélites/escombros alrededor de un cuerpo del simulador
+    
+    Args:
+        simulator: NBodySimulator con el cuerpo padre ya cargado
+        parent: nombre del cuerpo padre ('saturn' o 'Saturno')
+        n: número de satélites
+        r_range: rango del semieje mayor en radios del padre
+    """
+    index = simulator.find_body(parent)
+    body = simulator.bodies[index]
+    
+    arrays = generate_belt(
+        n, (r_range[0] * body.radius, r_range[1] * body.radius),
+        e_max=e_max, i_max=i_max, mass_range=(1e6, 1e12),
+        density=ICY_DENSITY, central_mass=body.mass, seed=seed
+    )
+    arrays['positions'] += simulator.positions[index]
+    arrays['velocities'] += simulator.velocities[index]
+    return arrays
+
+
+def add_to_simulator(simulator, arrays, massless=True):
+    """
+    Agrega arreglos generados al simulador
+    
+    Con massless=True se cargan como partículas de prueba (se descartan
+    masas y radios); si no, como cuerpos masivos completos
+    """
+    if massless:
+        return simulator.add_test_particles(arrays['positions'], arrays['velocities'])
+    return simulator.add_bodies(**arrays)
+
+
+def add_asteroid_belt(simulator, n, seed=None, massless=True):
+    """Agrega un cinturón de asteroides al simulador"""
+    return add_to_simulator(simulator, asteroid_belt(n, seed=seed), massless)
+
+
+def add_kuiper_belt(simulator, n, seed=None, massless=True):
+    """Agrega un cinturón de Kuiper al simulador"""
+    return add_to_simulator(simulator, kuiper_belt(n, seed=seed), massless)
+
+
+def add_moon_system(simulator, parent, n, seed=None, massless=True, **kwargs):
+    """Agrega un sistema de satélites alrededor de parent"""
+    return add_to_simulator(simulator, moon_system(simulator, parent, n, seed=seed, **kwargs), massless)
+
+
+# ==================== Catálogos ====================
+
+def iter_catalog(path, chunk_size=100_000):
+    """
+    Itera un catálogo en bloques de a lo sumo chunk_size filas
+    
+    Formatos:
+        .csv: primera línea con nombres de columna separados por coma
+        .npz: un arreglo 1D por columna
+    
+    Yields:
+        dict columna -> arreglo 1D
+    
+    Ningún formato se carga entero: en NPZ cada columna se lee del zip
+    bloque a bloque y en CSV se parsean chunk_size líneas cada vez
+    """
+    ext = os.path.splitext(path)[1].lower()
+    
+    if ext == '.npz':
+        with zipfile.ZipFile(path) as archive:
+            columns = _npz_columns(archive)
+            total = min((shape[0] for _, shape, _ in columns.values()), default=0)
+            try:
+                for start in range(0, total, chunk_size):
+                    rows = min(chunk_size, total - start)
+                    yield {key: np.frombuffer(stream.read(rows * dtype.itemsize), dtype=dtype)
+                           for key, (stream, _, dtype) in columns.items()}
+            finally:
+                for stream, _, _ in columns.values():
+                    stream.close()
+    
+    elif ext == '.csv':
+        with open(path) as f:
+            header = [name.strip() for name in f.readline().split(',')]
+            while True:
+                lines = list(itertools.islice(f, chunk_size))
+                if not lines:
+                    break
+                table = np.loadtxt(lines, delimiter=',', ndmin=2)
+                if len(table):
+                    yield {name: table[:, k] for k, name in enumerate(header)}
+    
+    else:
+        raise ValueError(f"Formato de catálogo no soportado: {ext}")
+
+
+def _npz_columns(archive):
+    """
+    Abre cada miembro .npy de un NPZ y deja el stream tras su cabecera
+    
+    Returns:
+        dict columna -> (stream, shape, dtype)
+    """
+    columns = {}
+    for member in archive.namelist():
+        if not member.endswith('.npy'):
+            continue
+        stream = archive.open(member)
+        version = np.lib.format.read_magic(stream)
+        if version == (1, 0):
+            shape, _, dtype = np.lib.format.read_array_header_1_0(stream)
+        else:
+            shape, _, dtype = np.lib.format.read_array_header_2_0(stream)
+        if len(shape) != 1 or dtype.hasobject:
+            stream.close()
+            raise ValueError(f"La columna '{member[:-4]}' del catálogo debe ser un arreglo 1D numérico")
+        columns[member[:-4]] = (stream, shape, dtype)
+    return columns
+
+
+def catalog_size(path):
+    """Número de filas de un catálogo sin cargarlo (solo cabeceras en NPZ)"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.npz':
+        with zipfile.ZipFile(path) as archive:
+            columns = _npz_columns(archive)
+            for stream, _, _ in columns.values():
+                stream.close()
+        return min((shape[0] for _, shape, _ in columns.values()), default=0)
+    if ext == '.csv':
+        with open(path) as f:
+            f.readline()
+            # Mismas líneas que descarta np.loadtxt: vacías y comentarios
+            return sum(1 for line in f if line.strip() and not line.lstrip().startswith('#'))
+    raise ValueError(f"Formato de catálogo no soportado: {ext}")
+
+
+def catalog_chunk_to_arrays(chunk, central_mass=SUN_MASS, default_mass=1e15):
+    """
+    Convierte un bloque de catálogo a arreglos de estado
+    
+    Columnas cartesianas: x, y, z (m), vx, vy, vz (m/s)
+    Columnas de elementos: a (AU), e, i, raan, argp, M (grados)
+    Opcionales: mass (kg), radius (m)
+    """
+    if all(col in chunk for col in CARTESIAN_COLUMNS):
+        positions = np.column_stack([chunk['x'], chunk['y'], chunk['z']])
+        velocities = np.column_stack([chunk['vx'], chunk['vy'], chunk['vz']])
+    elif all(col in chunk for col in ELEMENT_COLUMNS):
+        positions, velocities = elements_to_state_vectors(
+            chunk['a'] * AU, chunk['e'], chunk['i'] * DEG,
+            chunk['raan'] * DEG, chunk['argp'] * DEG, chunk['M'] * DEG,
+            G * central_mass
+        )
+    else:
+        raise ValueError(f"Columnas insuficientes en el catálogo: {sorted(chunk)}")
+    
+    count = len(positions)
+    masses = np.asarray(chunk.get('mass', np.full(count, default_mass)), dtype=np.float64)
+    radii = chunk.get('radius')
+    if radii is None:
+        radii = _radii_from_masses(masses, ASTEROID_DENSITY)
+    
+    return {
+        'positions': positions,
+        'velocities': velocities,
+        'masses': masses,
+        'radii': np.asarray(radii, dtype=np.float64)
+    }
+
+
+def load_catalog(simulator, path, chunk_size=100_000, massless=False, **kwargs):
+    """
+    Carga un catálogo completo en el simulador procesándolo por bloques
+    Cada bloque se escribe en arreglos destino reservados de antemano
+    (catalog_size), así que la memoria máxima es el catálogo convertido
+    más un bloque; con massless=True los cuerpos se cargan como
+    partículas de prueba y no se reservan masas ni radios
+    
+    Returns:
+        número de cuerpos agregados
+    """
+    total = catalog_size(path)
+    if total == 0:
+        return 0
+    
+    keys = ('positions', 'velocities') if massless else ('positions', 'velocities', 'masses', 'radii')
+    merged = {key: np.empty((total, 3) if key in ('positions', 'velocities') else total)
+              for key in keys}
+    filled = 0
+    for chunk in iter_catalog(path, chunk_size):
+        arrays = catalog_chunk_to_arrays(chunk, **kwargs)
+        count = min(len(arrays['positions']), total - filled)
+        for key in keys:
+            merged[key][filled:filled + count] = arrays[key][:count]
+        filled += count
+    
+    if filled < total:
+        merged = {key: value[:filled] for key, value in merged.items()}
+    return add_to_simulator(simulator, merged, massless)
@@ -0,0 +1,169 @@
+# physics/spatial.py
+"""
+Índice espacial sobre las posiciones de un snapshot de la simulación
+KD-tree (scipy) construido una sola vez por snapshot y compartido por
+todas las consultas de ese instante (culling por cliente, vecinos, regiones)
+
+Crear el índice solo copia las posiciones; el árbol se construye en la
+primera consulta. Así el servidor toma el snapshot con el lock de la
+simulación y paga la construcción (~0.2 s con 100k puntos) fuera de él.
+"""
+
+import threading
+
+import numpy as np
+
+from .constants import SOLAR_SYSTEM_DATA
+
+MAX_BOX_TILES = 64  # cubos de Chebyshev por query_box como máximo
+
+
+class SpatialIndex:
+    """
+    KD-tree sobre cuerpos masivos y partículas de prueba de un snapshot
+    
+    Las filas 0..n_bodies-1 son cuerpos masivos (en el orden de
+    simulator.positions) y las siguientes, partículas de prueba.
+    Las primeras len(names) filas son los cuerpos con nombre.
+    """
+    
+    def __init__(self, positions, n_bodies, time=0.0, names=()):
+        self.positions = np.ascontiguousarray(positions, dtype=np.float64)
+        self.n_bodies = n_bodies
+        self.time = time
+        self.names = list(names)
+        self._tree = None
+        self._lazy_lock = threading.Lock()
+    
+    @property
+    def tree(self):
+        """cKDTree de las posiciones, construido en el primer uso (una sola vez entre hilos)"""
+        if self._tree is None:
+            with self._lazy_lock:
+                if self._tree is None:
+                    # Importación diferida: scipy solo se carga si se usan consultas espaciales
+                    from scipy.spatial import cKDTree
+                    
+                    # Árbol sin balancear y hojas grandes: construcción ~2x más rápida, consultas casi igual
+                    self._tree = cKDTree(self.positions, leafsize=64, balanced_tree=False,
+                                         compact_nodes=False)
+        return self._tree
+    
+    @classmethod
+    def from_simulator(cls, simulator):
+        """Índice del estado actual del simulador (copia las posiciones)"""
+        positions = np.concatenate([simulator.positions, simulator.test_positions])
+        names = [body.name for body in simulator.bodies]
+        return cls(positions, simulator.n_bodies, simulator.time, names)
+    
+    def __len__(self):
+        return len(self.positions)
+    
+    def query_ball(self, center, radius):
+        """Índices de los puntos a distancia <= radius de center"""
+        if not len(self.positions):
+            return np.zeros(0, dtype=np.intp)
+        # Si la esfera contiene toda la caja del árbol no hace falta recorrerlo
+        center = np.asarray(center, dtype=np.float64)
+        corner = np.maximum(np.abs(center - self.tree.mins), np.abs(center - self.tree.maxes))
+        if np.linalg.norm(corner) <= radius:
+            return np.arange(len(self.positions))
+        return np.asarray(self.tree.query_ball_point(center, radius), dtype=np.intp)
+    
+    def query_box(self, lower, upper):
+        """
+        Índices (ordenados) de los puntos dentro de la caja [lower, upper]
+        
+        Fase amplia: bola de Chebyshev (p=inf, un cubo) del KD-tree
+        alrededor del centro de la caja. Una caja alargada se cubre con
+        varios cubos del lado de su eje más corto (como máximo
+        MAX_BOX_TILES), así una losa delgada no recorre su cubo envolvente.
+        Después se filtra exactamente por los límites.
+        """
+        lower = np.asarray(lower, dtype=np.float64)
+        upper = np.asarray(upper, dtype=np.float64)
+        if np.any(upper < lower):
+            raise ValueError("La caja debe cumplir lower <= upper")
+        if not len(self.positions):
+            return np.zeros(0, dtype=np.intp)
+        tree = self.tree
+        if np.all(lower <= tree.mins) and np.all(upper >= tree.maxes):
+            return np.arange(len(self.positions))
+        
+        extent = upper - lower
+        side = max(float(extent.min()), float(extent.max()) / MAX_BOX_TILES)
+        if side == 0.0:
+            counts = np.ones(3, dtype=np.intp)
+        else:
+            counts = np.maximum(1, np.ceil(extent / side)).astype(np.intp)
+            while np.prod(counts) > MAX_BOX_TILES:
+                side *= 1.25
+                counts = np.maximum(1, np.ceil(extent / side)).astype(np.intp)
+        
+        # Margen relativo para que el redondeo no deje fuera puntos sobre el borde (el filtro exacto decide)
+        if np.prod(counts) == 1:
+            half = 0.5 * float(extent.max()) * (1 + 1e-9)
+            candidates = np.asarray(tree.query_ball_point(0.5 * (lower + upper), half, p=np.inf),
+                                    dtype=np.intp)
+        else:
+            # Centros de una rejilla counts[0] x counts[1] x counts[2]; cada cubo de lado side cubre su celda
+            axes = [lower[k] + (np.arange(counts[k]) + 0.5) * extent[k] / counts[k] for k in range(3)]
+            centers = np.stack(np.meshgrid(*axes, indexing='ij'), axis=-1).reshape(-1, 3)
+            hits = tree.query_ball_point(centers, 0.5 * side * (1 + 1e-9), p=np.inf, return_sorted=False)
+            # Los cubos vecinos se solapan: una máscara quita duplicados en O(N), sin ordenar
+            seen = np.zeros(len(self.positions), dtype=bool)
+            for hit in hits:
+                seen[hit] = True
+            candidates = np.flatnonzero(seen)
+        
+        points = self.positions[candidates]
+        inside = np.all((points >= lower) & (points <= upper), axis=1)
+        return np.sort(candidates[inside])
+    
+    def nearest(self, point, k=1):
+        """(distancias, índices) de los k puntos más cercanos a point"""
+        k = min(int(k), len(self.positions))
+        if k <= 0:
+            return np.zeros(0), np.zeros(0, dtype=np.intp)
+        distances, indices = self.tree.query(point, k=k)
+        return np.atleast_1d(distances), np.atleast_1d(indices).astype(np.intp)
+    
+    def find(self, name):
+        """Fila de un cuerpo con nombre (nombre visible o clave), como NBodySimulator.find_body"""
+        if name in self.names:
+            return self.names.index(name)
+        data = SOLAR_SYSTEM_DATA.get(str(name).lower())
+        if data is not None and data['name'] in self.names:
+            return self.names.index(data['name'])
+        raise KeyError(f"Cuerpo desconocido: {name}")
+    
+    def describe(self, indices, distances=None, unit=1.0):
+        """
+        Filas del árbol como diccionarios serializables
+        
+        kind: 'body' (con nombre), 'massive' (sin metadatos) o 'particle'
+        (partícula de prueba; 'index' es entonces su fila en test_positions).
+        Posiciones y distancias en metros / unit.
+        """
+        indices = np.asarray(indices, dtype=np.intp)
+        positions = (self.positions[indices] / unit).tolist()
+        named = len(self.names)
+        items = []
+        for row, (i, position) in enumerate(zip(indices.tolist(), positions)):
+            if i < named:
+                item = {'kind': 'body', 'index': i, 'name': self.names[i]}
+            elif i < self.n_bodies:
+                item = {'kind': 'massive', 'index': i}
+            else:
+                item = {'kind': 'particle', 'index': i - self.n_bodies}
+            item['position'] = position
+            if distances is not None:
+                item['distance'] = float(distances[row]) / unit
+            items.append(item)
+        return items
+    
+    def split(self, indices):
+        """Separa índices del árbol en (cuerpos masivos, partículas de prueba)"""
+        indices = np.asarray(indices, dtype=np.intp)
+        massive = indices < self.n_bodies
+        return indices[massive], indices[~massive] - self.n_bodies
@@ -0,0 +1,14 @@
+# server/__init__.py
+"""
+Utilidades del servidor web: métricas, planificación en tiempo real,
+publicación del estado (memoria compartida, SSE) y trabajos en segundo plano
+"""
+
+from .jobs import JobManager, JobQueueFull
+from .metrics import MetricsRegistry, RollingHistogram
+from .scheduler import RealTimeScheduler
+from .shared_state import SimulationProcess, StatePublisher, StateReader
+from .stream import FrameBroadcaster
+
+__all__ = ['FrameBroadcaster', 'JobManager', 'JobQueueFull', 'MetricsRegistry', 'RollingHistogram', 'RealTimeScheduler',
+           'SimulationProcess', 'StatePublisher', 'StateReader']
@@ -0,0 +1,414 @@
+# server/jobs.py
+"""
+Cola de trabajos en segundo plano para integraciones largas
+Cada trabajo corre physics.batch.run_batch en su propio proceso, con
+un máximo de procesos simultáneos y una cola de espera acotada, de modo
+que los análisis pesados no compiten con el simulador interactivo ni
+lo modifican. El progreso y la cancelación se comparten por memoria
+(multiprocessing.Value / Event) y el resultado se escribe en un .npz
+comprimido que el servidor entrega al terminar.
+
+Uso:
+    jobs = JobManager(max_workers=2)
+    job = jobs.submit({'scenario': 'solar', 'span': '1000y', 'dt': '1d', 'stride': 365})
+    jobs.get(job.id).to_dict()      # estado y progreso
+    jobs.cancel(job.id)
+"""
+
+import contextlib
+import io
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+QUEUED, RUNNING, COMPLETED, CANCELLED, FAILED = 'queued', 'running', 'completed', 'cancelled', 'failed'
+FINISHED = (COMPLETED, CANCELLED, FAILED)
+
+# Límites de una petición
+MAX_BODIES_EXTRA = 200000
+MAX_OUTPUT_BYTES = 512 * 2**20
+
+
+class JobQueueFull(Exception):
+    """La cola de espera alcanzó su capacidad"""
+
+
+def validate_spec(spec):
+    """
+    Normaliza y valida la descripción de un trabajo
+    
+    Campos: scenario, method, span, dt (duraciones como en la CLI: '10y', '1d'),
+    stride, belt, kuiper, seed, particles, backend
+    
+    Raises:
+        ValueError si algún campo es inválido
+    """
+    from physics.batch import METHODS, SCENARIOS, check_duration, parse_duration
+    from physics.kernels import available_backends
+    
+    if not isinstance(spec, dict):
+        raise ValueError("El trabajo debe ser un objeto JSON")
+    
+    options = {
+        'scenario': str(spec.get('scenario', 'solar')),
+        'method': str(spec.get('method', 'verlet')),
+        'backend': str(spec.get('backend', 'auto')),
+        'span': parse_duration(spec.get('span', '1y')),
+        'time_step': parse_duration(spec.get('dt', 3600)),
+        'stride': int(spec.get('stride', 1)),
+        'belt': int(spec.get('belt', 0)),
+        'kuiper': int(spec.get('kuiper', 0)),
+        'seed': None if spec.get('seed') is None else int(spec['seed']),
+        'particles': bool(spec.get('particles', False))
+    }
+    if options['scenario'] not in SCENARIOS:
+        raise ValueError(f"Escenario desconocido: {options['scenario']}")
+    if options['method'] not in METHODS:
+        raise ValueError(f"Método desconocido: {options['method']}")
+    backends = available_backends()
+    if options['backend'] not in backends:
+        raise ValueError(f"Backend desconocido o no disponible: {options['backend']} "
+                         f"(disponibles: {', '.join(backends)})")
+    check_duration(options['span'], 'span')
+    check_duration(options['time_step'], 'dt')
+    if options['stride'] < 1:
+        raise ValueError("'stride' debe ser >= 1")
+    if not (0 <= options['belt'] <= MAX_BODIES_EXTRA and 0 <= options['kuiper'] <= MAX_BODIES_EXTRA):
+        raise ValueError(f"'belt' y 'kuiper' deben estar entre 0 y {MAX_BODIES_EXTRA}")
+    
+    # Tamaño de la trayectoria guardada (posiciones + velocidades de ~10 cuerpos con nombre)
+    frames = int(options['span'] / options['time_step']) // options['stride'] + 1
+    per_frame = 10 * 6 * 8
+    if options['particles']:
+        per_frame += (options['belt'] + options['kuiper']) * 3 * 4
+    if frames * per_frame > MAX_OUTPUT_BYTES:
+        raise ValueError(f"La trayectoria ocuparía ~{frames * per_frame / 2**20:.0f} MB; "
+                         f"aumenta 'stride' (límite {MAX_OUTPUT_BYTES // 2**20} MB)")
+    return options
+
+
+def run_job(job_id, options, path, progress, cancel, results):
+    """
+    Cuerpo del proceso de un trabajo
+    
+    Integra el escenario, guarda la trayectoria en `path` y envía
+    (job_id, resumen o error) por `results`. Si se cancela se guarda
+    la trayectoria parcial hasta el último paso completado.
+    """
+    try:
+        from physics.batch import build_simulator, run_batch, save_trajectory
+        
+        with contextlib.redirect_stdout(io.StringIO()):
+            simulator = build_simulator(
+                scenario=options['scenario'],
+                method=options['method'],
+                time_step=options['time_step'],
+                backend=options['backend'],
+                belt=options['belt'],
+                kuiper=options['kuiper'],
+                seed=options['seed']
+            )
+            
+            def report(fraction):
+                progress.value = fraction
+            
+            result = run_batch(simulator, options['span'], stride=options['stride'],
+                               include_particles=options['particles'],
+                               progress=report, should_stop=cancel.is_set, progress_reports=1000)
+        
+        # Escritura atómica: el servidor nunca entrega un archivo a medias
+        partial = path + '.part.npz'
+        save_trajectory(partial, simulator, result, compressed=True)
+        os.replace(partial, path)
+        
+        if not result['cancelled']:
+            progress.value = 1.0
+        results.put((job_id, {
+            'cancelled': result['cancelled'],
+            'bodies': simulator.n_bodies,
+            'test_particles': simulator.n_test_particles,
+            'steps': result['steps'],
+            'frames': len(result['times']),
+            'sim_time': simulator.time,
+            'wall_time': round(result['wall_time'], 3),
+            'steps_per_second': round(result['steps_per_second'], 1),
+            'energy_drift': result['energy_drift'],
+            'bytes': os.path.getsize(path)
+        }))
+    except Exception as e:
+        results.put((job_id, {'error': f"{type(e).__name__}: {e}"}))
+
+
+class Job:
+    """Estado de un trabajo visto desde el servidor"""
+    
+    def __init__(self, job_id, options, path):
+        self.id = job_id
+        self.options = options
+        self.path = path
+        self.status = QUEUED
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.summary = None
+        self.error = None
+        self.process = None
+        self.progress = None
+        self.cancel_event = None
+    
+    @property
+    def fraction(self):
+        if self.status == COMPLETED:
+            return 1.0
+        return float(self.progress.value) if self.progress is not None else 0.0
+    
+    @property
+    def has_result(self):
+        return self.status in (COMPLETED, CANCELLED) and os.path.exists(self.path)
+    
+    def to_dict(self):
+        now = time.time()
+        elapsed = None
+        eta = None
+        if self.started_at is not None:
+            elapsed = (self.finished_at or now) - self.started_at
+            fraction = self.fraction
+            if self.status == RUNNING and fraction > 0:
+                eta = elapsed * (1 - fraction) / fraction
+        return {
+            'id': self.id,
+            'status': self.status,
+            'progress': round(self.fraction, 4),
+            'options': self.options,
+            'submitted_at': self.submitted_at,
+            'elapsed': None if elapsed is None else round(elapsed, 3),
+            'eta': None if eta is None else round(eta, 1),
+            'result': self.summary,
+            'error': self.error,
+            'has_result': self.has_result
+        }
+
+
+class JobManager:
+    """
+    Pool acotado de procesos para trabajos por lotes
+    
+    Args:
+        max_workers: procesos de integración simultáneos
+        max_queued: trabajos en espera antes de rechazar (JobQueueFull)
+        max_finished: trabajos terminados que se conservan (los más antiguos se borran)
+        output_dir: directorio de los .npz de resultados
+        context: método de arranque de multiprocessing ('spawn' no hereda el estado del servidor)
+    """
+    
+    def __init__(self, max_workers=2, max_queued=16, max_finished=50,
+                 output_dir=None, context='spawn', poll_interval=0.2):
+        import multiprocessing
+        
+        self.max_workers = max(1, int(max_workers))
+        self.max_queued = max(0, int(max_queued))
+        self.max_finished = max(1, int(max_finished))
+        self.output_dir = output_dir or os.path.join(os.getcwd(), 'runs', 'jobs')
+        self.poll_interval = poll_interval
+        self._ctx = multiprocessing.get_context(context)
+        self._results = None
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._dispatcher = None
+        self._closed = False
+    
+    # ---------- API pública ----------
+    
+    def submit(self, spec):
+        """Encola un trabajo; devuelve el Job (ValueError / JobQueueFull si no se acepta)"""
+        options = validate_spec(spec)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("El gestor de trabajos está cerrado")
+            queued = sum(1 for job in self._jobs.values() if job.status == QUEUED)
+            if queued >= self.max_queued:
+                raise JobQueueFull(f"Cola llena ({self.max_queued} trabajos en espera)")
+            job_id = uuid.uuid4().hex[:12]
+            job = Job(job_id, options, os.path.join(self.output_dir, f'{job_id}.npz'))
+            self._jobs[job_id] = job
+            self._ensure_dispatcher()
+        self._wake.set()
+        return job
+    
+    def get(self, job_id):
+        """Job por id (KeyError si no existe)"""
+        with self._lock:
+            return self._jobs[job_id]
+    
+    def list(self):
+        with self._lock:
+            return list(self._jobs.values())
+    
+    def cancel(self, job_id):
+        """
+        Cancela un trabajo en espera o en curso
+        El proceso en curso termina tras el paso actual y guarda la trayectoria parcial
+        """
+        with self._lock:
+            job = self._jobs[job_id]
+            if job.status == QUEUED:
+                job.status = CANCELLED
+                job.finished_at = time.time()
+            elif job.status == RUNNING:
+                job.cancel_event.set()
+        self._wake.set()
+        return job
+    
+    def delete(self, job_id):
+        """Elimina un trabajo terminado y su archivo de resultados"""
+        with self._lock:
+            job = self._jobs[job_id]
+            if job.status not in FINISHED:
+                raise ValueError("Solo se pueden eliminar trabajos terminados; cancélalo primero")
+            del self._jobs[job_id]
+        self._remove_file(job)
+    
+    def counts(self):
+        """Número de trabajos por estado"""
+        counts = {status: 0 for status in (QUEUED, RUNNING) + FINISHED}
+        with self._lock:
+            for job in self._jobs.values():
+                counts[job.status] += 1
+        return counts
+    
+    def shutdown(self, timeout=5.0):
+        """Cancela todo y espera a los procesos en curso"""
+        with self._lock:
+            self._closed = True
+            for job in self._jobs.values():
+                if job.status == QUEUED:
+                    job.status = CANCELLED
+                elif job.status == RUNNING:
+                    job.cancel_event.set()
+        self._wake.set()
+        if self._dispatcher is not None:
+            self._dispatcher.join(timeout)
+        with self._lock:
+            running = [job for job in self._jobs.values() if job.status == RUNNING]
+        for job in running:
+            if job.process.pid is None:
+                continue  # el despachador no llegó a lanzarlo
+            job.process.join(timeout)
+            if job.process.is_alive():
+                job.process.terminate()
+    
+    # ---------- Despacho ----------
+    
+    def _ensure_dispatcher(self):
+        if self._dispatcher is None or not self._dispatcher.is_alive():
+            os.makedirs(self.output_dir, exist_ok=True)
+            if self._results is None:
+                self._results = self._ctx.Queue()
+            self._dispatcher = threading.Thread(target=self._dispatch_loop, daemon=True)
+            self._dispatcher.start()
+    
+    def _prepare(self, job):
+        """Crea el proceso del trabajo y lo marca en curso (con el lock tomado; no lo arranca)"""
+        ctx = self._ctx
+        job.progress = ctx.Value('d', 0.0, lock=False)
+        job.cancel_event = ctx.Event()
+        job.process = ctx.Process(
+            target=run_job,
+            args=(job.id, job.options, job.path, job.progress, job.cancel_event, self._results),
+            daemon=True
+        )
+        job.status = RUNNING
+        job.started_at = time.time()
+    
+    def _start(self, job):
+        """Arranca el proceso preparado (sin el lock: spawn lanza un intérprete nuevo)"""
+        try:
+            job.process.start()
+        except Exception as e:
+            with self._lock:
+                job.status = FAILED
+                job.error = f"No se pudo lanzar el proceso: {type(e).__name__}: {e}"
+                job.finished_at = time.time()
+    
+    def _collect(self):
+        """Aplica los resultados recibidos de los procesos"""
+        while True:
+            try:
+                job_id, summary = self._results.get_nowait()
+            except queue.Empty:
+                return
+            with self._lock:
+                job = self._jobs.get(job_id)
+                if job is None:
+                    continue
+                job.finished_at = time.time()
+                if 'error' in summary:
+                    job.status = FAILED
+                    job.error = summary['error']
+                else:
+                    job.status = CANCELLED if summary.pop('cancelled') else COMPLETED
+                    job.summary = summary
+    
+    def _dispatch_loop(self):
+        while True:
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            self._collect()
+            
+            with self._lock:
+                running = [job for job in self._jobs.values() if job.status == RUNNING]
+                for job in running:
+                    if not job.process.is_alive():
+                        job.process.join()
+                # El resultado puede llegar justo después de que el proceso termine
+                exited = [job for job in running if job.process.exitcode is not None]
+            if exited:
+                self._collect()
+            
+            with self._lock:
+                for job in exited:
+                    if job.status == RUNNING:
+                        job.status = FAILED
+                        job.error = f"El proceso terminó con código {job.process.exitcode}"
+                        job.finished_at = time.time()
+                active = sum(1 for job in self._jobs.values() if job.status == RUNNING)
+                starting = []
+                if not self._closed:
+                    for job in self._jobs.values():
+                        if active >= self.max_workers:
+                            break
+                        if job.status == QUEUED:
+                            self._prepare(job)
+                            starting.append(job)
+                            active += 1
+                expired = self._expire()
+                idle = active == 0 and not any(job.status == QUEUED for job in self._jobs.values())
+            
+            # Los procesos se lanzan fuera del lock para no bloquear las consultas de estado
+            for job in starting:
+                self._start(job)
+            for job in expired:
+                self._remove_file(job)
+            if idle:
+                # Sin trabajo pendiente el hilo termina; submit() lo vuelve a lanzar
+                with self._lock:
+                    if not any(job.status in (QUEUED, RUNNING) for job in self._jobs.values()):
+                        self._dispatcher = None
+                        return
+    
+    def _expire(self):
+        """Quita los trabajos terminados más antiguos por encima de max_finished"""
+        finished = [job for job in self._jobs.values() if job.status in FINISHED]
+        expired = finished[:max(0, len(finished) - self.max_finished)]
+        for job in expired:
+            del self._jobs[job.id]
+        return expired
+    
+    @staticmethod
+    def _remove_file(job):
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(job.path)
@@ -0,0 +1,171 @@
+# server/metrics.py
+"""
+Instrumentación de bajo coste por fase del loop de simulación
+Expone histogramas y gauges en formato de texto de Prometheus
+
+Los tiempos por fase son exclusivos: si una fase se mide dentro de
+otra en el mismo hilo (p.ej. 'spatial_index' dentro de 'culling'), su
+duración se descuenta de la fase exterior. Así la suma de todas las
+fases nunca cuenta dos veces el mismo intervalo.
+"""
+
+import bisect
+import threading
+import time
+from collections import deque
+
+# Límites de los buckets en segundos (de 10 µs a 10 s)
+DEFAULT_BUCKETS = (
+    1e-5, 5e-5, 1e-4, 5e-4, 1e-3, 2.5e-3, 5e-3,
+    1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0, 2.5, 10.0
+)
+
+# Cuantiles reportados sobre la ventana deslizante
+DEFAULT_QUANTILES = (0.5, 0.9, 0.99)
+
+
+class RollingHistogram:
+    """
+    Histograma con dos vistas:
+    - buckets acumulados desde el arranque (semántica de histogram de Prometheus)
+    - ventana con las últimas `window` muestras para cuantiles recientes
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, window=1024):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # último = +Inf
+        self.total = 0.0
+        self.count = 0
+        self.recent = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        """Registra una muestra (segundos)"""
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.total += value
+            self.count += 1
+            self.recent.append(value)
+
+    def quantiles(self, qs=DEFAULT_QUANTILES):
+        """Cuantiles de la ventana reciente"""
+        with self._lock:
+            data = sorted(self.recent)
+        if not data:
+            return {q: 0.0 for q in qs}
+        last = len(data) - 1
+        return {q: data[min(last, int(round(q * last)))] for q in qs}
+
+    def snapshot(self):
+        """Copia consistente de los contadores acumulados"""
+        with self._lock:
+            return list(self.counts), self.total, self.count
+
+
+class _Timer:
+    """
+    Context manager que mide una fase y la registra al salir
+    Registra solo el tiempo exclusivo: descuenta el de las fases anidadas
+    """
+
+    __slots__ = ('histogram', 'stack', 'start', 'nested')
+
+    def __init__(self, histogram, stack):
+        self.histogram = histogram
+        self.stack = stack
+
+    def __enter__(self):
+        self.nested = 0.0
+        self.stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        self.stack.pop()
+        self.histogram.observe(max(0.0, elapsed - self.nested))
+        if self.stack:
+            self.stack[-1].nested += elapsed
+        return False
+
+
+class MetricsRegistry:
+    """Registro de histogramas por fase y gauges del servidor"""
+
+    def __init__(self, prefix='nbody', window=1024):
+        self.prefix = prefix
+        self.window = window
+        self.phases = {}
+        self.gauges = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()  # pila de timers abiertos por hilo
+
+    def histogram(self, phase):
+        """Obtiene (o crea) el histograma de una fase"""
+        hist = self.phases.get(phase)
+        if hist is None:
+            with self._lock:
+                hist = self.phases.setdefault(phase, RollingHistogram(window=self.window))
+        return hist
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def timer(self, phase):
+        """Context manager para medir una fase: `with metrics.timer('forces'): ...`"""
+        return _Timer(self.histogram(phase), self._stack())
+
+    def observe(self, phase, seconds):
+        """
+        Registra una duración medida externamente
+        Si hay un timer abierto en el hilo, se descuenta de él (es una subfase)
+        """
+        self.histogram(phase).observe(seconds)
+        stack = self._stack()
+        if stack:
+            stack[-1].nested += seconds
+
+    def set_gauge(self, name, value, help_text=''):
+        """Fija el valor de un gauge"""
+        self.gauges[name] = (float(value), help_text)
+
+    def render(self):
+        """Serializa todas las métricas en formato de texto de Prometheus"""
+        name = f'{self.prefix}_phase_seconds'
+        lines = [
+            f'# HELP {name} Duración exclusiva de cada fase del loop de simulación (sin fases anidadas)',
+            f'# TYPE {name} histogram'
+        ]
+        phases = sorted(self.phases.items())
+        for phase, hist in phases:
+            counts, total, count = hist.snapshot()
+            cumulative = 0
+            for bound, c in zip(hist.buckets, counts):
+                cumulative += c
+                lines.append(f'{name}_bucket{{phase="{phase}",le="{bound:g}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{phase="{phase}",le="+Inf"}} {count}')
+            lines.append(f'{name}_sum{{phase="{phase}"}} {total:.9g}')
+            lines.append(f'{name}_count{{phase="{phase}"}} {count}')
+
+        recent = f'{self.prefix}_phase_recent_seconds'
+        lines.append(f'# HELP {recent} Cuantiles sobre las últimas {self.window} muestras por fase')
+        lines.append(f'# TYPE {recent} summary')
+        for phase, hist in phases:
+            for q, value in hist.quantiles().items():
+                lines.append(f'{recent}{{phase="{phase}",quantile="{q:g}"}} {value:.9g}')
+            counts, total, count = hist.snapshot()
+            lines.append(f'{recent}_sum{{phase="{phase}"}} {total:.9g}')
+            lines.append(f'{recent}_count{{phase="{phase}"}} {count}')
+
+        for gauge, (value, help_text) in sorted(self.gauges.items()):
+            full = f'{self.prefix}_{gauge}'
+            if help_text:
+                lines.append(f'# HELP {full} {help_text}')
+            lines.append(f'# TYPE {full} gauge')
+            lines.append(f'{full} {value:.9g}')
+
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,159 @@
+# server/scheduler.py
+"""
+Planificador de tiempo real para el loop de simulación
+Mantiene el paso físico acotado (precisión) y alcanza la velocidad
+pedida ejecutando tantos subpasos como quepan en el presupuesto de
+cada frame. Si no puede seguir el ritmo, reduce la velocidad efectiva
+y la informa en lugar de agrandar el paso o acumular retraso.
+"""
+
+import math
+import time
+
+# Frame del loop original: un paso de 1 h cada 50 ms a escala 1x
+DEFAULT_FRAME_TIME = 0.05
+DEFAULT_MAX_DT = 3600.0
+DEFAULT_BASE_RATE = DEFAULT_MAX_DT / DEFAULT_FRAME_TIME  # s simulados por s real a 1x
+
+
+class RealTimeScheduler:
+    """
+    Reparte el tiempo simulado de cada frame en subpasos de dt <= max_dt
+    
+    - Con velocidad suficiente se usa siempre dt = max_dt y el resto del
+      tiempo pedido pasa al siguiente frame; a baja velocidad, un único
+      paso más corto por frame
+    - El coste por paso se mide en cada frame (media móvil exponencial)
+    - Solo se ejecutan los subpasos que caben en budget_fraction del frame
+    - El retraso no se acumula: un frame lento no obliga a recuperar
+      tiempo en los siguientes (sin espiral de la muerte)
+    """
+    
+    def __init__(self, simulator, frame_time=DEFAULT_FRAME_TIME, max_dt=DEFAULT_MAX_DT,
+                 base_rate=DEFAULT_BASE_RATE, budget_fraction=0.8, max_substeps=1000,
+                 smoothing=0.2):
+        self.simulator = simulator
+        self.frame_time = frame_time
+        self.max_dt = max_dt
+        self.base_rate = base_rate
+        self.budget_fraction = budget_fraction
+        self.max_substeps = max_substeps
+        self.smoothing = smoothing
+        
+        self.time_scale = 1.0
+        self.step_cost = None  # segundos reales por paso (EMA)
+        
+        # Último frame
+        self.substeps = 0
+        self.dt = max_dt
+        self.lagging = False
+        self.achieved_scale = 0.0
+        
+        self._last_frame = None
+        self._carry = 0.0  # tiempo simulado pendiente de frames anteriores
+        self._size = None  # (masivos, partículas) con los que se midió step_cost
+    
+    @property
+    def target_rate(self):
+        """Segundos simulados por segundo real pedidos"""
+        return self.base_rate * self.time_scale
+    
+    def set_time_scale(self, scale):
+        """Cambia la velocidad pedida sin tocar el paso físico máximo"""
+        if not (math.isfinite(scale) and scale > 0):
+            raise ValueError(f"La escala de tiempo debe ser positiva y finita: {scale}")
+        self.time_scale = float(scale)
+    
+    def reset(self, simulator=None):
+        """Reinicia las mediciones (p.ej. tras reiniciar la simulación)"""
+        if simulator is not None:
+            self.simulator = simulator
+        self.step_cost = None
+        self._last_frame = None
+        self._carry = 0.0
+        self._size = None
+    
+    def plan(self, wall_elapsed):
+        """
+        Calcula (substeps, dt) para un frame de wall_elapsed segundos reales
+        
+        Returns:
+            (substeps, dt, lagging)
+        """
+        # Tiempo simulado pedido; un frame muy largo no se recupera entero
+        wall_elapsed = min(wall_elapsed, 2 * self.frame_time)
+        wanted = self.target_rate * wall_elapsed + self._carry
+        if wanted < self.max_dt:
+            self._carry = 0.0
+            return 1, wanted, False
+        needed = int(wanted // self.max_dt)
+        
+        # Sin coste medido (primer frame tras reset o cambio de tamaño) se
+        # ejecuta un solo subpaso para calibrar en lugar de hasta max_substeps a ciegas
+        affordable = 1
+        if self.step_cost:
+            affordable = int(self.budget_fraction * self.frame_time / self.step_cost)
+        affordable = max(1, min(affordable, self.max_substeps))
+        
+        if needed <= affordable:
+            self._carry = wanted - needed * self.max_dt
+            return needed, self.max_dt, False
+        # Degradación: mismo dt máximo, menos tiempo simulado y sin deuda
+        self._carry = 0.0
+        return affordable, self.max_dt, True
+    
+    def advance(self):
+        """
+        Ejecuta los subpasos de un frame sobre el simulador
+        Debe llamarse con el lock de la simulación tomado
+        
+        Returns:
+            número de subpasos ejecutados
+        """
+        now = time.perf_counter()
+        wall_elapsed = self.frame_time if self._last_frame is None else now - self._last_frame
+        self._last_frame = now
+        
+        sim = self.simulator
+        # El coste medido deja de valer si cambia el número de cuerpos
+        size = (sim.n_bodies, sim.n_test_particles)
+        if size != self._size:
+            self.step_cost = None
+            self._size = size
+        
+        substeps, dt, lagging = self.plan(wall_elapsed)
+        
+        sim.time_step = dt
+        start = time.perf_counter()
+        for _ in range(substeps):
+            sim.step()
+        cost = (time.perf_counter() - start) / substeps
+        
+        if self.step_cost is None:
+            self.step_cost = cost
+        else:
+            self.step_cost += self.smoothing * (cost - self.step_cost)
+        
+        self.substeps = substeps
+        self.dt = dt
+        self.lagging = lagging
+        if wall_elapsed > 0:
+            # Velocidad alcanzada respecto al tiempo real transcurrido (suavizada)
+            achieved = substeps * dt / (wall_elapsed * self.base_rate)
+            self.achieved_scale += self.smoothing * (achieved - self.achieved_scale)
+        return substeps
+    
+    def sleep_time(self, frame_start):
+        """Tiempo a dormir para completar el frame iniciado en frame_start"""
+        return max(0.0, self.frame_time - (time.perf_counter() - frame_start))
+    
+    def stats(self):
+        """Resumen para clientes y métricas"""
+        return {
+            'time_scale': self.time_scale,
+            'achieved_scale': round(self.achieved_scale, 3),
+            'substeps': self.substeps,
+            'dt': self.dt,
+            'step_cost': self.step_cost or 0.0,
+            'lagging': self.lagging
+        }
@@ -0,0 +1,556 @@
+# server/shared_state.py
+"""
+Publicación del estado de la simulación en memoria compartida
+La simulación corre en un proceso dedicado que escribe posiciones,
+velocidades y energía en un doble buffer de multiprocessing.shared_memory;
+cualquier número de procesos web (app.py --shared / --attach) lo leen sin
+copiar ni tomar locks.
+
+Disposición del bloque (slots de 8 bytes):
+    cabecera   control, secuencia global y buffer activo
+    metadatos  JSON con los datos estáticos de los cuerpos con nombre
+    buffer 0   seq, conteos, tiempo, energía, posiciones, velocidades, masas
+    buffer 1   ídem
+
+Protocolo (seqlock por buffer): el escritor publica siempre en el buffer
+inactivo, deja su seq impar mientras escribe y par al terminar, y
+después cambia el buffer activo e incrementa la secuencia global. El
+lector toma el buffer activo y comprueba que su seq no cambió al final.
+"""
+
+import json
+import math
+import os
+import sys
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from physics.nbody import CelestialBody, NBodySimulator
+
+MAGIC = 0x4E424F4459  # 'NBODY'
+LAYOUT_VERSION = 2
+
+HEADER_SLOTS = 32
+META_BYTES = 256 * 1024
+BUFFER_HEADER_SLOTS = 8
+
+# Cabecera: slots enteros
+H_MAGIC, H_VERSION, H_CAPACITY, H_SEQUENCE, H_ACTIVE = 0, 1, 2, 3, 4
+H_META_VERSION, H_META_LENGTH, H_WRITER_PID = 5, 6, 7
+H_CONTROL_RUNNING, H_CONTROL_RESET, H_LAGGING = 8, 9, 10
+# Cabecera: slots de coma flotante
+H_CONTROL_TIME_SCALE, H_ACHIEVED_SCALE, H_PUBLISHED_AT = 16, 17, 18
+
+# Cabecera de cada buffer: enteros (seq, n_bodies, n_test) y flotantes
+B_SEQ, B_BODIES, B_TEST = 0, 1, 2
+B_TIME, B_KINETIC, B_POTENTIAL, B_TOTAL = 3, 4, 5, 6
+
+
+def _buffer_bytes(capacity):
+    return (BUFFER_HEADER_SLOTS + 7 * capacity) * 8
+
+
+def _total_bytes(capacity):
+    return HEADER_SLOTS * 8 + META_BYTES + 2 * _buffer_bytes(capacity)
+
+
+def _attach(name):
+    """
+    Se une a un bloque existente sin dejarlo a cargo del resource_tracker
+    (si no, el bloque se borraría al salir el primer lector)
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    shm = shared_memory.SharedMemory(name=name)
+    if os.name == 'posix':
+        # Antes de 3.13 unirse también registra el bloque: se deshace solo ese registro
+        resource_tracker.unregister(shm._name, 'shared_memory')
+    return shm
+
+
+def body_metadata(simulator):
+    """Datos estáticos de los cuerpos con nombre (lo que to_dict no recalcula)"""
+    meta = []
+    for body in simulator.bodies:
+        entry = {
+            'name': body.name,
+            'radius': body.radius,
+            'color': body.color,
+            'emissive': body.emissive
+        }
+        if body.has_rings:
+            entry['has_rings'] = True
+            entry['rings'] = body.rings
+        if body.gradient:
+            entry['gradient'] = body.gradient
+        if body.orbital_elements and 'period' in body.orbital_elements:
+            entry['orbital_period'] = body.orbital_elements['period']
+        meta.append(entry)
+    return meta
+
+
+class _Layout:
+    """Vistas numpy sobre un bloque de memoria compartida"""
+    
+    def __init__(self, shm, capacity):
+        self.shm = shm
+        self.capacity = capacity
+        buf = shm.buf
+        self.header = np.ndarray((HEADER_SLOTS,), dtype=np.int64, buffer=buf)
+        self.header_f = np.ndarray((HEADER_SLOTS,), dtype=np.float64, buffer=buf)
+        self.meta = np.ndarray((META_BYTES,), dtype=np.uint8, buffer=buf, offset=HEADER_SLOTS * 8)
+        
+        self.buffers = []
+        for k in range(2):
+            offset = HEADER_SLOTS * 8 + META_BYTES + k * _buffer_bytes(capacity)
+            ints = np.ndarray((BUFFER_HEADER_SLOTS,), dtype=np.int64, buffer=buf, offset=offset)
+            floats = np.ndarray((BUFFER_HEADER_SLOTS,), dtype=np.float64, buffer=buf, offset=offset)
+            data = offset + BUFFER_HEADER_SLOTS * 8
+            positions = np.ndarray((capacity, 3), dtype=np.float64, buffer=buf, offset=data)
+            velocities = np.ndarray((capacity, 3), dtype=np.float64, buffer=buf,
+                                    offset=data + capacity * 24)
+            masses = np.ndarray((capacity,), dtype=np.float64, buffer=buf,
+                                offset=data + capacity * 48)
+            self.buffers.append((ints, floats, positions, velocities, masses))
+    
+    def release(self):
+        # Soltar las vistas antes de cerrar el mmap
+        self.header = self.header_f = self.meta = None
+        self.buffers = []
+        self.shm.close()
+
+
+class StatePublisher:
+    """
+    Escritor del doble buffer (un único proceso: el de la simulación)
+    
+    capacity es el máximo de filas (cuerpos masivos + partículas de prueba)
+    """
+    
+    def __init__(self, capacity, name=None):
+        self.capacity = int(capacity)
+        self.shm = shared_memory.SharedMemory(name=name, create=True, size=_total_bytes(self.capacity))
+        self.name = self.shm.name
+        self._layout = _Layout(self.shm, self.capacity)
+        
+        header = self._layout.header
+        header[:] = 0
+        header[H_MAGIC] = MAGIC
+        header[H_VERSION] = LAYOUT_VERSION
+        header[H_CAPACITY] = self.capacity
+        header[H_CONTROL_RUNNING] = 1
+        header[H_WRITER_PID] = os.getpid()
+        self._layout.header_f[H_CONTROL_TIME_SCALE] = 1.0
+    
+    def set_metadata(self, metadata):
+        """Publica los metadatos estáticos (JSON) e incrementa su versión"""
+        raw = json.dumps(metadata).encode('utf-8')
+        if len(raw) > META_BYTES:
+            raise ValueError(f"Metadatos demasiado grandes: {len(raw)} > {META_BYTES} bytes")
+        header = self._layout.header
+        self._layout.meta[:len(raw)] = np.frombuffer(raw, dtype=np.uint8)
+        header[H_META_LENGTH] = len(raw)
+        header[H_META_VERSION] += 1
+    
+    def publish(self, simulator, energy=None, achieved_scale=None, lagging=False):
+        """Copia el estado actual al buffer inactivo y lo activa"""
+        n = simulator.n_bodies
+        m = simulator.n_test_particles
+        if n + m > self.capacity:
+            raise ValueError(f"El estado ({n + m} filas) excede la capacidad ({self.capacity})")
+        
+        header = self._layout.header
+        k = 1 - int(header[H_ACTIVE])
+        ints, floats, positions, velocities, masses = self._layout.buffers[k]
+        
+        ints[B_SEQ] += 1  # impar: escritura en curso
+        ints[B_BODIES] = n
+        ints[B_TEST] = m
+        floats[B_TIME] = simulator.time
+        if energy is not None:
+            floats[B_KINETIC] = energy['kinetic']
+            floats[B_POTENTIAL] = energy['potential']
+            floats[B_TOTAL] = energy['total']
+        positions[:n] = simulator.positions
+        positions[n:n + m] = simulator.test_positions
+        velocities[:n] = simulator.velocities
+        velocities[n:n + m] = simulator.test_velocities
+        masses[:n] = simulator.masses
+        ints[B_SEQ] += 1  # par: buffer consistente
+        
+        header[H_ACTIVE] = k
+        header[H_SEQUENCE] += 1
+        header[H_LAGGING] = 1 if lagging else 0
+        if achieved_scale is not None:
+            self._layout.header_f[H_ACHIEVED_SCALE] = achieved_scale
+        self._layout.header_f[H_PUBLISHED_AT] = time.time()
+        return int(header[H_SEQUENCE])
+    
+    def controls(self):
+        """Controles escritos por los procesos web: (running, reset_counter, time_scale)"""
+        header = self._layout.header
+        return (bool(header[H_CONTROL_RUNNING]), int(header[H_CONTROL_RESET]),
+                float(self._layout.header_f[H_CONTROL_TIME_SCALE]))
+    
+    def close(self, unlink=True):
+        self._layout.release()
+        if unlink:
+            self.shm.unlink()
+
+
+class Snapshot:
+    """
+    Estado leído del doble buffer
+    
+    Con copy=False los arreglos son vistas sobre la memoria compartida:
+    siguen siendo válidas mientras valid() devuelva True (el escritor no
+    vuelve a tocar este buffer hasta dos publicaciones después).
+    """
+    
+    __slots__ = ('sequence', 'time', 'energy', 'n_bodies', 'positions', 'velocities',
+                 'masses', 'test_positions', 'test_velocities', '_ints', '_seq')
+    
+    def valid(self):
+        return self._ints is None or int(self._ints[B_SEQ]) == self._seq
+
+
+class StateReader:
+    """Lector del doble buffer; puede haber tantos como procesos web"""
+    
+    def __init__(self, name):
+        self.shm = _attach(name)
+        header = np.ndarray((HEADER_SLOTS,), dtype=np.int64, buffer=self.shm.buf)
+        if header[H_MAGIC] != MAGIC or header[H_VERSION] != LAYOUT_VERSION:
+            self.shm.close()
+            raise ValueError(f"'{name}' no es un bloque de estado compatible")
+        capacity = int(header[H_CAPACITY])
+        del header
+        self.name = name
+        self._layout = _Layout(self.shm, capacity)
+        self._meta_version = -1
+        self._metadata = []
+    
+    @property
+    def sequence(self):
+        """Número de frames publicados (cambia en cada publicación)"""
+        return int(self._layout.header[H_SEQUENCE])
+    
+    @property
+    def achieved_scale(self):
+        return float(self._layout.header_f[H_ACHIEVED_SCALE])
+    
+    @property
+    def lagging(self):
+        """El proceso de simulación no alcanza la escala de tiempo pedida"""
+        return bool(self._layout.header[H_LAGGING])
+    
+    @property
+    def published_at(self):
+        return float(self._layout.header_f[H_PUBLISHED_AT])
+    
+    @property
+    def time_scale(self):
+        """Escala de tiempo pedida por los procesos web"""
+        return float(self._layout.header_f[H_CONTROL_TIME_SCALE])
+    
+    @property
+    def meta_version(self):
+        """Cambia cada vez que el proceso de simulación publica nuevos metadatos (reinicio)"""
+        return int(self._layout.header[H_META_VERSION])
+    
+    @property
+    def running(self):
+        """La física está en marcha (control de pausa compartido)"""
+        return bool(self._layout.header[H_CONTROL_RUNNING])
+    
+    def metadata(self):
+        """Metadatos de los cuerpos con nombre (se decodifican solo si cambian)"""
+        header = self._layout.header
+        version = int(header[H_META_VERSION])
+        if version != self._meta_version:
+            raw = self._layout.meta[:int(header[H_META_LENGTH])].tobytes()
+            self._metadata = json.loads(raw) if raw else []
+            self._meta_version = version
+        return self._metadata
+    
+    def read(self, copy=True, retries=100):
+        """
+        Lee el último estado publicado
+        
+        Args:
+            copy: copiar los arreglos (True) o devolver vistas sin copia
+            retries: reintentos si el escritor alcanza el buffer durante la lectura
+        """
+        layout = self._layout
+        for _ in range(retries):
+            sequence = int(layout.header[H_SEQUENCE])
+            ints, floats, positions, velocities, masses = layout.buffers[int(layout.header[H_ACTIVE])]
+            seq = int(ints[B_SEQ])
+            if seq % 2:
+                continue
+            
+            n = int(ints[B_BODIES])
+            m = int(ints[B_TEST])
+            snap = Snapshot()
+            snap.sequence = sequence
+            snap.time = float(floats[B_TIME])
+            snap.energy = {
+                'kinetic': float(floats[B_KINETIC]),
+                'potential': float(floats[B_POTENTIAL]),
+                'total': float(floats[B_TOTAL])
+            }
+            snap.n_bodies = n
+            views = (positions[:n], velocities[:n], masses[:n],
+                     positions[n:n + m], velocities[n:n + m])
+            if copy:
+                views = tuple(view.copy() for view in views)
+            (snap.positions, snap.velocities, snap.masses,
+             snap.test_positions, snap.test_velocities) = views
+            
+            if int(ints[B_SEQ]) == seq:
+                snap._ints, snap._seq = (None, seq) if copy else (ints, seq)
+                return snap
+        raise RuntimeError("No se pudo leer un estado consistente de la memoria compartida")
+    
+    # ==================== Controles (escritos por los procesos web) ====================
+    
+    def set_time_scale(self, scale):
+        if not (math.isfinite(scale) and scale > 0):
+            raise ValueError(f"La escala de tiempo debe ser positiva y finita: {scale}")
+        self._layout.header_f[H_CONTROL_TIME_SCALE] = float(scale)
+    
+    def set_running(self, running):
+        self._layout.header[H_CONTROL_RUNNING] = 1 if running else 0
+    
+    def request_reset(self):
+        self._layout.header[H_CONTROL_RESET] += 1
+    
+    def close(self):
+        self._layout.release()
+
+
+class MirrorSimulator(NBodySimulator):
+    """
+    NBodySimulator de solo lectura con el último estado publicado
+    
+    Los endpoints, el índice espacial, los elementos osculadores y el
+    culling funcionan sobre él igual que sobre el simulador local; la
+    energía es la publicada por el proceso de simulación.
+    """
+    
+    def __init__(self, reader, snap):
+        super().__init__(backend='numpy')
+        self.meta_version = reader.meta_version
+        self.energy = snap.energy
+        for i, entry in enumerate(reader.metadata()[:snap.n_bodies]):
+            period = entry.get('orbital_period')
+            self.add_body(CelestialBody(
+                name=entry['name'],
+                mass=snap.masses[i],
+                radius=entry['radius'],
+                position=snap.positions[i],
+                velocity=snap.velocities[i],
+                color=entry['color'],
+                emissive=entry['emissive'],
+                has_rings=entry.get('has_rings', False),
+                rings=entry.get('rings'),
+                gradient=entry.get('gradient'),
+                orbital_elements=None if period is None else {'period': period}
+            ))
+        first = len(self.bodies)
+        if snap.n_bodies > first:
+            self.add_bodies(snap.positions[first:], snap.velocities[first:], snap.masses[first:])
+        self.add_test_particles(snap.test_positions, snap.test_velocities)
+        self.time = snap.time
+    
+    def matches(self, reader, snap):
+        """True si snap tiene los mismos cuerpos (solo cambian posiciones y velocidades)"""
+        return (self.meta_version == reader.meta_version and self.n_bodies == snap.n_bodies
+                and self.n_test_particles == len(snap.test_positions))
+    
+    def update(self, snap):
+        """Adopta los arreglos de un snapshot copiado (copy=True) y registra la estela"""
+        self.positions, self.velocities = snap.positions, snap.velocities
+        self.test_positions, self.test_velocities = snap.test_positions, snap.test_velocities
+        self._bind_bodies()
+        self.time = snap.time
+        self.energy = snap.energy
+        self._record_trail()
+    
+    def compute_energy(self):
+        return dict(self.energy)
+    
+    def step(self):
+        raise RuntimeError("El simulador reflejado es de solo lectura: la física corre en otro proceso")
+
+
+class SharedSimulation:
+    """
+    Lado web del modo de memoria compartida
+    
+    Lanza el proceso de simulación (o se une al bloque de otra instancia
+    con name) y refleja cada frame publicado en un MirrorSimulator. Los
+    controles se escriben en la cabecera y los aplica el proceso de
+    simulación.
+    """
+    
+    def __init__(self, name=None, options=None):
+        self.process = None
+        if name is None:
+            self.process = SimulationProcess(options)
+            name = self.process.start()
+        self.reader = StateReader(name)
+        self.name = name
+        self.simulator = None
+        self._sequence = None
+    
+    @property
+    def stale(self):
+        """Hay un frame publicado que el simulador reflejado aún no tiene"""
+        return self.simulator is None or self.reader.sequence != self._sequence
+    
+    def sync(self):
+        """Simulador reflejado con el último frame (se reconstruye si cambian los cuerpos)"""
+        if not self.stale:
+            return self.simulator
+        reader = self.reader
+        snap = reader.read(copy=True)
+        if self.simulator is None or not self.simulator.matches(reader, snap):
+            self.simulator = MirrorSimulator(reader, snap)
+        else:
+            self.simulator.update(snap)
+        self._sequence = snap.sequence
+        return self.simulator
+    
+    def stats(self):
+        """Mismo formato que RealTimeScheduler.stats() para lo que ven los clientes"""
+        return {
+            'time_scale': self.reader.time_scale,
+            'achieved_scale': round(self.reader.achieved_scale, 3),
+            'lagging': self.reader.lagging
+        }
+    
+    def status(self):
+        return {
+            'name': self.name,
+            'sequence': self.reader.sequence,
+            'achieved_scale': self.reader.achieved_scale,
+            'age': max(0.0, time.time() - self.reader.published_at),
+            'pid': os.getpid()
+        }
+    
+    def close(self):
+        self.reader.close()
+        if self.process is not None:
+            self.process.stop()
+
+
+def run_simulation(name_queue, stop_event, options, frame_time=0.05, energy_every=5):
+    """
+    Cuerpo del proceso de simulación dedicado
+    
+    Construye el simulador (ver physics.batch.build_simulator), crea el
+    bloque compartido, comunica su nombre por name_queue y publica un
+    frame por iteración hasta que stop_event se activa. Lee los controles
+    (pausa, escala de tiempo, reinicio) de la cabecera compartida.
+    """
+    from physics.batch import build_simulator
+    from server.scheduler import RealTimeScheduler
+    
+    simulator = build_simulator(**options)
+    capacity = simulator.n_bodies + simulator.n_test_particles
+    publisher = StatePublisher(capacity)
+    publisher.set_metadata(body_metadata(simulator))
+    scheduler = RealTimeScheduler(simulator, frame_time=frame_time)
+    
+    energy = simulator.compute_energy()
+    publisher.publish(simulator, energy, 0.0)
+    name_queue.put(publisher.name)
+    
+    frame = 0
+    resets = 0
+    try:
+        while not stop_event.is_set():
+            frame_start = time.perf_counter()
+            running, reset, scale = publisher.controls()
+            
+            if reset != resets:
+                resets = reset
+                simulator = build_simulator(**options)
+                publisher.set_metadata(body_metadata(simulator))
+                scheduler.reset(simulator)
+            
+            if scale != scheduler.time_scale:
+                scheduler.set_time_scale(scale)
+            
+            if running:
+                scheduler.advance()
+                frame += 1
+                if frame % energy_every == 0:
+                    energy = simulator.compute_energy()
+            publisher.publish(simulator, energy, scheduler.achieved_scale if running else 0.0,
+                              running and scheduler.lagging)
+            
+            time.sleep(scheduler.sleep_time(frame_start))
+    finally:
+        # El proceso padre es el dueño del bloque y lo borra al detener
+        publisher.close(unlink=False)
+
+
+class SimulationProcess:
+    """
+    Lanza y detiene el proceso de simulación dedicado
+    
+    Uso:
+        process = SimulationProcess({'scenario': 'solar', 'belt': 100000})
+        name = process.start()      # nombre del bloque para StateReader
+        ...
+        process.stop()
+    """
+    
+    def __init__(self, options=None, frame_time=0.05, context='spawn'):
+        import multiprocessing
+        
+        self.options = dict(options or {})
+        self.frame_time = frame_time
+        self._ctx = multiprocessing.get_context(context)
+        self._process = None
+        self._stop = None
+        self.name = None
+    
+    def start(self, timeout=60.0):
+        ctx = self._ctx
+        names = ctx.Queue()
+        self._stop = ctx.Event()
+        self._process = ctx.Process(
+            target=run_simulation,
+            args=(names, self._stop, self.options, self.frame_time),
+            daemon=True
+        )
+        self._process.start()
+        self.name = names.get(timeout=timeout)
+        return self.name
+    
+    @property
+    def alive(self):
+        return self._process is not None and self._process.is_alive()
+    
+    def stop(self, timeout=5.0):
+        if self._process is None:
+            return
+        self._stop.set()
+        self._process.join(timeout)
+        if self._process.is_alive():
+            self._process.terminate()
+        self._process = None
+        if self.name:
+            try:
+                # Unión normal: unlink() deshace el registro en el resource_tracker
+                shm = shared_memory.SharedMemory(name=self.name)
+                shm.close()
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+            self.name = None
@@ -0,0 +1,131 @@
+# server/spatial_queries.py
+"""
+Consultas espaciales sobre el snapshot actual (/api/nearest y /api/region)
+Trabajan sobre un physics.spatial.SpatialIndex ya construido, de modo
+que cada consulta cuesta O(log N + k) y no un volcado completo del
+estado. Funcionan igual en app.py con la física en memoria compartida.
+
+Parámetros (query string):
+    body=Tierra | point=x,y,z    origen (cuerpo con nombre o coordenadas)
+    unit=m | km | au             unidad de entrada y salida (por defecto au)
+    /api/nearest:  k             vecinos (sin contar el propio cuerpo)
+    /api/region:   radius        esfera alrededor del origen
+                   min=x,y,z & max=x,y,z   caja alineada con los ejes
+                   limit         resultados devueltos como máximo
+"""
+
+import numpy as np
+
+from physics.constants import AU
+
+UNITS = {'m': 1.0, 'km': 1e3, 'au': AU}
+
+DEFAULT_K = 10
+MAX_K = 1000
+DEFAULT_LIMIT = 1000
+MAX_LIMIT = 10000
+
+
+def _unit(args):
+    name = args.get('unit', 'au').lower()
+    if name not in UNITS:
+        raise ValueError(f"Unidad desconocida: {name} (usa {', '.join(UNITS)})")
+    return name, UNITS[name]
+
+
+def _vector(text, name):
+    try:
+        vector = np.array([float(value) for value in str(text).split(',')])
+    except ValueError:
+        raise ValueError(f"'{name}' debe ser x,y,z") from None
+    if vector.shape != (3,) or not np.all(np.isfinite(vector)):
+        raise ValueError(f"'{name}' debe ser x,y,z")
+    return vector
+
+
+def _bounded_int(args, name, default, maximum):
+    try:
+        value = int(args.get(name, default))
+    except ValueError:
+        raise ValueError(f"'{name}' debe ser un entero") from None
+    if not 1 <= value <= maximum:
+        raise ValueError(f"'{name}' debe estar entre 1 y {maximum}")
+    return value
+
+
+def _origin(index, args, unit):
+    """(punto en metros, fila del cuerpo o None); KeyError si el cuerpo no existe"""
+    if args.get('body'):
+        row = index.find(args['body'])
+        return index.positions[row], row
+    if args.get('point'):
+        return _vector(args['point'], 'point') * unit, None
+    raise ValueError("Indica 'body' o 'point'")
+
+
+def nearest(index, args):
+    """k puntos más cercanos al origen, ordenados por distancia"""
+    unit_name, unit = _unit(args)
+    k = _bounded_int(args, 'k', DEFAULT_K, MAX_K)
+    point, row = _origin(index, args, unit)
+    
+    # El propio cuerpo está siempre a distancia 0: se pide uno más y se descarta
+    distances, indices = index.nearest(point, k + (row is not None))
+    if row is not None:
+        keep = indices != row
+        distances, indices = distances[keep][:k], indices[keep][:k]
+    
+    return {
+        'time': index.time,
+        'unit': unit_name,
+        'origin': (point / unit).tolist(),
+        'results': index.describe(indices, distances, unit)
+    }
+
+
+def region(index, args):
+    """
+    Puntos dentro de una esfera (radius) o caja (min, max)
+    En la esfera se devuelven los `limit` más cercanos al origen
+    """
+    unit_name, unit = _unit(args)
+    limit = _bounded_int(args, 'limit', DEFAULT_LIMIT, MAX_LIMIT)
+    response = {'time': index.time, 'unit': unit_name}
+    
+    if args.get('radius') is not None:
+        try:
+            radius = float(args['radius']) * unit
+        except ValueError:
+            raise ValueError("'radius' debe ser un número") from None
+        if not radius > 0:
+            raise ValueError("'radius' debe ser positivo")
+        point, row = _origin(index, args, unit)
+        indices = index.query_ball(point, radius)
+        if row is not None:
+            indices = indices[indices != row]
+        count = len(indices)
+        distances = np.linalg.norm(index.positions[indices] - point, axis=1)
+        if len(indices) > limit:
+            chosen = np.argpartition(distances, limit)[:limit]
+            indices, distances = indices[chosen], distances[chosen]
+        order = np.argsort(distances)
+        indices, distances = indices[order], distances[order]
+        response.update(shape='sphere', origin=(point / unit).tolist(), radius=radius / unit)
+    elif args.get('min') and args.get('max'):
+        lower = _vector(args['min'], 'min') * unit
+        upper = _vector(args['max'], 'max') * unit
+        indices = index.query_box(lower, upper)
+        count = len(indices)
+        distances = None
+        if count > limit:
+            indices = np.sort(indices)[:limit]
+        response.update(shape='box', min=(lower / unit).tolist(), max=(upper / unit).tolist())
+    else:
+        raise ValueError("Indica 'radius' (con 'body' o 'point') o 'min' y 'max'")
+    
+    response.update(
+        count=count,
+        truncated=count > len(indices),
+        results=index.describe(indices, distances, unit)
+    )
+    return response
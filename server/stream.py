@@ -0,0 +1,164 @@
+# server/stream.py
+"""
+Difusión del estado por Server-Sent Events (/api/stream)
+Cada frame publicado se serializa una sola vez (y se comprime una sola
+vez si algún suscriptor acepta gzip); los mismos bytes se encolan para
+todos los suscriptores, así que el coste por oyente es solo copiar una
+referencia. Las colas son acotadas: un consumidor lento pierde los
+frames más antiguos en lugar de acumular memoria.
+
+Compresión compartida: un único compresor deflate hace Z_FULL_FLUSH al
+final de cada frame, de modo que cada bloque comprimido es independiente
+de los anteriores. Cada respuesta empieza con su propia cabecera gzip y
+después recibe los mismos bloques que el resto, entre en el momento que
+entre (el flujo no se cierra, así que nunca hace falta el trailer).
+"""
+
+import json
+import threading
+import zlib
+from collections import deque
+
+# Cabecera gzip fija: método deflate, sin flags ni mtime, SO desconocido
+GZIP_HEADER = b'\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff'
+
+
+class Subscription:
+    """Cola acotada de frames pre-codificados de un suscriptor"""
+    
+    def __init__(self, compressed, max_queue):
+        self.compressed = compressed
+        self.frames = deque(maxlen=max_queue)
+        self.ready = threading.Event()
+        self.dropped = 0
+    
+    def push(self, sequence, frame):
+        if len(self.frames) == self.frames.maxlen:
+            self.dropped += 1
+        self.frames.append((sequence, frame))
+        self.ready.set()
+    
+    def pop_all(self, timeout):
+        """(secuencia, bytes) pendientes (espera hasta timeout si no hay ninguno)"""
+        if not self.frames:
+            self.ready.wait(timeout)
+        self.ready.clear()
+        frames = []
+        while self.frames:
+            frames.append(self.frames.popleft())
+        return frames
+
+
+class FrameBroadcaster:
+    """
+    Publica frames SSE pre-codificados a cualquier número de suscriptores
+    
+    Uso:
+        broadcaster = FrameBroadcaster()
+        broadcaster.publish(payload, sequence)          # desde el loop de simulación
+        Response(broadcaster.stream(compressed=True))   # en la ruta Flask
+    """
+    
+    def __init__(self, max_queue=8, heartbeat=15.0, level=6, event='simulation_update'):
+        self.max_queue = max(1, int(max_queue))
+        self.heartbeat = heartbeat
+        self.event = event
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._latest = None
+        self.frames_published = 0
+        self.bytes_encoded = 0
+        # Mensajes fijos, codificados una vez para todas las respuestas
+        self._hello = self._encode(b'retry: 2000\n\n')
+        self._ping = self._encode(b': ping\n\n')
+    
+    @property
+    def subscribers(self):
+        return len(self._subscribers)
+    
+    @property
+    def dropped(self):
+        """Frames descartados por colas llenas entre los suscriptores actuales"""
+        return sum(sub.dropped for sub in list(self._subscribers))
+    
+    def _compress(self, raw):
+        with self._lock:
+            return self._compressor.compress(raw) + self._compressor.flush(zlib.Z_FULL_FLUSH)
+    
+    def _encode(self, raw):
+        return raw, self._compress(raw)
+    
+    def publish(self, payload, sequence=None):
+        """
+        Codifica el payload una vez y lo encola a todos los suscriptores
+        Sin suscriptores no se hace ningún trabajo
+        
+        Returns:
+            número de suscriptores que lo recibieron
+        """
+        subscribers = list(self._subscribers)
+        if not subscribers:
+            self._latest = None
+            return 0
+        
+        header = f"id: {sequence}\n" if sequence is not None else ""
+        data = json.dumps(payload, separators=(',', ':'))
+        raw = f"{header}event: {self.event}\ndata: {data}\n\n".encode()
+        # Solo se comprime si algún suscriptor lo necesita
+        compressed = self._compress(raw) if any(sub.compressed for sub in subscribers) else None
+        frame = (raw, compressed, sequence)
+        # Último frame y destinatarios en la misma sección que el alta de suscriptores:
+        # cada suscriptor recibe este frame o como "último" o en su cola, nunca las dos
+        with self._lock:
+            self._latest = frame
+            subscribers = list(self._subscribers)
+        self.frames_published += 1
+        self.bytes_encoded += len(raw) + (len(compressed) if compressed else 0)
+        
+        for sub in subscribers:
+            payload_bytes = frame[1] if sub.compressed else frame[0]
+            if payload_bytes is not None:
+                sub.push(sequence, payload_bytes)
+        return len(subscribers)
+    
+    def stream(self, compressed=False):
+        """
+        Generador de bytes para una respuesta text/event-stream
+        Termina (y libera la suscripción) cuando el cliente se desconecta
+        """
+        sub = Subscription(compressed, self.max_queue)
+        variant = 1 if compressed else 0
+        # Alta y lectura del último frame bajo el mismo lock que publish()
+        with self._lock:
+            self._subscribers.add(sub)
+            latest = self._latest
+        try:
+            if compressed:
+                yield GZIP_HEADER
+            yield self._hello[variant]
+            # El último frame, si ya está codificado en la variante pedida, evita esperar al siguiente
+            replayed = None
+            if latest is not None and latest[variant] is not None:
+                replayed = latest[2]
+                yield latest[variant]
+            
+            while True:
+                frames = sub.pop_all(self.heartbeat)
+                if not frames:
+                    yield self._ping[variant]
+                for sequence, frame in frames:
+                    # Nunca se repite un id ya enviado como último frame
+                    if replayed is not None and sequence is not None and sequence <= replayed:
+                        continue
+                    yield frame
+        finally:
+            self._subscribers.discard(sub)
+    
+    def stats(self):
+        return {
+            'subscribers': self.subscribers,
+            'frames_published': self.frames_published,
+            'bytes_encoded': self.bytes_encoded,
+            'dropped': self.dropped
+        }
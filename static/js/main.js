@@ -5,6 +5,7 @@ let socket;
 let renderer;
 let isSimulationRunning = false;
 let currentTimeScale = 1.0;
+let viewportTimer = null;
 
 document.addEventListener('DOMContentLoaded', () => {
     console.log('🌌 Inicializando Sistema Solar N-Body');
@@ -14,6 +15,10 @@ document.addEventListener('DOMContentLoaded', () => {
     initializeWebSocket();
     setupUIControls();
     
+    // Culling por cliente: avisar al servidor cuando cambia la cámara
+    renderer.controls.addEventListener('change', scheduleViewportUpdate);
+    window.addEventListener('resize', scheduleViewportUpdate);
+    
     setTimeout(() => {
         const loading = document.getElementById('loading');
         if (loading) {
@@ -33,6 +38,7 @@ function initializeWebSocket() {
     socket.on('connect', () => {
         console.log('✅ Conectado al servidor');
         updateStatus('Conectado', '#0f0');
+        sendViewport();
         socket.emit('start_simulation');
     });
     
@@ -49,6 +55,9 @@ function initializeWebSocket() {
         if (data.state && data.state.bodies) {
             renderer.updateBodies(data.state.bodies);
         }
+        if (data.state && data.state.particles) {
+            renderer.updateParticles(data.state.particles);
+        }
         updateStats(data);
     });
     
@@ -68,6 +77,14 @@ function initializeWebSocket() {
         }
     });
     
+    socket.on('simulation_event', (event) => {
+        if (event.type === 'close_encounter') {
+            console.log(`☄️ Encuentro cercano (${event.phase}): ${event.bodies.join(' - ')} a ${event.distance_au.toFixed(4)} AU`);
+        } else if (event.type === 'conjunction') {
+            console.log(`🔭 Conjunción: ${event.bodies.join(' - ')} (${event.angle_deg.toFixed(2)}°)`);
+        }
+    });
+    
     socket.on('time_scale_updated', (data) => {
         console.log(`⏱️ Escala: ${data.scale}x`);
         currentTimeScale = data.scale;
@@ -131,6 +148,18 @@ function setupUIControls() {
     });
 }
 
+function sendViewport() {
+    viewportTimer = null;
+    socket.emit('set_viewport', renderer.getViewport());
+}
+
+function scheduleViewportUpdate() {
+    // Como mucho un mensaje cada 200 ms mientras se mueve la cámara
+    if (viewportTimer === null) {
+        viewportTimer = setTimeout(sendViewport, 200);
+    }
+}
+
 function setTimeScale(scale) {
     socket.emit('set_time_scale', { scale: scale });
     document.getElementById('speedValue').textContent = scale.toFixed(1);
@@ -159,6 +188,12 @@ function updateStats(data) {
     if (data.fps !== undefined) {
         document.getElementById('fps').textContent = data.fps;
     }
+    
+    if (data.scheduler) {
+        // ⚠️ cuando el servidor no alcanza la velocidad pedida
+        const achieved = data.scheduler.achieved_scale.toFixed(1);
+        document.getElementById('achievedScale').textContent = data.scheduler.lagging ? `${achieved} ⚠️` : achieved;
+    }
 }
 
 function updateStatus(message, color) {
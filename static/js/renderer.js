@@ -20,6 +20,9 @@ class SolarSystemRenderer {
         this.trailMaxAge = 30000; // 30 segundos antes de empezar a desvanecer
         this.maxTrailPoints = 500;
         
+        // Nube de partículas (cinturones, catálogos) enviada por el servidor
+        this.particles = null;
+        
         this.init();
     }
     
@@ -411,6 +414,45 @@ class SolarSystemRenderer {
         });
     }
     
+    updateParticles(particles) {
+        if (!this.particles) {
+            const geometry = new THREE.BufferGeometry();
+            const material = new THREE.PointsMaterial({
+                color: 0xaaaaaa,
+                size: 1.5,
+                sizeAttenuation: true,
+                transparent: true,
+                opacity: 0.8
+            });
+            this.particles = new THREE.Points(geometry, material);
+            this.scene.add(this.particles);
+        }
+        
+        const positions = new Float32Array(particles.positions.length * 3);
+        particles.positions.forEach((p, i) => {
+            positions[i * 3] = p[0];
+            positions[i * 3 + 1] = p[1];
+            positions[i * 3 + 2] = p[2];
+        });
+        this.particles.geometry.setAttribute('position', new THREE.BufferAttribute(positions, 3));
+        this.particles.geometry.computeBoundingSphere();
+    }
+    
+    getViewport() {
+        // Frustum de la cámara en unidades de escena (para culling en el servidor)
+        const p = this.camera.position;
+        const t = this.controls.target;
+        return {
+            position: [p.x, p.y, p.z],
+            target: [t.x, t.y, t.z],
+            up: [this.camera.up.x, this.camera.up.y, this.camera.up.z],
+            fov: this.camera.fov,
+            aspect: this.camera.aspect,
+            near: this.camera.near,
+            far: this.camera.far
+        };
+    }
+    
     setLabelsVisible(visible) {
         this.labelsVisible = visible;
         this.labels.forEach(label => {
@@ -0,0 +1,9 @@
+# tests/conftest.py
+"""Configuración común de pytest: la raíz del repositorio en sys.path"""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
@@ -0,0 +1,30 @@
+# tests/test_kernels.py
+"""Backends de fuerzas contra la referencia de NumPy (masivos y partículas de prueba)"""
+
+import pytest
+
+from physics.kernels import AutoKernel, available_backends, check_backend, get_backend
+
+# (cuerpos masivos, partículas de prueba): caso pequeño y caso por bloques
+SIZES = [(5, 7), (300, 512)]
+
+
+@pytest.mark.parametrize('n, m', SIZES)
+@pytest.mark.parametrize('name', available_backends())
+def test_backend_matches_reference(name, n, m):
+    # check_backend compara accelerations y field, y lanza ValueError si se desvía
+    assert check_backend(name, n=n, m=m) <= 1e-9
+
+
+@pytest.mark.parametrize('n, m', SIZES + [(300, 5000)])
+def test_auto_before_warm_up(monkeypatch, n, m):
+    # Mientras numba no está listo se reparte entre NumPy y el kernel por bloques
+    monkeypatch.setattr(AutoKernel, '_fast', None)
+    kernel = AutoKernel(warmup=False, workers=2, tile_size=64)
+    assert check_backend(kernel, n=n, m=m) <= 1e-9
+
+
+def test_auto_filters_options_per_backend():
+    kernel = get_backend('auto', workers=2, tile_size=64, max_memory=2**20)
+    kernel.warm_up(wait=True)
+    assert check_backend(kernel) <= 1e-9
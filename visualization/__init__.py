@@ -5,5 +5,6 @@ Módulo de visualización para generación procedural
 
 from .sphere_generator import ProceduralSphere
 from .shader_math import ShaderMath
+from .culling import Viewport
 
-__all__ = ['ProceduralSphere', 'ShaderMath']
+__all__ = ['ProceduralSphere', 'ShaderMath', 'Viewport']
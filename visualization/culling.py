@@ -0,0 +1,180 @@
+# visualization/culling.py
+"""
+Culling por cliente y nivel de detalle (LOD) de la nube de partículas
+Cada cliente describe su vista (frustum de la cámara o cuerpo enfocado);
+el servidor selecciona con el índice espacial del snapshot solo los
+puntos visibles y diezma los lejanos, de modo que el ancho de banda
+por frame depende de la vista y no del número total de cuerpos
+"""
+
+import numpy as np
+
+from physics.constants import SCALE_FACTORS
+
+# Constante para el hash estable por índice (fracción áurea)
+_GOLDEN = 0.6180339887498949
+
+DEFAULT_MAX_PARTICLES = 5000
+MAX_PARTICLES_LIMIT = 20000
+
+
+def _vector(value, name):
+    vector = np.asarray(value, dtype=np.float64)
+    if vector.shape != (3,) or not np.all(np.isfinite(vector)):
+        raise ValueError(f"'{name}' debe ser un vector [x, y, z]")
+    return vector
+
+
+def _unit(vector):
+    norm = np.linalg.norm(vector)
+    if norm == 0:
+        raise ValueError("Dirección de cámara degenerada")
+    return vector / norm
+
+
+def _camera_basis(forward, up):
+    """
+    Ejes (forward, right, up) de la cámara como Matrix4.lookAt de three.js
+    Con up paralelo a la mirada (vista cenital) se inclina levemente la
+    dirección, igual que three.js, para obtener un eje horizontal
+    """
+    forward = _unit(forward)
+    up = _unit(up)
+    right = np.cross(forward, up)
+    if np.linalg.norm(right) < 1e-9:
+        tilted = forward.copy()
+        tilted[0 if abs(up[2]) == 1 else 2] -= 1e-4
+        right = np.cross(_unit(tilted), up)
+    right = _unit(right)
+    return forward, right, np.cross(right, forward)
+
+
+class Viewport:
+    """
+    Vista de un cliente, en unidades de escena (metros * SCALE_FACTORS['distance'])
+    
+    - Frustum: position, target, up, fov (vertical, grados), aspect, near, far
+      tal como los tiene la PerspectiveCamera de three.js
+    - Foco: focus (nombre del cuerpo) y radius alrededor de él
+    
+    LOD: la densidad de puntos se mantiene completa hasta la distancia de
+    referencia (cámara-objetivo, o radius/2 con foco) y cae con 1/d² más
+    allá; por debajo de min_fraction los puntos se descartan. La selección
+    usa un hash estable por índice para que los puntos no parpadeen.
+    """
+    
+    def __init__(self, position=None, target=(0.0, 0.0, 0.0), up=(0.0, 1.0, 0.0),
+                 fov=60.0, aspect=1.0, near=0.1, far=50000.0,
+                 focus=None, radius=50.0,
+                 max_particles=DEFAULT_MAX_PARTICLES, min_fraction=1e-3):
+        if position is None and focus is None:
+            raise ValueError("El viewport necesita 'position' (frustum) o 'focus'")
+        self.focus = focus
+        self.radius = float(radius)
+        self.position = None if position is None else _vector(position, 'position')
+        self.target = _vector(target, 'target')
+        self.up = _vector(up, 'up')
+        self.fov = float(fov)
+        self.aspect = float(aspect)
+        self.near = float(near)
+        self.far = float(far)
+        self.max_particles = max(0, min(int(max_particles), MAX_PARTICLES_LIMIT))
+        self.min_fraction = float(min_fraction)
+        if not (0 < self.fov < 180) or self.aspect <= 0 or self.radius <= 0:
+            raise ValueError("Parámetros de cámara inválidos")
+        # Con frustum, la orientación se valida aquí y no en cada frame
+        self._basis = None
+        if self.position is not None:
+            self._basis = _camera_basis(self.target - self.position, self.up)
+    
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Construye el viewport a partir del mensaje 'set_viewport' del cliente
+        Cualquier mensaje mal formado se rechaza con ValueError
+        """
+        if not isinstance(data, dict):
+            raise ValueError("El viewport debe ser un objeto")
+        focus = data.get('focus')
+        if focus is not None and not isinstance(focus, str):
+            raise ValueError("'focus' debe ser el nombre de un cuerpo")
+        keys = ('position', 'target', 'up', 'fov', 'aspect', 'near', 'far',
+                'focus', 'radius', 'max_particles')
+        return cls(**{key: data[key] for key in keys if data.get(key) is not None})
+    
+    def _frustum_candidates(self, index, scale, first):
+        """Candidatos dentro del frustum (fase amplia con KD-tree + test exacto)"""
+        eye = self.position / scale
+        target = self.target / scale
+        forward, right, true_up = self._basis
+        
+        reference = float(np.linalg.norm(target - eye))
+        # Más allá de esta distancia el LOD descartaría todos los puntos
+        far = self.far / scale
+        if self.min_fraction > 0:
+            far = min(far, reference / np.sqrt(self.min_fraction))
+        near = self.near / scale
+        
+        # Margen para que los puntos no aparezcan de golpe en los bordes
+        tan_v = np.tan(np.radians(self.fov) / 2) * 1.1
+        tan_h = tan_v * self.aspect
+        
+        # Esfera que contiene el frustum truncado en far
+        center = eye + forward * (far / 2)
+        bound = np.sqrt((far / 2) ** 2 + (far * tan_h) ** 2 + (far * tan_v) ** 2)
+        candidates = index.query_ball(center, bound)
+        candidates = candidates[candidates >= first]
+        
+        offset = index.positions[candidates] - eye
+        depth = offset @ forward
+        inside = ((depth > near) & (depth < far) &
+                  (np.abs(offset @ right) <= depth * tan_h) &
+                  (np.abs(offset @ true_up) <= depth * tan_v))
+        return candidates[inside], eye, reference
+    
+    def _focus_candidates(self, index, scale, first):
+        """Candidatos en la esfera de radio radius alrededor del cuerpo enfocado"""
+        center = index.positions[index.find(self.focus)]
+        radius = self.radius / scale
+        candidates = index.query_ball(center, radius)
+        candidates = candidates[candidates >= first]
+        return candidates, center, radius / 2
+    
+    def cull(self, index):
+        """
+        Nube de partículas visible para este viewport
+        
+        Solo usa el SpatialIndex del snapshot (simulator.spatial_index()), de
+        modo que puede ejecutarse sin el lock de la simulación
+        
+        Returns:
+            dict con count (total), visible (tras culling), sent (tras LOD)
+            y positions escaladas en float32, igual que get_state()['particles']
+        """
+        scale = SCALE_FACTORS['distance']
+        # Los cuerpos con nombre siempre se envían aparte
+        first = len(index.names)
+        total = len(index) - first
+        
+        if self.focus is not None:
+            visible, eye, reference = self._focus_candidates(index, scale, first)
+        else:
+            visible, eye, reference = self._frustum_candidates(index, scale, first)
+        
+        # LOD: fracción conservada según la distancia al observador
+        distance = np.linalg.norm(index.positions[visible] - eye, axis=1)
+        keep = np.minimum(1.0, (reference / np.maximum(distance, 1e-30)) ** 2)
+        score = np.modf(visible * _GOLDEN)[0] / keep
+        chosen = (score < 1.0) & (keep >= self.min_fraction)
+        selected = visible[chosen]
+        score = score[chosen]
+        if len(selected) > self.max_particles:
+            selected = selected[np.argpartition(score, self.max_particles)[:self.max_particles]]
+        
+        positions = index.positions[selected] * scale
+        return {
+            'count': total,
+            'visible': len(visible),
+            'sent': len(selected),
+            'positions': positions.astype(np.float32).tolist()
+        }